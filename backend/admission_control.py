@@ -0,0 +1,278 @@
+"""
+Admission Control Module - Concurrency limiting and per-client rate limiting.
+Caps the number of model calls in flight across the process, with a bounded
+wait queue that sheds excess load quickly instead of letting it pile up
+behind slow Gemini calls, and throttles each client with a token bucket so
+one misbehaving donor cannot burn the model quota for everyone.
+"""
+
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+
+from metrics import record_admission
+from resilience import UpstreamUnavailableError
+
+# Model calls allowed in flight at once (0 disables the limit), how many
+# requests may wait for a slot and for how long before being shed
+ADMISSION_MAX_IN_FLIGHT = int(os.getenv("ADMISSION_MAX_IN_FLIGHT", 16))
+ADMISSION_MAX_QUEUE = int(os.getenv("ADMISSION_MAX_QUEUE", 32))
+ADMISSION_QUEUE_TIMEOUT_SECONDS = float(os.getenv("ADMISSION_QUEUE_TIMEOUT_SECONDS", 10))
+
+# Per-client token buckets: sustained requests per minute and burst size.
+# Off by default: clients are keyed by IP, which behind a reverse proxy is the
+# proxy's address unless RATE_LIMIT_TRUSTED_PROXIES is set to match it
+RATE_LIMIT_ENABLED = os.getenv("RATE_LIMIT_ENABLED", "false").lower() == "true"
+RATE_LIMIT_PER_MINUTE = float(os.getenv("RATE_LIMIT_PER_MINUTE", 30))
+RATE_LIMIT_BURST = float(os.getenv("RATE_LIMIT_BURST", 20))
+RATE_LIMIT_MAX_CLIENTS = int(os.getenv("RATE_LIMIT_MAX_CLIENTS", 10000))
+
+# Clients are identified by IP. Number of reverse proxies in front of the app
+# that append to X-Forwarded-For; the client address is taken that many
+# entries from the right, since entries further left are client-supplied
+RATE_LIMIT_TRUSTED_PROXIES = int(os.getenv("RATE_LIMIT_TRUSTED_PROXIES", 0))
+
+
+class OverloadedError(UpstreamUnavailableError):
+    """
+    Raised when a model call is shed because every slot is busy and the wait
+    queue is full or the wait timed out. Handled like an upstream outage:
+    503 with Retry-After and nothing logged.
+    """
+
+
+class ConcurrencyLimiter:
+    """
+    Counting semaphore with a bounded FIFO-ish wait queue.
+
+    Usage:
+        with limiter.slot():
+            ...  # the model call
+    """
+
+    def __init__(
+        self,
+        max_in_flight: int = ADMISSION_MAX_IN_FLIGHT,
+        max_queue: int = ADMISSION_MAX_QUEUE,
+        queue_timeout: float = ADMISSION_QUEUE_TIMEOUT_SECONDS
+    ):
+        self.max_in_flight = max_in_flight
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self._in_flight = 0
+        self._waiting = 0
+        self._condition = threading.Condition()
+        self._admitted = 0
+        self._admitted_after_wait = 0
+        self._shed_queue_full = 0
+        self._shed_timeout = 0
+        self._wait_seconds_total = 0.0
+        self._wait_seconds_max = 0.0
+
+    def acquire(self) -> float:
+        """
+        Take a slot, waiting in the queue if necessary.
+
+        Returns:
+            float: Seconds spent waiting
+
+        Raises:
+            OverloadedError: If the queue is full or the wait timed out
+        """
+        if self.max_in_flight <= 0:
+            return 0.0
+
+        started = time.monotonic()
+        with self._condition:
+            if self._in_flight < self.max_in_flight and self._waiting == 0:
+                self._in_flight += 1
+                self._admitted += 1
+                record_admission("admitted", 0.0)
+                return 0.0
+
+            if self._waiting >= self.max_queue:
+                self._shed_queue_full += 1
+                record_admission("shed_queue_full")
+                raise OverloadedError(
+                    f"Server is at capacity ({self._in_flight} analyses in flight, "
+                    f"{self._waiting} waiting)",
+                    retry_after=self.queue_timeout
+                )
+
+            self._waiting += 1
+            deadline = started + self.queue_timeout
+            try:
+                while self._in_flight >= self.max_in_flight:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self._shed_timeout += 1
+                        record_admission("shed_timeout")
+                        raise OverloadedError(
+                            f"Timed out after {self.queue_timeout:g}s waiting for an analysis slot",
+                            retry_after=self.queue_timeout
+                        )
+                    self._condition.wait(remaining)
+            finally:
+                self._waiting -= 1
+
+            waited = time.monotonic() - started
+            self._in_flight += 1
+            self._admitted += 1
+            self._admitted_after_wait += 1
+            self._wait_seconds_total += waited
+            self._wait_seconds_max = max(self._wait_seconds_max, waited)
+        record_admission("admitted", waited)
+        return waited
+
+    def release(self):
+        """Return a slot taken by acquire()."""
+        if self.max_in_flight <= 0:
+            return
+        with self._condition:
+            self._in_flight -= 1
+            self._condition.notify()
+
+    def slot(self):
+        """Context manager holding a slot for the duration of the block."""
+        return _Slot(self)
+
+    def stats(self) -> dict:
+        """Return occupancy, admitted/shed counts and queue wait times."""
+        with self._condition:
+            return {
+                "enabled": self.max_in_flight > 0,
+                "max_in_flight": self.max_in_flight,
+                "max_queue": self.max_queue,
+                "in_flight": self._in_flight,
+                "waiting": self._waiting,
+                "admitted": self._admitted,
+                "admitted_after_wait": self._admitted_after_wait,
+                "shed_queue_full": self._shed_queue_full,
+                "shed_timeout": self._shed_timeout,
+                "mean_wait_ms": round(self._wait_seconds_total / self._admitted_after_wait * 1000, 2)
+                if self._admitted_after_wait > 0 else 0.0,
+                "max_wait_ms": round(self._wait_seconds_max * 1000, 2)
+            }
+
+
+class _Slot:
+    __slots__ = ("limiter",)
+
+    def __init__(self, limiter: ConcurrencyLimiter):
+        self.limiter = limiter
+
+    def __enter__(self):
+        self.limiter.acquire()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.limiter.release()
+        return False
+
+
+class RateLimitStore:
+    """
+    Interface for token-bucket state, so buckets can live in a shared store
+    (e.g. Redis) when several processes serve the API.
+    """
+
+    def take(self, key: str, rate: float, burst: float, cost: float = 1) -> tuple:
+        """
+        Refill the bucket for `key` at `rate` tokens/second up to `burst`, then
+        take `cost` tokens if available.
+
+        Returns:
+            tuple of (allowed, retry_after_seconds)
+        """
+        raise NotImplementedError
+
+
+class InMemoryRateLimitStore(RateLimitStore):
+    """Process-local token buckets, evicting the least recently seen clients."""
+
+    def __init__(self, max_clients: int = RATE_LIMIT_MAX_CLIENTS):
+        self.max_clients = max_clients
+        self._buckets = OrderedDict()  # key -> [tokens, updated_at]
+        self._lock = threading.Lock()
+
+    def take(self, key: str, rate: float, burst: float, cost: float = 1) -> tuple:
+        now = time.monotonic()
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                bucket = self._buckets[key] = [burst, now]
+                while len(self._buckets) > self.max_clients:
+                    self._buckets.popitem(last=False)
+            else:
+                self._buckets.move_to_end(key)
+                bucket[0] = min(burst, bucket[0] + (now - bucket[1]) * rate)
+                bucket[1] = now
+
+            if bucket[0] >= cost:
+                bucket[0] -= cost
+                return True, 0.0
+            if cost > burst or rate <= 0:
+                return False, None
+            return False, (cost - bucket[0]) / rate
+
+
+class RateLimiter:
+    """Per-client token-bucket limiter over a pluggable store."""
+
+    def __init__(
+        self,
+        per_minute: float = RATE_LIMIT_PER_MINUTE,
+        burst: float = RATE_LIMIT_BURST,
+        store: Optional[RateLimitStore] = None,
+        enabled: bool = RATE_LIMIT_ENABLED
+    ):
+        self.rate = per_minute / 60
+        self.burst = burst
+        self.enabled = enabled
+        self.store = store if store is not None else InMemoryRateLimitStore()
+        self._lock = threading.Lock()
+        self._allowed = 0
+        self._limited = 0
+
+    def check(self, client_key: str, cost: float = 1) -> tuple:
+        """
+        Charge a client for `cost` analyses.
+
+        Returns:
+            tuple of (allowed, retry_after_seconds); retry_after is None when
+            the request can never fit in the bucket
+        """
+        if not self.enabled:
+            return True, 0.0
+        allowed, retry_after = self.store.take(client_key, self.rate, self.burst, cost)
+        with self._lock:
+            if allowed:
+                self._allowed += 1
+            else:
+                self._limited += 1
+        record_admission("allowed" if allowed else "rate_limited")
+        return allowed, retry_after
+
+    def stats(self) -> dict:
+        """Return allowed/limited counts and the configured rate."""
+        with self._lock:
+            return {
+                "enabled": self.enabled,
+                "per_minute": round(self.rate * 60, 2),
+                "burst": self.burst,
+                "store": type(self.store).__name__,
+                "allowed": self._allowed,
+                "rate_limited": self._limited
+            }
+
+
+# Process-wide limiters used by food_analyzer (model calls) and app (routes)
+model_call_limiter = ConcurrencyLimiter()
+rate_limiter = RateLimiter()
+
+
+def set_rate_limit_store(store: RateLimitStore):
+    """Replace the token-bucket store, e.g. with one shared between workers."""
+    rate_limiter.store = store
@@ -0,0 +1,185 @@
+"""
+Analysis Jobs Module - Bounded background execution of food analyses.
+Lets /api/analyze-food return a job id immediately while the model call runs
+on a worker pool, with results kept for polling until they expire.
+"""
+
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Callable, Optional
+
+# Job execution configuration
+ANALYSIS_JOB_WORKERS = int(os.getenv("ANALYSIS_JOB_WORKERS", 4))
+ANALYSIS_JOB_MAX_PENDING = int(os.getenv("ANALYSIS_JOB_MAX_PENDING", 32))
+ANALYSIS_JOB_RETENTION_SECONDS = float(os.getenv("ANALYSIS_JOB_RETENTION_SECONDS", 15 * 60))
+ANALYSIS_JOB_MAX_WAIT_SECONDS = float(os.getenv("ANALYSIS_JOB_MAX_WAIT_SECONDS", 30))
+
+# Job states
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_COMPLETED = "completed"
+JOB_FAILED = "failed"
+
+
+class JobQueueFullError(Exception):
+    """Raised when the number of queued and running jobs reaches the limit."""
+
+
+class _Job:
+    def __init__(self, job_id: str):
+        self.id = job_id
+        self.status = JOB_QUEUED
+        self.submitted_at = datetime.now().isoformat()
+        self.started_at = None
+        self.completed_at = None
+        self.finished_monotonic = None
+        self.result = None
+        self.error = None
+        self.done = threading.Event()
+
+    def to_dict(self) -> dict:
+        data = {
+            "jobId": self.id,
+            "status": self.status,
+            "submittedAt": self.submitted_at,
+            "startedAt": self.started_at,
+            "completedAt": self.completed_at
+        }
+        if self.status == JOB_COMPLETED:
+            data["result"] = self.result
+        elif self.status == JOB_FAILED:
+            data["error"] = self.error
+        return data
+
+
+class AnalysisJobManager:
+    """
+    Runs analysis callables on a bounded thread pool and tracks their state.
+
+    At most `max_pending` jobs may be queued or running at once; further
+    submissions are rejected so the backlog cannot grow without bound.
+    Finished jobs are kept for `retention_seconds` and then purged.
+    """
+
+    def __init__(
+        self,
+        workers: int = ANALYSIS_JOB_WORKERS,
+        max_pending: int = ANALYSIS_JOB_MAX_PENDING,
+        retention_seconds: float = ANALYSIS_JOB_RETENTION_SECONDS
+    ):
+        self.workers = workers
+        self.max_pending = max_pending
+        self.retention_seconds = retention_seconds
+        self._jobs = {}
+        self._pending = 0
+        self._lock = threading.Lock()
+        self._executor = None
+
+    def submit(self, fn: Callable[[], dict]) -> dict:
+        """
+        Schedule `fn` to run in the background.
+
+        Args:
+            fn: Zero-argument callable returning the analysis result dict
+
+        Returns:
+            dict: Initial job status
+
+        Raises:
+            JobQueueFullError: If the pending job limit has been reached
+        """
+        with self._lock:
+            self._purge_expired()
+            if self._pending >= self.max_pending:
+                raise JobQueueFullError(
+                    f"Analysis queue is full ({self.max_pending} pending jobs)"
+                )
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.workers,
+                    thread_name_prefix="analysis-job"
+                )
+            job = _Job(uuid.uuid4().hex)
+            self._jobs[job.id] = job
+            self._pending += 1
+            status = job.to_dict()
+
+        self._executor.submit(self._run, job, fn)
+        return status
+
+    def get(self, job_id: str, wait: float = 0) -> Optional[dict]:
+        """
+        Return the status of a job, optionally long-polling for completion.
+
+        Args:
+            job_id: Identifier returned by submit()
+            wait: Seconds to wait for the job to finish (capped at
+                ANALYSIS_JOB_MAX_WAIT_SECONDS)
+
+        Returns:
+            dict with job status, or None if the job is unknown or expired
+        """
+        with self._lock:
+            self._purge_expired()
+            job = self._jobs.get(job_id)
+        if job is None:
+            return None
+
+        if wait > 0:
+            job.done.wait(min(wait, ANALYSIS_JOB_MAX_WAIT_SECONDS))
+
+        with self._lock:
+            return job.to_dict()
+
+    def stats(self) -> dict:
+        """Return queue occupancy for monitoring."""
+        with self._lock:
+            return {
+                "pending": self._pending,
+                "max_pending": self.max_pending,
+                "workers": self.workers,
+                "retained": len(self._jobs)
+            }
+
+    def shutdown(self, wait: bool = True):
+        """Stop accepting work and optionally wait for running jobs."""
+        if self._executor is not None:
+            self._executor.shutdown(wait=wait)
+
+    def _run(self, job: _Job, fn: Callable[[], dict]):
+        with self._lock:
+            job.status = JOB_RUNNING
+            job.started_at = datetime.now().isoformat()
+        try:
+            result = fn()
+            with self._lock:
+                job.result = result
+                job.status = JOB_COMPLETED
+        except Exception as e:
+            with self._lock:
+                job.error = str(e)
+                job.status = JOB_FAILED
+        finally:
+            with self._lock:
+                job.completed_at = datetime.now().isoformat()
+                job.finished_monotonic = time.monotonic()
+                self._pending -= 1
+            job.done.set()
+
+    def _purge_expired(self):
+        """Drop finished jobs older than the retention window. Caller holds the lock."""
+        cutoff = time.monotonic() - self.retention_seconds
+        expired = [
+            job_id for job_id, job in self._jobs.items()
+            if job.finished_monotonic is not None and job.finished_monotonic < cutoff
+        ]
+        for job_id in expired:
+            del self._jobs[job_id]
+
+
+# Process-wide job manager used by the Flask app
+job_manager = AnalysisJobManager()
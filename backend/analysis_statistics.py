@@ -0,0 +1,234 @@
+"""
+Analysis Statistics Module - Audit trail counters.
+RunningStatistics updates counts as each record is logged, persists them
+periodically with a watermark of how many records they cover, and catches
+up from the audit log on startup, so statistics reads are O(1). The counters
+live in one process, so they are only exact while that process is the only
+writer. StoreStatistics instead asks a backend that aggregates in the store
+(SQLite), which stays exact however many processes write.
+"""
+
+import json
+import os
+import threading
+import time
+from collections import Counter
+
+# Persistence and retention configuration
+STATISTICS_PERSIST_INTERVAL_SECONDS = float(os.getenv("STATISTICS_PERSIST_INTERVAL_SECONDS", 5))
+STATISTICS_HOURLY_RETENTION = int(os.getenv("STATISTICS_HOURLY_RETENTION", 24 * 14))
+STATISTICS_DAILY_RETENTION = int(os.getenv("STATISTICS_DAILY_RETENTION", 400))
+
+# Time window key lengths within an ISO timestamp ("YYYY-MM-DDTHH" / "YYYY-MM-DD")
+WINDOW_KEY_LENGTHS = {"hour": 13, "day": 10}
+
+
+def _is_error(value) -> bool:
+    if isinstance(value, str):
+        return value.strip().lower() == "true"
+    return bool(value)
+
+
+def _new_bucket() -> dict:
+    return {"total": 0, "errors": 0, "by_classification": Counter(), "by_decision": Counter(), "by_risk_level": Counter()}
+
+
+def _add_to_bucket(bucket: dict, record: dict):
+    bucket["total"] += 1
+    if _is_error(record.get("error")):
+        bucket["errors"] += 1
+    bucket["by_classification"][record.get("classification") or "UNKNOWN"] += 1
+    bucket["by_decision"][record.get("decision") or "UNKNOWN"] += 1
+    bucket["by_risk_level"][record.get("risk_level") or "UNKNOWN"] += 1
+
+
+def _bucket_to_dict(bucket: dict) -> dict:
+    return {
+        "total": bucket["total"],
+        "errors": bucket["errors"],
+        "by_classification": dict(bucket["by_classification"]),
+        "by_decision": dict(bucket["by_decision"]),
+        "by_risk_level": dict(bucket["by_risk_level"])
+    }
+
+
+def _bucket_from_dict(data: dict) -> dict:
+    return {
+        "total": data.get("total", 0),
+        "errors": data.get("errors", 0),
+        "by_classification": Counter(data.get("by_classification", {})),
+        "by_decision": Counter(data.get("by_decision", {})),
+        "by_risk_level": Counter(data.get("by_risk_level", {}))
+    }
+
+
+class RunningStatistics:
+    """
+    Thread-safe running totals over the audit trail.
+
+    Holds overall counts plus hourly and daily buckets keyed by the record
+    timestamp. `records_counted` is the watermark persisted alongside the
+    counters and used to replay any records logged after the last save.
+    """
+
+    def __init__(self, state_file: str = None):
+        self.state_file = state_file
+        self._lock = threading.Lock()
+        self._totals = _new_bucket()
+        self._windows = {"hour": {}, "day": {}}
+        self.records_counted = 0
+        self._dirty = False
+        self._last_persist = time.monotonic()
+
+    def record(self, record: dict):
+        """Add one audit record to every counter."""
+        with self._lock:
+            self._add(record)
+            self._dirty = True
+            if time.monotonic() - self._last_persist >= STATISTICS_PERSIST_INTERVAL_SECONDS:
+                self._persist_locked()
+
+    def bootstrap(self, backend):
+        """
+        Load persisted counters and catch up from the audit log.
+
+        If the log holds fewer records than the persisted watermark (it was
+        replaced or truncated), the counters are rebuilt from scratch.
+        """
+        with self._lock:
+            self._load_locked()
+            if backend.count() < self.records_counted:
+                self._reset_locked()
+
+            caught_up = 0
+            for record in backend.iter_records(start=self.records_counted):
+                self._add(record)
+                caught_up += 1
+
+            if caught_up:
+                self._dirty = True
+                self._persist_locked()
+
+    def totals(self) -> dict:
+        """Return overall counts broken down by classification, decision and risk level."""
+        with self._lock:
+            return _bucket_to_dict(self._totals)
+
+    def windows(self, window: str = "day", periods: int = 30) -> list:
+        """
+        Return the most recent time buckets, newest first.
+
+        Args:
+            window: "hour" or "day"
+            periods: Maximum number of buckets to return
+
+        Returns:
+            List of dicts with the bucket key and its counts
+        """
+        if window not in WINDOW_KEY_LENGTHS:
+            raise ValueError(f"Unknown statistics window '{window}'")
+        with self._lock:
+            buckets = self._windows[window]
+            keys = sorted(buckets, reverse=True)[:periods]
+            return [dict(period=key, **_bucket_to_dict(buckets[key])) for key in keys]
+
+    def persist(self):
+        """Write the counters to the state file if they changed."""
+        with self._lock:
+            self._persist_locked()
+
+    def _add(self, record: dict):
+        _add_to_bucket(self._totals, record)
+        timestamp = record.get("timestamp") or ""
+        for window, key_length in WINDOW_KEY_LENGTHS.items():
+            if len(timestamp) < key_length:
+                continue
+            buckets = self._windows[window]
+            key = timestamp[:key_length]
+            bucket = buckets.get(key)
+            if bucket is None:
+                bucket = buckets[key] = _new_bucket()
+                self._trim(window)
+            _add_to_bucket(bucket, record)
+        self.records_counted += 1
+
+    def _trim(self, window: str):
+        buckets = self._windows[window]
+        retention = STATISTICS_HOURLY_RETENTION if window == "hour" else STATISTICS_DAILY_RETENTION
+        if len(buckets) > retention:
+            for key in sorted(buckets)[:len(buckets) - retention]:
+                del buckets[key]
+
+    def _reset_locked(self):
+        self._totals = _new_bucket()
+        self._windows = {"hour": {}, "day": {}}
+        self.records_counted = 0
+
+    def _load_locked(self):
+        if not self.state_file or not os.path.exists(self.state_file):
+            return
+        try:
+            with open(self.state_file, "r", encoding="utf-8") as f:
+                state = json.load(f)
+            self._totals = _bucket_from_dict(state.get("totals", {}))
+            self._windows = {
+                window: {key: _bucket_from_dict(b) for key, b in state.get("windows", {}).get(window, {}).items()}
+                for window in WINDOW_KEY_LENGTHS
+            }
+            self.records_counted = state.get("records_counted", 0)
+        except (OSError, ValueError) as e:
+            print(f"Error loading statistics state, rebuilding: {e}")
+            self._reset_locked()
+
+    def _persist_locked(self):
+        self._last_persist = time.monotonic()
+        if not self.state_file or not self._dirty:
+            return
+        state = {
+            "records_counted": self.records_counted,
+            "totals": _bucket_to_dict(self._totals),
+            "windows": {
+                window: {key: _bucket_to_dict(b) for key, b in buckets.items()}
+                for window, buckets in self._windows.items()
+            }
+        }
+        tmp_path = f"{self.state_file}.tmp"
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(state, f)
+            os.replace(tmp_path, self.state_file)
+            self._dirty = False
+        except OSError as e:
+            print(f"Error persisting statistics: {e}")
+
+
+class StoreStatistics:
+    """
+    Statistics computed by the storage backend on each read.
+
+    Offers the same interface as RunningStatistics. Nothing is counted in
+    process: records only need to reach the store, so every worker sees
+    the same totals.
+    """
+
+    def __init__(self, backend):
+        self.backend = backend
+
+    def record(self, record: dict):
+        """Nothing to do: the store counts the record once it is appended."""
+
+    def bootstrap(self, backend):
+        """Nothing to do: there are no persisted counters to catch up."""
+
+    def totals(self) -> dict:
+        """Return overall counts broken down by classification, decision and risk level."""
+        return self.backend.statistics_totals()
+
+    def windows(self, window: str = "day", periods: int = 30) -> list:
+        """Return the most recent time buckets, newest first."""
+        if window not in WINDOW_KEY_LENGTHS:
+            raise ValueError(f"Unknown statistics window '{window}'")
+        return self.backend.statistics_windows(window, periods)
+
+    def persist(self):
+        """Nothing to do: the store is the source of truth."""
@@ -0,0 +1,381 @@
+"""
+Analyzer Backends Module - Pluggable model backends for food safety analysis.
+The Gemini backend calls the real model; the local backend is an offline
+stand-in with configurable latency, error rate and canned or malformed
+responses, so the Flask stack can be load-tested without spending quota.
+Select with ANALYZER_BACKEND=gemini|local; MODEL_ARCHIVE_MODE wraps either
+one to record or replay its responses (see response_archive).
+"""
+
+import json
+import os
+import random
+import threading
+import time
+
+
+ANALYZER_BACKEND = os.getenv("ANALYZER_BACKEND", "gemini").lower()
+
+# Record/replay of model responses: off, record, replay or replay_or_record
+MODEL_ARCHIVE_MODE = os.getenv("MODEL_ARCHIVE_MODE", "off").lower()
+
+# Local stand-in configuration
+# Latency distribution: "fixed", "uniform" (median +/- spread) or "lognormal"
+LOCAL_BACKEND_LATENCY_DISTRIBUTION = os.getenv("LOCAL_BACKEND_LATENCY_DISTRIBUTION", "lognormal").lower()
+LOCAL_BACKEND_LATENCY_MS = float(os.getenv("LOCAL_BACKEND_LATENCY_MS", 2500))
+LOCAL_BACKEND_LATENCY_SPREAD = float(os.getenv("LOCAL_BACKEND_LATENCY_SPREAD", 0.35))
+# Fraction of calls failing with a transient upstream error / returning malformed output
+LOCAL_BACKEND_ERROR_RATE = float(os.getenv("LOCAL_BACKEND_ERROR_RATE", 0.0))
+LOCAL_BACKEND_MALFORMED_RATE = float(os.getenv("LOCAL_BACKEND_MALFORMED_RATE", 0.0))
+# JSONL file of {"response": "..."} lines used as malformed responses
+LOCAL_BACKEND_MALFORMED_FILE = os.getenv(
+    "LOCAL_BACKEND_MALFORMED_FILE",
+    os.path.join(os.path.dirname(__file__), "benchmarks", "corpus", "malformed_responses.jsonl")
+)
+LOCAL_BACKEND_SEED = os.getenv("LOCAL_BACKEND_SEED")
+
+# Chunk size used when the local backend simulates a streamed response
+_LOCAL_STREAM_CHUNK_CHARS = 40
+
+
+class AnalysisRequest:
+    """Everything a backend needs for one analysis call."""
+
+    def __init__(
+        self,
+        prompt: str,
+        image_bytes: bytes,
+        mime_type: str,
+        generation_config: dict,
+        hours_since_prep: float = None,
+        hours_since_pkg: float = None,
+        food_category: str = None,
+        system_instruction: str = None
+    ):
+        self.prompt = prompt
+        self.image_bytes = image_bytes
+        self.mime_type = mime_type
+        self.generation_config = generation_config
+        self.hours_since_prep = hours_since_prep
+        self.hours_since_pkg = hours_since_pkg
+        self.food_category = food_category
+        # None means the default (full) system prompt
+        self.system_instruction = system_instruction
+
+
+class ModelResponse:
+    """Model output text plus token usage (None where the backend does not report it)."""
+
+    def __init__(self, text: str, prompt_tokens: int = None, output_tokens: int = None, total_tokens: int = None):
+        self.text = text
+        self.prompt_tokens = prompt_tokens
+        self.output_tokens = output_tokens
+        self.total_tokens = total_tokens
+
+    def usage(self) -> dict:
+        """Return token usage in the camelCase shape added to analysis results."""
+        return {
+            "promptTokens": self.prompt_tokens,
+            "outputTokens": self.output_tokens,
+            "totalTokens": self.total_tokens
+        }
+
+
+class AnalyzerBackend:
+    """
+    Interface implemented by every analyzer backend.
+
+    generate() returns the complete response. stream() must start the call
+    before returning (so connection errors surface inside the retry wrapper)
+    and returns an iterator of ModelResponse chunks; token usage, where
+    reported, is set on the last chunk.
+    """
+
+    name = "base"
+
+    def generate(self, request: AnalysisRequest, timeout: float) -> ModelResponse:
+        raise NotImplementedError
+
+    def stream(self, request: AnalysisRequest, timeout: float):
+        raise NotImplementedError
+
+    def warm_up(self):
+        """Do any deferred client setup now instead of on the first call."""
+
+    def model_pool_info(self):
+        """Return a summary of pooled model clients for /api/health, or None if there is none."""
+        return None
+
+
+class GeminiBackend(AnalyzerBackend):
+    """
+    Google Gemini via google.generativeai, using the shared model pool.
+
+    Only the API key is checked on construction. Importing google.generativeai
+    (and its gRPC/protobuf stack) and configuring the client are deferred to
+    the first call or warm_up(), keeping cold starts and /api/health fast.
+    """
+
+    name = "gemini"
+
+    def __init__(self):
+        self._api_key = os.getenv("GEMINI_API_KEY")
+        if not self._api_key:
+            raise EnvironmentError("GEMINI_API_KEY environment variable is not set")
+        self._configured = False
+        self._configure_lock = threading.Lock()
+
+    def _model(self, system_instruction: str = None):
+        if not self._configured:
+            with self._configure_lock:
+                if not self._configured:
+                    import google.generativeai as genai
+
+                    genai.configure(api_key=self._api_key)
+                    self._configured = True
+
+        from gemini_client import get_model
+
+        return get_model(system_instruction=system_instruction)
+
+    def warm_up(self):
+        self._model()
+
+    def model_pool_info(self):
+        # Reported once the client is loaded, so /api/health never imports it
+        if not self._configured:
+            return None
+        from gemini_client import model_pool_info
+
+        return model_pool_info()
+
+    @staticmethod
+    def _contents(request: AnalysisRequest) -> list:
+        # Raw bytes go straight into the protobuf Blob; a base64 str here would
+        # be decoded back to bytes by the client, costing two extra copies
+        image_data = request.image_bytes
+        if not isinstance(image_data, bytes):
+            image_data = bytes(image_data)
+        return [request.prompt, {"mime_type": request.mime_type, "data": image_data}]
+
+    @staticmethod
+    def _response(text: str, usage_metadata) -> ModelResponse:
+        if usage_metadata is None:
+            return ModelResponse(text)
+        return ModelResponse(
+            text,
+            prompt_tokens=getattr(usage_metadata, "prompt_token_count", None),
+            output_tokens=getattr(usage_metadata, "candidates_token_count", None),
+            total_tokens=getattr(usage_metadata, "total_token_count", None)
+        )
+
+    def generate(self, request: AnalysisRequest, timeout: float) -> ModelResponse:
+        response = self._model(request.system_instruction).generate_content(
+            self._contents(request),
+            generation_config=request.generation_config,
+            request_options={"timeout": timeout}
+        )
+        return self._response(response.text, getattr(response, "usage_metadata", None))
+
+    def stream(self, request: AnalysisRequest, timeout: float):
+        response = self._model(request.system_instruction).generate_content(
+            self._contents(request),
+            generation_config=request.generation_config,
+            stream=True,
+            request_options={"timeout": timeout}
+        )
+
+        def chunks():
+            for chunk in response:
+                yield self._response(chunk.text, getattr(chunk, "usage_metadata", None))
+
+        return chunks()
+
+
+def _shape_to_schema(value, schema: dict = None):
+    """Drop object properties a response schema does not ask for, as the model would."""
+    if not schema or not isinstance(value, dict) or "properties" not in schema:
+        return value
+    return {
+        key: _shape_to_schema(item, schema["properties"][key])
+        for key, item in value.items()
+        if key in schema["properties"]
+    }
+
+
+class LocalBackend(AnalyzerBackend):
+    """
+    Offline stand-in that returns canned verdicts after a simulated delay.
+
+    Verdicts follow the elapsed times in the request (DISCARD past 4 hours,
+    SAFE_WITH_ADVISORY past 2 hours, otherwise SAFE_FOR_DONATION) so the
+    audit log and statistics look plausible under load. When the request
+    carries a response schema only the fields it asks for are returned.
+    """
+
+    name = "local"
+
+    def __init__(
+        self,
+        latency_ms: float = LOCAL_BACKEND_LATENCY_MS,
+        distribution: str = LOCAL_BACKEND_LATENCY_DISTRIBUTION,
+        spread: float = LOCAL_BACKEND_LATENCY_SPREAD,
+        error_rate: float = LOCAL_BACKEND_ERROR_RATE,
+        malformed_rate: float = LOCAL_BACKEND_MALFORMED_RATE,
+        malformed_file: str = LOCAL_BACKEND_MALFORMED_FILE,
+        seed=LOCAL_BACKEND_SEED
+    ):
+        if distribution not in ("fixed", "uniform", "lognormal"):
+            raise ValueError(f"Unknown LOCAL_BACKEND_LATENCY_DISTRIBUTION '{distribution}'")
+        self.latency_ms = latency_ms
+        self.distribution = distribution
+        self.spread = spread
+        self.error_rate = error_rate
+        self.malformed_rate = malformed_rate
+        self.malformed_responses = self._load_malformed(malformed_file) if malformed_rate > 0 else []
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _load_malformed(path: str) -> list:
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                return [json.loads(line)["response"] for line in f if line.strip()]
+        except (OSError, ValueError, KeyError) as e:
+            print(f"Error loading malformed responses from {path}: {e}")
+            return []
+
+    def _draw(self) -> tuple:
+        """Return (latency seconds, outcome, malformed text) with outcome "error", "malformed" or "ok"."""
+        with self._lock:
+            if self.distribution == "fixed":
+                latency_ms = self.latency_ms
+            elif self.distribution == "uniform":
+                latency_ms = self.latency_ms * self._random.uniform(1 - self.spread, 1 + self.spread)
+            else:
+                # Median latency_ms; spread is the sigma of the underlying normal
+                latency_ms = self._random.lognormvariate(0, self.spread) * self.latency_ms
+            roll = self._random.random()
+            malformed = self._random.choice(self.malformed_responses) if self.malformed_responses else None
+
+        if roll < self.error_rate:
+            return latency_ms / 1000, "error", None
+        if malformed is not None and roll < self.error_rate + self.malformed_rate:
+            return latency_ms / 1000, "malformed", malformed
+        return latency_ms / 1000, "ok", None
+
+    @staticmethod
+    def _verdict(request: AnalysisRequest) -> dict:
+        hours = max(request.hours_since_prep or 0.0, request.hours_since_pkg or 0.0)
+        if hours > 4:
+            verdict = ("NOT-EDIBLE", "DISCARD", "HIGH", 0.9, "Do not donate - past safe holding time")
+        elif hours > 2:
+            verdict = ("EDIBLE", "SAFE_WITH_ADVISORY", "MODERATE", 0.8, "Distribute within the next hour")
+        else:
+            verdict = ("EDIBLE", "SAFE_FOR_DONATION", "LOW", 0.9, None)
+        classification, decision, risk_level, confidence, advisory = verdict
+        return {
+            "classification": classification,
+            "decision": decision,
+            "risk_level": risk_level,
+            "confidence": confidence,
+            "reasoning": {
+                "visual_inspection": "Local stand-in backend - no image inspection performed",
+                "food_identification": f"Unidentified food ({len(request.image_bytes)} image bytes)",
+                "time_temperature": f"{hours:.1f} hours since preparation or packaging",
+                "protective_factors": "Not evaluated",
+                "donation_context": "Synthetic verdict for load testing",
+                "final_assessment": f"Canned {decision} verdict from the local analyzer backend"
+            },
+            "advisory": advisory
+        }
+
+    def _respond(self, request: AnalysisRequest, timeout: float, delay_fraction: float = 1.0) -> tuple:
+        latency, outcome, malformed = self._draw()
+        if latency > timeout:
+            from google.api_core import exceptions as google_exceptions
+
+            time.sleep(timeout)
+            raise google_exceptions.DeadlineExceeded("Local backend simulated deadline exceeded")
+        time.sleep(latency * delay_fraction)
+        if outcome == "error":
+            from google.api_core import exceptions as google_exceptions
+
+            raise google_exceptions.ServiceUnavailable("Local backend simulated upstream error")
+        text = malformed if outcome == "malformed" else json.dumps(
+            _shape_to_schema(self._verdict(request), request.generation_config.get("response_schema"))
+        )
+        return text, latency
+
+    def _usage(self, request: AnalysisRequest, text: str) -> tuple:
+        # Rough token estimate: ~4 characters per token, 258 tokens per image;
+        # the system instruction counts towards the prompt like on Gemini
+        if request.system_instruction is None:
+            from system_prompt import get_system_prompt
+
+            system_instruction = get_system_prompt()
+        else:
+            system_instruction = request.system_instruction
+        prompt_tokens = (len(system_instruction) + len(request.prompt)) // 4 + 258
+        output_tokens = len(text) // 4
+        return prompt_tokens, output_tokens, prompt_tokens + output_tokens
+
+    def generate(self, request: AnalysisRequest, timeout: float) -> ModelResponse:
+        text, _ = self._respond(request, timeout)
+        return ModelResponse(text, *self._usage(request, text))
+
+    def stream(self, request: AnalysisRequest, timeout: float):
+        # Time to first chunk is 30% of the drawn latency; the rest is spread over chunks
+        text, latency = self._respond(request, timeout, delay_fraction=0.3)
+        pieces = [text[i:i + _LOCAL_STREAM_CHUNK_CHARS] for i in range(0, len(text), _LOCAL_STREAM_CHUNK_CHARS)] or [""]
+        usage = self._usage(request, text)
+        per_chunk = latency * 0.7 / len(pieces)
+
+        def chunks():
+            for index, piece in enumerate(pieces):
+                if index:
+                    time.sleep(per_chunk)
+                if index == len(pieces) - 1:
+                    yield ModelResponse(piece, *usage)
+                else:
+                    yield ModelResponse(piece)
+
+        return chunks()
+
+
+_BACKENDS = {"gemini": GeminiBackend, "local": LocalBackend}
+_backend = None
+_backend_lock = threading.Lock()
+
+
+def get_analyzer_backend() -> AnalyzerBackend:
+    """
+    Return the process-wide analyzer backend selected by ANALYZER_BACKEND.
+
+    Raises:
+        ValueError: If ANALYZER_BACKEND or MODEL_ARCHIVE_MODE has an unknown value
+        EnvironmentError: If the Gemini backend is selected without GEMINI_API_KEY
+    """
+    global _backend
+    if _backend is None:
+        with _backend_lock:
+            if _backend is None:
+                backend_class = _BACKENDS.get(ANALYZER_BACKEND)
+                if backend_class is None:
+                    raise ValueError(
+                        f"Unknown ANALYZER_BACKEND '{ANALYZER_BACKEND}' (expected one of: {', '.join(_BACKENDS)})"
+                    )
+                if MODEL_ARCHIVE_MODE != "off":
+                    from response_archive import RecordReplayBackend
+
+                    _backend = RecordReplayBackend(ANALYZER_BACKEND, backend_class, MODEL_ARCHIVE_MODE)
+                else:
+                    _backend = backend_class()
+    return _backend
+
+
+def set_analyzer_backend(backend: AnalyzerBackend):
+    """Replace the process-wide analyzer backend (for harnesses and benchmarks)."""
+    global _backend
+    with _backend_lock:
+        _backend = backend
@@ -3,61 +3,253 @@ Flask REST API for Food Safety Analysis
 Provides AI-powered food safety evaluation for the Replateo donation platform.
 """
 
+import json
+import math
 import os
-from flask import Flask, request, jsonify
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime
+from flask import Blueprint, Flask, Response, g, request, jsonify
 from flask_cors import CORS
 from dotenv import load_dotenv
 
-from food_analyzer import analyze_food_image
-from csv_storage import log_analysis
-
-# Load environment variables
+# Load environment variables before importing project modules, which read
+# their settings from the environment at import time
 load_dotenv()
 
-# Initialize Flask app
-app = Flask(__name__)
+from admission_control import (  # noqa: E402
+    RATE_LIMIT_TRUSTED_PROXIES,
+    OverloadedError,
+    model_call_limiter,
+    rate_limiter
+)
+from analyzer_backends import get_analyzer_backend  # noqa: E402
+from food_analyzer import (  # noqa: E402
+    ANALYSIS_PROMPT_MODE,
+    ANALYSIS_REASONING_VERBOSITY,
+    analyze_food_image,
+    inflight_analyses,
+    stream_food_analysis
+)
+from image_preprocessor import ImagePreprocessingError  # noqa: E402
+from image_upload import read_upload, sniff_image_type  # noqa: E402
+from metrics import METRICS_ENABLED, record_http_request, render_metrics, stage_timer  # noqa: E402
+from resilience import UpstreamUnavailableError, upstream_caller  # noqa: E402
+from response_archive import RecordReplayBackend  # noqa: E402
+from csv_storage import (  # noqa: E402
+    get_audit_writer,
+    get_running_statistics,
+    get_statistics,
+    log_analysis,
+    query_analysis_history
+)
+from analysis_jobs import JobQueueFullError, job_manager  # noqa: E402
+from near_duplicate_index import near_duplicate_index  # noqa: E402
+from verdict_cache import verdict_cache  # noqa: E402
+
+# Routes are registered on a blueprint so create_app() can build fresh apps
+api = Blueprint("api", __name__)
 
-# Configure CORS for React frontend
-CORS(app, origins=["http://localhost:5173", "http://127.0.0.1:5173"])
+# CORS origins for the React frontend
+CORS_ORIGINS = ["http://localhost:5173", "http://127.0.0.1:5173"]
 
 # Maximum file size (10MB)
-app.config["MAX_CONTENT_LENGTH"] = 10 * 1024 * 1024
+MAX_CONTENT_LENGTH = 10 * 1024 * 1024
+
+# Import and configure the model client at startup instead of on the first
+# analysis - worth it for long-running servers, not for serverless cold starts
+ANALYZER_EAGER_INIT = os.getenv("ANALYZER_EAGER_INIT", "false").lower() == "true"
+
+# History page size limit
+HISTORY_MAX_LIMIT = int(os.getenv("HISTORY_MAX_LIMIT", 500))
+
+# Batch analysis limits
+BATCH_MAX_ITEMS = int(os.getenv("BATCH_MAX_ITEMS", 50))
+BATCH_MAX_PARALLELISM = int(os.getenv("BATCH_MAX_PARALLELISM", 4))
+BATCH_MAX_CONTENT_LENGTH = int(os.getenv("BATCH_MAX_CONTENT_LENGTH", 200 * 1024 * 1024))
+
+
+@api.before_app_request
+def _start_request_timer():
+    g.request_started = time.perf_counter()
+
+
+@api.after_app_request
+def _record_request_metrics(response):
+    # Route templates keep job ids out of the label values
+    endpoint = request.url_rule.rule if request.url_rule is not None else "unmatched"
+    started = g.get("request_started")
+    if started is not None:
+        record_http_request(endpoint, request.method, response.status_code, time.perf_counter() - started)
+    return response
+
+
+def _rate_limit_key() -> str:
+    """
+    Identify the client for rate limiting by IP.
+    
+    Request headers are not used as an identity: nothing authenticates them,
+    so a client could send a new value per request to get a fresh bucket.
+    Behind RATE_LIMIT_TRUSTED_PROXIES proxies the address is read from
+    X-Forwarded-For at the position the outermost trusted proxy wrote it.
+    """
+    if RATE_LIMIT_TRUSTED_PROXIES > 0:
+        forwarded = [
+            address.strip() for address in request.headers.get("X-Forwarded-For", "").split(",") if address.strip()
+        ]
+        if len(forwarded) >= RATE_LIMIT_TRUSTED_PROXIES:
+            return "ip:" + forwarded[-RATE_LIMIT_TRUSTED_PROXIES]
+    return f"ip:{request.remote_addr}"
+
+
+def _check_rate_limit(cost: int = 1):
+    """Charge the client's token bucket; returns a 429 response if it is empty, else None."""
+    allowed, retry_after = rate_limiter.check(_rate_limit_key(), cost)
+    if allowed:
+        return None
+    headers = {"Retry-After": str(max(1, math.ceil(retry_after)))} if retry_after is not None else {}
+    return jsonify({
+        "error": "Rate limit exceeded",
+        "status": 429,
+        "rateLimited": True,
+        "retryAfter": math.ceil(retry_after) if retry_after is not None else None,
+        "reasoning": "Too many analyses from this client, please retry shortly"
+    }), 429, headers
+
+
+def _is_async_request() -> bool:
+    """Check whether the client opted in to asynchronous job mode."""
+    flag = request.args.get("async") or request.form.get("async") or ""
+    if flag.lower() in ("1", "true", "yes"):
+        return True
+    return "respond-async" in request.headers.get("Prefer", "")
+
 
-# Allowed image extensions
-ALLOWED_EXTENSIONS = {"png", "jpg", "jpeg", "gif", "webp"}
+def _is_stream_request() -> bool:
+    """Check whether the client asked for a Server-Sent Events response."""
+    flag = request.args.get("stream") or request.form.get("stream") or ""
+    if flag.lower() in ("1", "true", "yes"):
+        return True
+    return "text/event-stream" in request.headers.get("Accept", "")
 
 
-def allowed_file(filename: str) -> bool:
-    """Check if the file extension is allowed."""
-    return "." in filename and filename.rsplit(".", 1)[1].lower() in ALLOWED_EXTENSIONS
+def _sse(event: str, payload) -> str:
+    """Format one Server-Sent Event."""
+    return f"event: {event}\ndata: {json.dumps(payload)}\n\n"
 
 
-def get_mime_type(filename: str) -> str:
-    """Get MIME type from filename."""
-    ext = filename.rsplit(".", 1)[1].lower() if "." in filename else "jpeg"
-    mime_types = {
-        "png": "image/png",
-        "jpg": "image/jpeg",
-        "jpeg": "image/jpeg",
-        "gif": "image/gif",
-        "webp": "image/webp"
+def stream_analysis(
+    image_bytes: bytes,
+    image_filename: str,
+    preparation_time: str,
+    package_time: str,
+    mime_type: str,
+    food_category: str = None
+):
+    """Stream analysis events as SSE and log the final result for the audit trail."""
+    try:
+        for event, payload in stream_food_analysis(
+            image_bytes=image_bytes,
+            preparation_time=preparation_time,
+            package_time=package_time,
+            mime_type=mime_type,
+            food_category=food_category
+        ):
+            if event == "result":
+                # Log the analysis for audit trail
+                log_analysis(
+                    image_filename=image_filename,
+                    preparation_time=preparation_time,
+                    package_time=package_time,
+                    analysis_result=payload
+                )
+            yield _sse(event, payload)
+    except ImagePreprocessingError as e:
+        yield _sse("error", {
+            "error": str(e),
+            "status": 400,
+            "reasoning": "The uploaded file could not be processed as an image"
+        })
+    except UpstreamUnavailableError as e:
+        yield _sse("error", _upstream_unavailable_body(e))
+
+
+def _upstream_unavailable_body(error: UpstreamUnavailableError) -> dict:
+    """Build the response body for an analysis the model service could not serve."""
+    return {
+        "error": str(error),
+        "status": 503,
+        "upstreamUnavailable": True,
+        "overloaded": isinstance(error, OverloadedError),
+        "retryAfter": round(error.retry_after) if error.retry_after is not None else None,
+        "reasoning": "The analysis service is temporarily unavailable, please retry shortly"
     }
-    return mime_types.get(ext, "image/jpeg")
 
 
-@app.route("/api/analyze-food", methods=["POST"])
+def run_analysis(
+    image_bytes: bytes,
+    image_filename: str,
+    preparation_time: str,
+    package_time: str,
+    mime_type: str,
+    food_category: str = None
+) -> dict:
+    """
+    Analyze a food image and record the result in the audit log.
+
+    UpstreamUnavailableError propagates without logging - an outage is not a verdict.
+    """
+    result = analyze_food_image(
+        image_bytes=image_bytes,
+        preparation_time=preparation_time,
+        package_time=package_time,
+        mime_type=mime_type,
+        food_category=food_category
+    )
+    
+    # Log the analysis for audit trail
+    log_analysis(
+        image_filename=image_filename,
+        preparation_time=preparation_time,
+        package_time=package_time,
+        analysis_result=result
+    )
+    
+    return result
+
+
+@api.route("/api/analyze-food", methods=["POST"])
 def analyze_food():
     """
     Analyze a food image for safety and donation eligibility.
     
     Accepts: multipart/form-data with:
-        - image: File (required) - The food image to analyze
+        - image: File (required) - The food image to analyze; JPEG, PNG, GIF
+          or WEBP, identified by content rather than file extension
         - preparationTime: string (required) - ISO datetime of food preparation
         - packageTime: string (required) - ISO datetime of food packaging
+        - foodCategory: string (optional) - "high_risk", "medium_risk" or
+          "low_risk"; selects the time-temperature prescreen limit (the
+          "default" rule, 4 hours like the prompt, when omitted)
+        - stream: string (optional) - "true" (or "Accept: text/event-stream")
+          to receive Server-Sent Events: "field" events for classification,
+          decision, risk_level, confidence and advisory as soon as they are
+          generated, "reasoning" events per section, then a final "result"
+        - async: string (optional) - "true" to run as a background job; also
+          enabled by the ?async=true query parameter or "Prefer: respond-async"
     
     Returns:
-        JSON with classification, confidence, reasoning, and other analysis data
+        JSON with classification, confidence, reasoning, and other analysis data,
+        202 with a job id and status URL in async mode, or an SSE stream.
+        503 with upstreamUnavailable and a Retry-After header when the model
+        service cannot be reached or the server is at capacity (overloaded);
+        nothing is logged in that case. 429 with rateLimited and Retry-After
+        when the client has used up its token bucket.
     """
+    limited = _check_rate_limit()
+    if limited is not None:
+        return limited
+    
     try:
         # Validate image file
         if "image" not in request.files:
@@ -78,14 +270,6 @@ def analyze_food():
                 "reasoning": "A valid image file is required"
             }), 400
         
-        if not allowed_file(image_file.filename):
-            return jsonify({
-                "error": "Invalid file type. Allowed: PNG, JPG, JPEG, GIF, WEBP",
-                "classification": "NOT-EDIBLE",
-                "confidence": 0.0,
-                "reasoning": "Only image files are accepted for analysis"
-            }), 400
-        
         # Validate required form data
         preparation_time = request.form.get("preparationTime")
         package_time = request.form.get("packageTime")
@@ -106,28 +290,66 @@ def analyze_food():
                 "reasoning": "Package time is needed for time-temperature analysis"
             }), 400
         
-        # Read image bytes
-        image_bytes = image_file.read()
-        mime_type = get_mime_type(image_file.filename)
+        # Map the upload rather than copying it, and trust its content over its name
+        with stage_timer("upload_read"):
+            image_bytes = read_upload(image_file)
+        mime_type = sniff_image_type(image_bytes)
         
-        # Analyze the food image
-        result = analyze_food_image(
-            image_bytes=image_bytes,
-            preparation_time=preparation_time,
-            package_time=package_time,
-            mime_type=mime_type
-        )
+        if mime_type is None:
+            return jsonify({
+                "error": "Invalid file type. Allowed: PNG, JPG, JPEG, GIF, WEBP",
+                "classification": "NOT-EDIBLE",
+                "confidence": 0.0,
+                "reasoning": "Only image files are accepted for analysis"
+            }), 400
         
-        # Log the analysis for audit trail
-        log_analysis(
-            image_filename=image_file.filename,
-            preparation_time=preparation_time,
-            package_time=package_time,
-            analysis_result=result
+        food_category = request.form.get("foodCategory") or None
+        
+        if _is_stream_request():
+            return Response(
+                stream_analysis(
+                    image_bytes, image_file.filename, preparation_time, package_time, mime_type, food_category
+                ),
+                mimetype="text/event-stream",
+                headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+            )
+        
+        if _is_async_request():
+            try:
+                image_filename = image_file.filename
+                job = job_manager.submit(lambda: run_analysis(
+                    image_bytes, image_filename, preparation_time, package_time, mime_type, food_category
+                ))
+            except JobQueueFullError as e:
+                return jsonify({
+                    "error": str(e),
+                    "reasoning": "The analysis queue is full, please retry shortly"
+                }), 503
+            
+            status_url = f"/api/analyze-food/{job['jobId']}"
+            job["statusUrl"] = status_url
+            return jsonify(job), 202, {"Location": status_url}
+        
+        result = run_analysis(
+            image_bytes, image_file.filename, preparation_time, package_time, mime_type, food_category
         )
         
         return jsonify(result), 200
         
+    except ImagePreprocessingError as e:
+        return jsonify({
+            "error": str(e),
+            "classification": "NOT-EDIBLE",
+            "confidence": 0.0,
+            "reasoning": "The uploaded file could not be processed as an image"
+        }), 400
+        
+    except UpstreamUnavailableError as e:
+        headers = {}
+        if e.retry_after is not None:
+            headers["Retry-After"] = str(max(1, round(e.retry_after)))
+        return jsonify(_upstream_unavailable_body(e)), 503, headers
+        
     except Exception as e:
         error_response = {
             "error": str(e),
@@ -138,20 +360,354 @@ def analyze_food():
         return jsonify(error_response), 500
 
 
-@app.route("/api/health", methods=["GET"])
+def _batch_item_error(message: str) -> dict:
+    """Build an analysis-shaped error result for a batch item."""
+    return {
+        "classification": "NOT-EDIBLE",
+        "decision": "DISCARD",
+        "risk_level": "HIGH",
+        "confidence": 0.0,
+        "reasoning": {
+            "final_assessment": f"Analysis failed due to error: {message}"
+        },
+        "advisory": "Manual review required - automated analysis failed",
+        "analyzedAt": datetime.now().isoformat(),
+        "error": True
+    }
+
+
+def _run_batch_item(index: int, item: dict) -> dict:
+    """Analyze and log one batch item, never raising."""
+    if item.get("invalid"):
+        result = _batch_item_error(item["invalid"])
+        log_analysis(
+            image_filename=item["filename"],
+            preparation_time=item["preparation_time"] or "",
+            package_time=item["package_time"] or "",
+            analysis_result=result
+        )
+        return {"index": index, "filename": item["filename"], "status": "error",
+                "error": item["invalid"], "result": result}
+    
+    try:
+        result = run_analysis(
+            item["image_bytes"], item["filename"], item["preparation_time"],
+            item["package_time"], item["mime_type"], item["food_category"]
+        )
+    except UpstreamUnavailableError as e:
+        # No verdict was reached, so nothing is logged for this item
+        return {"index": index, "filename": item["filename"], "status": "unavailable",
+                "error": str(e), "result": _upstream_unavailable_body(e)}
+    except Exception as e:
+        result = _batch_item_error(str(e))
+        log_analysis(
+            image_filename=item["filename"],
+            preparation_time=item["preparation_time"],
+            package_time=item["package_time"],
+            analysis_result=result
+        )
+        return {"index": index, "filename": item["filename"], "status": "error",
+                "error": str(e), "result": result}
+    
+    status = "error" if result.get("error") else "ok"
+    return {"index": index, "filename": item["filename"], "status": status, "result": result}
+
+
+def _pick(values: list, index: int, default: str) -> str:
+    """Return values[index], or the default when the per-item list is short."""
+    return values[index] if index < len(values) and values[index] else default
+
+
+@api.route("/api/analyze-food/batch", methods=["POST"])
+def analyze_food_batch():
+    """
+    Analyze many food images concurrently, streaming results as they complete.
+    
+    Accepts: multipart/form-data with:
+        - images: File (repeated, required) - The food images to analyze
+        - preparationTimes / packageTimes: string (repeated) - ISO datetimes,
+          matched to images by position
+        - preparationTime / packageTime: string (optional) - Defaults used for
+          images without a per-item time
+        - foodCategories / foodCategory: string (optional) - Per-item or default
+          food-risk category for the time-temperature prescreen
+    
+    Returns:
+        Newline-delimited JSON (application/x-ndjson), one line per image in
+        completion order, followed by a summary line. Server-Sent Events are
+        used instead when the client sends "Accept: text/event-stream".
+        Failed items are reported in-line and do not fail the batch; items the
+        model service could not serve have status "unavailable" and are not
+        logged. 429 before anything runs when the client's token bucket
+        cannot cover the batch (one token per image).
+    """
+    request.max_content_length = BATCH_MAX_CONTENT_LENGTH
+    image_files = request.files.getlist("images")
+    
+    if not image_files:
+        return jsonify({"error": "No image files provided"}), 400
+    
+    if len(image_files) > BATCH_MAX_ITEMS:
+        return jsonify({
+            "error": f"Too many images: {len(image_files)} (maximum {BATCH_MAX_ITEMS})"
+        }), 400
+    
+    # Each image costs a token; a full bucket always admits one batch
+    limited = _check_rate_limit(min(len(image_files), rate_limiter.burst))
+    if limited is not None:
+        return limited
+    
+    preparation_times = request.form.getlist("preparationTimes")
+    package_times = request.form.getlist("packageTimes")
+    default_preparation_time = request.form.get("preparationTime")
+    default_package_time = request.form.get("packageTime")
+    food_categories = request.form.getlist("foodCategories")
+    default_food_category = request.form.get("foodCategory") or None
+    
+    # Read every upload before streaming starts - the request body is not
+    # available once the response generator is running.
+    items = []
+    for index, image_file in enumerate(image_files):
+        item = {
+            "filename": image_file.filename,
+            "preparation_time": _pick(preparation_times, index, default_preparation_time),
+            "package_time": _pick(package_times, index, default_package_time),
+            "food_category": _pick(food_categories, index, default_food_category)
+        }
+        if not image_file.filename:
+            item["invalid"] = "No image file selected"
+        elif not item["preparation_time"]:
+            item["invalid"] = "Preparation time is required"
+        elif not item["package_time"]:
+            item["invalid"] = "Package time is required"
+        else:
+            with stage_timer("upload_read"):
+                item["image_bytes"] = read_upload(image_file)
+            item["mime_type"] = sniff_image_type(item["image_bytes"])
+            if item["mime_type"] is None:
+                item["invalid"] = "Invalid file type. Allowed: PNG, JPG, JPEG, GIF, WEBP"
+                del item["image_bytes"]
+        items.append(item)
+    
+    use_sse = "text/event-stream" in request.headers.get("Accept", "")
+    
+    def encode(payload: dict, event: str) -> str:
+        if use_sse:
+            return f"event: {event}\ndata: {json.dumps(payload)}\n\n"
+        return json.dumps(payload) + "\n"
+    
+    def generate():
+        succeeded = 0
+        executor = ThreadPoolExecutor(
+            max_workers=max(1, min(BATCH_MAX_PARALLELISM, len(items))),
+            thread_name_prefix="batch-analysis"
+        )
+        try:
+            futures = [executor.submit(_run_batch_item, i, item) for i, item in enumerate(items)]
+            for future in as_completed(futures):
+                outcome = future.result()
+                if outcome["status"] == "ok":
+                    succeeded += 1
+                yield encode(outcome, "item")
+            
+            yield encode({
+                "done": True,
+                "total": len(items),
+                "succeeded": succeeded,
+                "failed": len(items) - succeeded
+            }, "done")
+        finally:
+            # Client disconnects stop queued items; running ones still finish and log
+            executor.shutdown(wait=False, cancel_futures=True)
+    
+    mimetype = "text/event-stream" if use_sse else "application/x-ndjson"
+    return Response(generate(), mimetype=mimetype, headers={"Cache-Control": "no-cache"})
+
+
+@api.route("/api/analyze-food/<job_id>", methods=["GET"])
+def get_analysis_job(job_id: str):
+    """
+    Get the status and result of an asynchronous analysis job.
+    
+    Query params:
+        - wait: float (optional) - Seconds to long-poll for completion
+    
+    Returns:
+        JSON with jobId, status and, once completed, the analysis result
+    """
+    try:
+        wait = float(request.args.get("wait", 0))
+    except ValueError:
+        return jsonify({"error": "wait must be a number of seconds"}), 400
+    
+    job = job_manager.get(job_id, wait=wait)
+    if job is None:
+        return jsonify({"error": "Unknown or expired job id"}), 404
+    
+    return jsonify(job), 200
+
+
+@api.route("/api/history", methods=["GET"])
+def history():
+    """
+    Get a page of the analysis audit trail, newest first.
+    
+    Query params:
+        - limit: int (optional, default 50) - Records per page
+        - cursor: string (optional) - nextCursor from the previous page
+        - classification: string (optional) - e.g. "EDIBLE" or "NOT-EDIBLE"
+        - decision: string (optional) - e.g. "DISCARD"
+        - from / to: string (optional) - ISO date or datetime bounds (inclusive)
+    
+    Returns:
+        JSON with records and nextCursor (null on the last page)
+    """
+    try:
+        limit = int(request.args.get("limit", 50))
+    except ValueError:
+        return jsonify({"error": "limit must be an integer"}), 400
+    
+    if limit < 1 or limit > HISTORY_MAX_LIMIT:
+        return jsonify({"error": f"limit must be between 1 and {HISTORY_MAX_LIMIT}"}), 400
+    
+    cursor = request.args.get("cursor") or None
+    
+    try:
+        page = query_analysis_history(
+            limit=limit,
+            cursor=cursor,
+            classification=request.args.get("classification") or None,
+            decision=request.args.get("decision") or None,
+            start=request.args.get("from") or None,
+            end=request.args.get("to") or None
+        )
+    except ValueError:
+        return jsonify({"error": "Invalid cursor"}), 400
+    except Exception as e:
+        return jsonify({"error": f"Could not read history: {str(e)}"}), 500
+    
+    return jsonify(page), 200
+
+
+@api.route("/api/statistics", methods=["GET"])
+def statistics():
+    """
+    Get running statistics over the whole audit trail.
+    
+    Query params:
+        - window: "hour" or "day" (default: "day") - Time bucket size
+        - periods: int (optional) - Number of most recent buckets to return
+          (default: 24 hourly or 30 daily buckets)
+    
+    Returns:
+        JSON with overall totals, breakdowns by classification, decision and
+        risk level, and per-window counts
+    """
+    window = request.args.get("window", "day")
+    if window not in ("hour", "day"):
+        return jsonify({"error": "window must be 'hour' or 'day'"}), 400
+    
+    try:
+        periods = int(request.args.get("periods", 24 if window == "hour" else 30))
+    except ValueError:
+        return jsonify({"error": "periods must be an integer"}), 400
+    
+    running = get_running_statistics()
+    totals = running.totals()
+    
+    return jsonify({
+        **get_statistics(totals),
+        "by_classification": totals["by_classification"],
+        "by_decision": totals["by_decision"],
+        "by_risk_level": totals["by_risk_level"],
+        "window": window,
+        "periods": running.windows(window, max(periods, 0))
+    }), 200
+
+
+@api.route("/api/health", methods=["GET"])
 def health_check():
     """Health check endpoint."""
+    writer = get_audit_writer()
+    backend = get_analyzer_backend()
     return jsonify({
         "status": "healthy",
-        "service": "food-safety-analyzer"
+        "service": "food-safety-analyzer",
+        "analyzer_backend": backend.name,
+        "model_archive": backend.stats() if isinstance(backend, RecordReplayBackend) else None,
+        "analysis_prompt": {
+            "mode": ANALYSIS_PROMPT_MODE,
+            "reasoning_verbosity": ANALYSIS_REASONING_VERBOSITY if ANALYSIS_PROMPT_MODE == "compact" else "full"
+        },
+        "verdict_cache": verdict_cache.stats(),
+        "near_duplicates": near_duplicate_index.stats(),
+        "coalescing": inflight_analyses.stats(),
+        "admission": {
+            "model_calls": model_call_limiter.stats(),
+            "rate_limit": rate_limiter.stats()
+        },
+        "analysis_jobs": job_manager.stats(),
+        "audit_writer": writer.stats() if writer is not None else None,
+        "upstream": upstream_caller.stats(),
+        "model_pool": backend.model_pool_info()
     }), 200
 
 
+@api.route("/metrics", methods=["GET"])
+def metrics():
+    """
+    Prometheus metrics: HTTP request counts and latency, per-stage analysis
+    timings, verdicts by decision and source, JSON parse levels and errors.
+    
+    Returns:
+        text/plain in the Prometheus exposition format, or 404 when
+        METRICS_ENABLED=false
+    """
+    if not METRICS_ENABLED:
+        return jsonify({"error": "Metrics are disabled"}), 404
+    return Response(render_metrics(), mimetype="text/plain; version=0.0.4")
+
+
+def create_app(config: dict = None) -> Flask:
+    """
+    Build the Flask application.
+    
+    This is the production entry point for WSGI servers, e.g.
+    `gunicorn -c gunicorn.conf.py "app:create_app()"`. The analyzer backend is
+    selected here so misconfiguration (such as a missing GEMINI_API_KEY for
+    the Gemini backend) fails at startup rather than on the first request.
+    The model client itself is only imported and configured on the first
+    analysis unless ANALYZER_EAGER_INIT=true.
+    
+    Args:
+        config: Optional Flask config overrides
+    
+    Returns:
+        Flask: Configured application with all API routes registered
+    """
+    backend = get_analyzer_backend()
+    if ANALYZER_EAGER_INIT:
+        backend.warm_up()
+    
+    flask_app = Flask(__name__)
+    CORS(flask_app, origins=CORS_ORIGINS)
+    flask_app.config["MAX_CONTENT_LENGTH"] = MAX_CONTENT_LENGTH
+    if config:
+        flask_app.config.update(config)
+    flask_app.register_blueprint(api)
+    return flask_app
+
+
+# Module-level app for `flask run`, `python app.py` and existing imports
+app = create_app()
+
+
 if __name__ == "__main__":
     port = int(os.getenv("PORT", 5000))
     debug = os.getenv("FLASK_DEBUG", "false").lower() == "true"
     
     print(f"Starting Food Safety Analysis API on port {port}")
     print(f"CORS enabled for: http://localhost:5173")
+    print("Development server only - use gunicorn -c gunicorn.conf.py in production")
     
     app.run(host="0.0.0.0", port=port, debug=debug)
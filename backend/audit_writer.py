@@ -0,0 +1,170 @@
+"""
+Audit Writer Module - Buffered, group-committed audit log writes.
+Requests enqueue records into a bounded queue and a background thread writes
+them in batches, so storage I/O stays off the request path. Pending records
+are drained when the writer is closed (including at interpreter exit).
+"""
+
+import os
+import queue
+import threading
+import time
+from typing import Callable, Optional
+
+# Writer configuration
+AUDIT_WRITER_ENABLED = os.getenv("AUDIT_WRITER_ENABLED", "true").lower() == "true"
+AUDIT_QUEUE_SIZE = int(os.getenv("AUDIT_QUEUE_SIZE", 10000))
+AUDIT_FLUSH_INTERVAL_SECONDS = float(os.getenv("AUDIT_FLUSH_INTERVAL_SECONDS", 0.2))
+AUDIT_FLUSH_MAX_RECORDS = int(os.getenv("AUDIT_FLUSH_MAX_RECORDS", 256))
+AUDIT_ENQUEUE_TIMEOUT_SECONDS = float(os.getenv("AUDIT_ENQUEUE_TIMEOUT_SECONDS", 1.0))
+
+# fsync policy: "always" (every group commit), "interval" (at most every
+# AUDIT_FSYNC_INTERVAL_SECONDS) or "never" (leave it to the OS)
+AUDIT_FSYNC_POLICY = os.getenv("AUDIT_FSYNC_POLICY", "interval").lower()
+AUDIT_FSYNC_INTERVAL_SECONDS = float(os.getenv("AUDIT_FSYNC_INTERVAL_SECONDS", 1.0))
+
+_STOP = object()
+
+
+class AuditWriter:
+    """
+    Background writer that batches records into group commits.
+
+    A batch is committed when it reaches `flush_max_records` or when
+    `flush_interval` has passed since its first record. If the queue stays
+    full for `enqueue_timeout` seconds the record is written synchronously,
+    so records are never dropped.
+    """
+
+    def __init__(
+        self,
+        write_fn: Callable[[list], None],
+        sync_fn: Optional[Callable[[], None]] = None,
+        queue_size: int = AUDIT_QUEUE_SIZE,
+        flush_interval: float = AUDIT_FLUSH_INTERVAL_SECONDS,
+        flush_max_records: int = AUDIT_FLUSH_MAX_RECORDS,
+        fsync_policy: str = AUDIT_FSYNC_POLICY,
+        fsync_interval: float = AUDIT_FSYNC_INTERVAL_SECONDS,
+        enqueue_timeout: float = AUDIT_ENQUEUE_TIMEOUT_SECONDS
+    ):
+        if fsync_policy not in ("always", "interval", "never"):
+            raise ValueError(f"Unknown fsync policy '{fsync_policy}'")
+
+        self.write_fn = write_fn
+        self.sync_fn = sync_fn
+        self.flush_interval = flush_interval
+        self.flush_max_records = flush_max_records
+        self.fsync_policy = fsync_policy
+        self.fsync_interval = fsync_interval
+        self.enqueue_timeout = enqueue_timeout
+
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._closed = False
+        self._last_sync = time.monotonic()
+        self._stats_lock = threading.Lock()
+        self.records_written = 0
+        self.batches_written = 0
+        self.write_errors = 0
+        self.overflow_writes = 0
+
+        self._thread = threading.Thread(target=self._run, name="audit-writer", daemon=True)
+        self._thread.start()
+
+    def submit(self, record: dict) -> bool:
+        """
+        Queue a record for writing.
+
+        Returns:
+            bool: True if the record was queued or written, False otherwise
+        """
+        if self._closed:
+            return self._write_now([record])
+        try:
+            self._queue.put(record, timeout=self.enqueue_timeout)
+            return True
+        except queue.Full:
+            with self._stats_lock:
+                self.overflow_writes += 1
+            return self._write_now([record])
+
+    def close(self, timeout: float = 30.0):
+        """Stop accepting records and drain everything still queued."""
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.put(_STOP)
+        self._thread.join(timeout)
+
+    def stats(self) -> dict:
+        """Return writer counters for monitoring."""
+        with self._stats_lock:
+            return {
+                "queued": self._queue.qsize(),
+                "records_written": self.records_written,
+                "batches_written": self.batches_written,
+                "write_errors": self.write_errors,
+                "overflow_writes": self.overflow_writes,
+                "fsync_policy": self.fsync_policy
+            }
+
+    def _write_now(self, batch: list) -> bool:
+        try:
+            self.write_fn(batch)
+        except Exception as e:
+            print(f"Error writing audit records: {e}")
+            with self._stats_lock:
+                self.write_errors += 1
+            return False
+        with self._stats_lock:
+            self.records_written += len(batch)
+            self.batches_written += 1
+        return True
+
+    def _maybe_sync(self, force: bool = False):
+        if self.sync_fn is None or self.fsync_policy == "never":
+            return
+        now = time.monotonic()
+        if force or self.fsync_policy == "always" or now - self._last_sync >= self.fsync_interval:
+            try:
+                self.sync_fn()
+            except Exception as e:
+                print(f"Error syncing audit log: {e}")
+            self._last_sync = now
+
+    def _run(self):
+        stopping = False
+        while not stopping:
+            item = self._queue.get()
+            if item is _STOP:
+                break
+
+            batch = [item]
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.flush_max_records:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if item is _STOP:
+                    stopping = True
+                    break
+                batch.append(item)
+
+            self._write_now(batch)
+            self._maybe_sync()
+
+        # Drain anything queued behind the stop marker
+        remaining = []
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is not _STOP:
+                remaining.append(item)
+        if remaining:
+            self._write_now(remaining)
+        self._maybe_sync(force=True)
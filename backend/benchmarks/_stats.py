@@ -0,0 +1,20 @@
+"""
+Summary statistics shared by the benchmark and check scripts.
+"""
+
+
+def percentile(samples: list, fraction: float) -> float:
+    """
+    Nearest-rank percentile of a list of samples.
+
+    Args:
+        samples: Measurements in any order
+        fraction: Percentile as a fraction, e.g. 0.99 for p99
+
+    Returns:
+        float: The sample at that rank, or NaN if there are no samples
+    """
+    if not samples:
+        return float("nan")
+    samples = sorted(samples)
+    return samples[min(len(samples) - 1, int(len(samples) * fraction))]
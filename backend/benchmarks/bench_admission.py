@@ -0,0 +1,178 @@
+"""
+Benchmark: admission control under a flooding client.
+
+Runs the app in-process against a local analyzer backend that, like a real
+model quota, serves at most --upstream-capacity calls at once (the rest wait
+inside the backend). One "flooder" client keeps --flood-threads requests
+outstanding while --donors well-behaved clients each send one request per
+second, all with distinct images so nothing is cached or coalesced.
+
+Scenarios:
+    none         no rate limit, no concurrency limit (previous behaviour)
+    concurrency  ADMISSION_MAX_IN_FLIGHT / ADMISSION_MAX_QUEUE only
+    both         concurrency limit plus per-client token buckets
+
+For each scenario it prints donor latency percentiles and outcomes, the
+flooder's outcomes (200 / 429 / 503), upstream calls made and the
+admission stats from /api/health.
+
+Usage:
+    python benchmarks/bench_admission.py [--duration 10] [--latency-ms 500] [--upstream-capacity 8]
+"""
+
+import argparse
+import io
+import os
+import random
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+DATA_DIR = tempfile.mkdtemp(prefix="bench-admission-")
+os.environ.update({
+    "ANALYZER_BACKEND": "local",
+    "ANALYSIS_DATA_DIR": DATA_DIR,
+    "NEAR_DUPLICATE_MODE": "off",
+    "GEMINI_MAX_RETRIES": "0"
+})
+
+from PIL import Image  # noqa: E402
+
+import admission_control  # noqa: E402
+from _stats import percentile  # noqa: E402
+import app as app_module  # noqa: E402
+from analyzer_backends import LocalBackend, set_analyzer_backend  # noqa: E402
+
+
+class QuotaBackend(LocalBackend):
+    """Local backend that serves a limited number of calls concurrently."""
+
+    def __init__(self, latency_ms: float, capacity: int):
+        super().__init__(latency_ms=latency_ms, distribution="fixed")
+        self._capacity = threading.Semaphore(capacity)
+        self._count_lock = threading.Lock()
+        self.calls = 0
+
+    def generate(self, request, timeout):
+        with self._count_lock:
+            self.calls += 1
+        with self._capacity:
+            return super().generate(request, timeout)
+
+
+_image_counter = iter(range(1, 10 ** 9))
+_image_lock = threading.Lock()
+
+
+def _unique_image() -> bytes:
+    with _image_lock:
+        seed = next(_image_counter)
+    pixels = random.Random(seed).randbytes(64 * 48 * 3)
+    output = io.BytesIO()
+    Image.frombytes("RGB", (64, 48), pixels).save(output, format="JPEG")
+    return output.getvalue()
+
+
+def _post(client, address: str) -> tuple:
+    started = time.perf_counter()
+    response = client.post("/api/analyze-food", environ_base={"REMOTE_ADDR": address}, data={
+        "image": (io.BytesIO(_unique_image()), "bench.jpg"),
+        "preparationTime": (datetime.now() - timedelta(hours=1)).isoformat(),
+        "packageTime": (datetime.now() - timedelta(minutes=30)).isoformat()
+    })
+    return response.status_code, time.perf_counter() - started
+
+
+def run_scenario(name: str, args, flask_app, backend: QuotaBackend):
+    limiter = admission_control.model_call_limiter
+    limiter.__init__(
+        max_in_flight=args.max_in_flight if name in ("concurrency", "both") else 0,
+        max_queue=args.max_queue,
+        queue_timeout=args.queue_timeout
+    )
+    admission_control.rate_limiter.__init__(
+        per_minute=args.rate_per_minute, burst=args.burst, enabled=name == "both"
+    )
+    calls_before = backend.calls
+    stop = threading.Event()
+    donor_results, flood_results = [], []
+    lock = threading.Lock()
+
+    def flooder():
+        client = flask_app.test_client()
+        while not stop.is_set():
+            outcome = _post(client, "10.0.0.1")
+            with lock:
+                flood_results.append(outcome)
+
+    def donor(index: int):
+        client = flask_app.test_client()
+        time.sleep(index * 1.0 / max(1, args.donors))
+        while not stop.is_set():
+            started = time.monotonic()
+            outcome = _post(client, f"10.0.1.{index + 1}")
+            with lock:
+                donor_results.append(outcome)
+            stop.wait(max(0.0, 1.0 - (time.monotonic() - started)))
+
+    threads = [threading.Thread(target=flooder) for _ in range(args.flood_threads)]
+    threads += [threading.Thread(target=donor, args=(i,)) for i in range(args.donors)]
+    for thread in threads:
+        thread.start()
+    time.sleep(args.duration)
+    stop.set()
+    for thread in threads:
+        thread.join()
+
+    donor_ok = [seconds for status, seconds in donor_results if status == 200]
+    donor_statuses = Counter(status for status, _ in donor_results)
+    flood_statuses = Counter(status for status, _ in flood_results)
+    stats = flask_app.test_client().get("/api/health").get_json()["admission"]
+
+    print(f"\n== {name}")
+    print(f"donors:  {len(donor_results)} requests, statuses {dict(sorted(donor_statuses.items()))}, "
+          f"latency p50 {percentile(donor_ok, 0.5) * 1000:.0f}ms p95 {percentile(donor_ok, 0.95) * 1000:.0f}ms "
+          f"max {max(donor_ok, default=float('nan')) * 1000:.0f}ms")
+    print(f"flooder: {len(flood_results)} requests, statuses {dict(sorted(flood_statuses.items()))}")
+    print(f"upstream calls: {backend.calls - calls_before}")
+    model_calls = stats["model_calls"]
+    print(f"admission: admitted {model_calls['admitted']} ({model_calls['admitted_after_wait']} after waiting, "
+          f"mean wait {model_calls['mean_wait_ms']}ms, max {model_calls['max_wait_ms']}ms), "
+          f"shed {model_calls['shed_queue_full']} queue full / {model_calls['shed_timeout']} timeout, "
+          f"rate limited {stats['rate_limit']['rate_limited']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--duration", type=float, default=10)
+    parser.add_argument("--latency-ms", type=float, default=500)
+    parser.add_argument("--upstream-capacity", type=int, default=8)
+    parser.add_argument("--flood-threads", type=int, default=32)
+    parser.add_argument("--donors", type=int, default=4)
+    parser.add_argument("--max-in-flight", type=int, default=8)
+    parser.add_argument("--max-queue", type=int, default=8)
+    parser.add_argument("--queue-timeout", type=float, default=2)
+    parser.add_argument("--rate-per-minute", type=float, default=30)
+    parser.add_argument("--burst", type=float, default=20)
+    parser.add_argument("--scenarios", default="none,concurrency,both")
+    args = parser.parse_args()
+
+    backend = QuotaBackend(args.latency_ms, args.upstream_capacity)
+    set_analyzer_backend(backend)
+    flask_app = app_module.create_app({"TESTING": True})
+    print(f"upstream: {args.upstream_capacity} concurrent calls x {args.latency_ms:g}ms; "
+          f"flooder: {args.flood_threads} outstanding; donors: {args.donors} x 1 req/s; {args.duration:g}s each")
+    for name in args.scenarios.split(","):
+        run_scenario(name.strip(), args, flask_app, backend)
+
+
+if __name__ == "__main__":
+    try:
+        main()
+    finally:
+        shutil.rmtree(DATA_DIR, ignore_errors=True)
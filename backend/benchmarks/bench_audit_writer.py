@@ -0,0 +1,106 @@
+"""
+Benchmark: audit log throughput and request-path latency.
+
+Compares the synchronous per-row path (lock, stat, open, append, close for
+every record) with the background group-commit writer. Several threads call
+csv_storage.log_analysis concurrently against a temporary data directory;
+the benchmark reports rows/sec (including the final drain for the buffered
+writer) and p50/p99 latency of the log_analysis call itself.
+
+Usage:
+    python benchmarks/bench_audit_writer.py [--rows 20000] [--threads 8] [--backend csv|sqlite]
+"""
+
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import audit_writer  # noqa: E402
+from _stats import percentile  # noqa: E402
+import csv_storage  # noqa: E402
+
+SAMPLE_RESULT = {
+    "classification": "EDIBLE",
+    "decision": "SAFE_WITH_ADVISORY",
+    "risk_level": "MODERATE",
+    "confidence": 0.85,
+    "reasoning": {"final_assessment": "Analysis completed"},
+    "advisory": "Consume within 2 hours",
+    "error": False
+}
+
+
+def _run(label: str, rows: int, threads: int, buffered: bool, backend: str, fsync_policy: str):
+    data_dir = tempfile.mkdtemp(prefix="audit-bench-")
+    csv_storage.DATA_DIR = data_dir
+    csv_storage.ANALYSIS_LOG_FILE = os.path.join(data_dir, "food_analysis_log.csv")
+    csv_storage.AUDIT_WRITER_ENABLED = buffered
+
+    if backend == "sqlite":
+        from sqlite_storage import SqliteStorageBackend
+        csv_storage.set_storage_backend(
+            SqliteStorageBackend(os.path.join(data_dir, "food_analysis_log.db"), import_csv=False)
+        )
+    else:
+        csv_storage.set_storage_backend(csv_storage.CsvStorageBackend())
+
+    # Warm up: bootstrap statistics and start the writer outside the timed region
+    csv_storage.get_running_statistics()
+    if buffered:
+        csv_storage._audit_writer = audit_writer.AuditWriter(
+            csv_storage._write_records, csv_storage._sync_backend, fsync_policy=fsync_policy
+        )
+
+    per_thread = rows // threads
+    latencies = [[] for _ in range(threads)]
+
+    def worker(index: int):
+        samples = latencies[index]
+        for i in range(per_thread):
+            start = time.perf_counter()
+            csv_storage.log_analysis(f"tray-{index}-{i}.jpg", "2026-01-02T14:00", "2026-01-02T14:30", SAMPLE_RESULT)
+            samples.append((time.perf_counter() - start) * 1000)
+
+    workers = [threading.Thread(target=worker, args=(i,)) for i in range(threads)]
+    start = time.perf_counter()
+    for t in workers:
+        t.start()
+    for t in workers:
+        t.join()
+    request_done = time.perf_counter()
+    csv_storage.flush_audit_log()
+    drained = time.perf_counter()
+
+    written = csv_storage.get_storage_backend().count()
+    all_samples = [s for samples in latencies for s in samples]
+    print(
+        f"{label:<34} rows={written:<7} rows/sec={written / (drained - start):10.0f}  "
+        f"p50={percentile(all_samples, 0.5):7.3f}ms  p99={percentile(all_samples, 0.99):7.3f}ms  "
+        f"drain={(drained - request_done) * 1000:7.1f}ms"
+    )
+    csv_storage.set_storage_backend(None)
+    shutil.rmtree(data_dir, ignore_errors=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=20000)
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--backend", choices=["csv", "sqlite"], default="csv")
+    args = parser.parse_args()
+
+    print(f"Backend: {args.backend}, threads: {args.threads}")
+    _run("per-row synchronous append", args.rows, args.threads, False, args.backend, "never")
+    _run("group commit (fsync=never)", args.rows, args.threads, True, args.backend, "never")
+    _run("group commit (fsync=interval)", args.rows, args.threads, True, args.backend, "interval")
+    _run("group commit (fsync=always)", args.rows, args.threads, True, args.backend, "always")
+
+
+if __name__ == "__main__":
+    main()
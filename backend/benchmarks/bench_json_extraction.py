@@ -0,0 +1,102 @@
+"""
+Benchmark and regression check: model response JSON extraction.
+
+Runs food_analyzer.extract_json_with_level over the malformed-response corpus
+in benchmarks/corpus/malformed_responses.jsonl and reports, per entry, the
+parse level that succeeded (direct, tolerant, partial, fields), whether the
+expected verdict fields were recovered and the mean parse time. Entries with
+"expected": null must fail to parse.
+
+With --check the script prints only failures and exits non-zero if any
+entry no longer recovers its expected fields, so it can gate changes to the
+extractor. Add new failing responses captured from the audit log to the
+corpus as they turn up.
+
+Usage:
+    python benchmarks/bench_json_extraction.py [--iterations 500] [--check]
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from collections import Counter
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+os.environ.setdefault("GEMINI_API_KEY", "benchmark-placeholder-key")
+
+from food_analyzer import extract_json_with_level  # noqa: E402
+
+CORPUS_PATH = os.path.join(os.path.dirname(__file__), "corpus", "malformed_responses.jsonl")
+
+
+def load_corpus(path: str = CORPUS_PATH) -> list:
+    with open(path, "r", encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def evaluate(entry: dict) -> tuple:
+    """Return (level or None, recovered, detail) for a corpus entry."""
+    expected = entry["expected"]
+    try:
+        result, level = extract_json_with_level(entry["response"])
+    except json.JSONDecodeError as e:
+        return None, expected is None, str(e)
+
+    if expected is None:
+        return level, False, f"expected a parse failure, got {result}"
+    mismatched = {k: result.get(k) for k, v in expected.items() if result.get(k) != v}
+    if mismatched:
+        return level, False, f"mismatched fields {mismatched}"
+    return level, True, ""
+
+
+def _time_entry(entry: dict, iterations: int) -> float:
+    """Mean microseconds per extraction (failures included)."""
+    text = entry["response"]
+    start = time.perf_counter()
+    for _ in range(iterations):
+        try:
+            extract_json_with_level(text)
+        except json.JSONDecodeError:
+            pass
+    return (time.perf_counter() - start) * 1_000_000 / iterations
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=500)
+    parser.add_argument("--check", action="store_true", help="Only verify recovery; exit 1 on regressions")
+    parser.add_argument("--corpus", default=CORPUS_PATH)
+    args = parser.parse_args()
+
+    corpus = load_corpus(args.corpus)
+    failures = []
+    levels = Counter()
+
+    if not args.check:
+        print(f"{'entry':<32} {'level':<9} {'ok':<4} {'mean':>10}")
+    for entry in corpus:
+        level, recovered, detail = evaluate(entry)
+        levels[level or "failed"] += 1
+        if not recovered:
+            failures.append((entry["id"], detail))
+        if not args.check:
+            mean_us = _time_entry(entry, args.iterations)
+            print(f"{entry['id']:<32} {level or 'failed':<9} {'yes' if recovered else 'NO':<4} {mean_us:8.1f}us")
+
+    recoverable = sum(1 for e in corpus if e["expected"] is not None)
+    recovered = recoverable - sum(1 for e in corpus if e["expected"] is not None and e["id"] in dict(failures))
+    print(f"Corpus: {len(corpus)} responses, {recoverable} recoverable")
+    print(f"Recovery rate: {recovered}/{recoverable} ({recovered / max(recoverable, 1):.0%})")
+    print("Parse levels: " + ", ".join(f"{k}={v}" for k, v in sorted(levels.items())))
+
+    for entry_id, detail in failures:
+        print(f"FAIL {entry_id}: {detail}")
+    if args.check and failures:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
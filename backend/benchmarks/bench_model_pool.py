@@ -0,0 +1,73 @@
+"""
+Micro-benchmark: per-call model setup overhead.
+
+Compares constructing a new GenerativeModel for every request (the previous
+behaviour of analyze_food_image) against fetching the pooled instance from
+gemini_client.get_model(). No network calls are made; only local setup cost
+and the system-prompt bytes attached to each request are measured.
+
+Usage:
+    python benchmarks/bench_model_pool.py [--iterations 2000]
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+os.environ.setdefault("GEMINI_API_KEY", "benchmark-placeholder-key")
+
+import google.generativeai as genai  # noqa: E402
+
+import gemini_client  # noqa: E402
+from _stats import percentile  # noqa: E402
+from system_prompt import get_system_prompt  # noqa: E402
+
+
+def _time_calls(fn, iterations: int) -> list:
+    samples = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1_000_000)
+    return samples
+
+
+def _report(label: str, samples: list):
+    print(f"{label:<28} mean={statistics.mean(samples):9.2f}us  "
+          f"p50={percentile(samples, 0.5):9.2f}us  p99={percentile(samples, 0.99):9.2f}us")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=2000)
+    args = parser.parse_args()
+
+    genai.configure(api_key=os.environ["GEMINI_API_KEY"])
+    system_prompt = get_system_prompt()
+
+    def per_request_model():
+        genai.GenerativeModel(
+            model_name=gemini_client.MODEL_NAME,
+            system_instruction=system_prompt
+        )
+
+    gemini_client.reset_model_pool()
+    before = _time_calls(per_request_model, args.iterations)
+    after = _time_calls(gemini_client.get_model, args.iterations)
+
+    print(f"Iterations: {args.iterations}")
+    _report("new model per request", before)
+    _report("pooled model", after)
+    print(f"Speedup (mean): {statistics.mean(before) / statistics.mean(after):.1f}x")
+
+    prompt_bytes = len(system_prompt.encode("utf-8"))
+    print(f"System prompt sent inline per request: {prompt_bytes} bytes")
+    print("With GEMINI_CONTEXT_CACHE_ENABLED=true the prompt is stored server-side "
+          "and referenced by the cached content name instead.")
+
+
+if __name__ == "__main__":
+    main()
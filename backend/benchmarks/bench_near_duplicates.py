@@ -0,0 +1,137 @@
+"""
+Benchmark: near-duplicate index lookup latency and hash robustness.
+
+Part 1 fills a NearDuplicateIndex with random 64-bit hashes (the worst case
+for bucket selectivity) and times add() and find() at each size, for queries
+that are a few bits from an indexed hash and for unrelated queries.
+
+Part 2 renders synthetic "dishes", re-photographs each one (recompressed,
+downscaled, slightly cropped, brightened, rotated a few degrees) and reports
+the dHash distance from the original for each variant next to the distances
+between different dishes, so NEAR_DUPLICATE_MAX_DISTANCE can be chosen with
+both recall and false matches in view. Images are hashed the way the app
+hashes them: from the preprocessed image, or from the upload when
+IMAGE_PREPROCESS_ENABLED=false.
+
+Usage:
+    python benchmarks/bench_near_duplicates.py [--sizes 1000,10000,50000] [--queries 2000] [--scenes 20]
+"""
+
+import argparse
+import io
+import os
+import random
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from PIL import Image, ImageDraw, ImageEnhance  # noqa: E402
+
+from _stats import percentile  # noqa: E402
+from image_preprocessor import IMAGE_PREPROCESS_ENABLED, compute_dhash, preprocess_image  # noqa: E402
+from near_duplicate_index import NearDuplicateIndex  # noqa: E402
+
+CONTEXT = (2, 1, None)
+
+
+def bench_lookups(sizes: list, queries: int, max_distance: int, rng: random.Random):
+    print(f"Lookup latency, max distance {max_distance}, random hashes")
+    print(f"{'entries':>8} {'add us':>8} {'near p50 us':>12} {'near p99 us':>12} "
+          f"{'far p50 us':>11} {'far p99 us':>11} {'near found':>11}")
+    for size in sizes:
+        index = NearDuplicateIndex(window_seconds=3600, max_distance=max_distance, max_entries=size)
+        hashes = [rng.getrandbits(64) for _ in range(size)]
+        verdict = {"decision": "SAFE_FOR_DONATION", "analyzedAt": "2026-01-01T00:00:00"}
+        start = time.perf_counter()
+        for image_hash in hashes:
+            index.add(image_hash, CONTEXT, verdict)
+        add_us = (time.perf_counter() - start) / size * 1_000_000
+
+        def timed(query_hashes: list) -> tuple:
+            samples, found = [], 0
+            for query in query_hashes:
+                started = time.perf_counter()
+                found += index.find(query, CONTEXT) is not None
+                samples.append((time.perf_counter() - started) * 1_000_000)
+            return samples, found
+
+        near = []
+        for image_hash in rng.choices(hashes, k=queries):
+            for bit in rng.sample(range(64), rng.randint(0, max_distance)):
+                image_hash ^= 1 << bit
+            near.append(image_hash)
+        near_samples, near_found = timed(near)
+        far_samples, _ = timed([rng.getrandbits(64) for _ in range(queries)])
+        print(f"{size:>8} {add_us:>8.1f} {percentile(near_samples, 0.5):>12.1f} {percentile(near_samples, 0.99):>12.1f} "
+              f"{percentile(far_samples, 0.5):>11.1f} {percentile(far_samples, 0.99):>11.1f} "
+              f"{near_found / queries * 100:>10.1f}%")
+
+
+def _render_dish(rng: random.Random) -> Image.Image:
+    image = Image.new("RGB", (1600, 1200), tuple(rng.randint(150, 255) for _ in range(3)))
+    draw = ImageDraw.Draw(image)
+    draw.ellipse((200, 100, 1400, 1100), fill=tuple(rng.randint(200, 255) for _ in range(3)))
+    for _ in range(rng.randint(8, 25)):
+        x, y = rng.randint(300, 1200), rng.randint(200, 900)
+        radius = rng.randint(30, 180)
+        draw.ellipse((x, y, x + radius, y + radius), fill=tuple(rng.randint(0, 255) for _ in range(3)))
+    return image
+
+
+def _hash(image_bytes: bytes) -> int:
+    if IMAGE_PREPROCESS_ENABLED:
+        return preprocess_image(image_bytes, dhash_size=8)[2]["dhash"]
+    return compute_dhash(image_bytes)
+
+
+def _jpeg(image: Image.Image, quality: int = 90) -> bytes:
+    output = io.BytesIO()
+    image.save(output, format="JPEG", quality=quality)
+    return output.getvalue()
+
+
+VARIANTS = {
+    "recompressed q60": lambda image: _jpeg(image, 60),
+    "downscaled 50%": lambda image: _jpeg(image.resize((800, 600))),
+    "cropped 3%": lambda image: _jpeg(image.crop((24, 18, 1576, 1182))),
+    "brightened 10%": lambda image: _jpeg(ImageEnhance.Brightness(image).enhance(1.1)),
+    "rotated 3 deg": lambda image: _jpeg(image.rotate(3, fillcolor=(255, 255, 255))),
+}
+
+
+def bench_robustness(scenes: int, max_distance: int, rng: random.Random):
+    dishes = [_render_dish(rng) for _ in range(scenes)]
+    originals = [_hash(_jpeg(dish)) for dish in dishes]
+
+    print(f"\ndHash distance to the original over {scenes} synthetic dishes (match if <= {max_distance})")
+    print(f"{'variant':<18} {'median':>7} {'max':>5} {'matched':>8}")
+    for name, variant in VARIANTS.items():
+        distances = [(_hash(variant(dish)) ^ original).bit_count()
+                     for dish, original in zip(dishes, originals)]
+        matched = sum(distance <= max_distance for distance in distances)
+        print(f"{name:<18} {statistics.median(distances):>7g} {max(distances):>5} {matched / scenes * 100:>7.0f}%")
+
+    between = [(a ^ b).bit_count() for i, a in enumerate(originals) for b in originals[i + 1:]]
+    false_matches = sum(distance <= max_distance for distance in between)
+    print(f"{'different dishes':<18} {statistics.median(between):>7g} {min(between):>5} (min) "
+          f"{false_matches} of {len(between)} pairs within threshold")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="1000,10000,50000")
+    parser.add_argument("--queries", type=int, default=2000)
+    parser.add_argument("--scenes", type=int, default=20)
+    parser.add_argument("--max-distance", type=int, default=6)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    bench_lookups([int(size) for size in args.sizes.split(",")], args.queries, args.max_distance, rng)
+    bench_robustness(args.scenes, args.max_distance, rng)
+
+
+if __name__ == "__main__":
+    main()
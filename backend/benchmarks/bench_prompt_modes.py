@@ -0,0 +1,112 @@
+"""
+Benchmark: request payload, tokens and latency per prompt mode.
+
+Part 1 (offline) sizes what each variant sends besides the image: system
+prompt, a sample user prompt and, in compact mode, the response schema, with
+a rough ~4 characters per token estimate.
+
+Part 2 replays the same items through benchmarks/shadow_eval.py once per
+variant (a fresh process each, since the mode is read at import) and puts
+the summaries side by side: prompt and output tokens as reported by the
+backend, end-to-end and model call latency, parse fallback rate, decision
+agreement with the labels and with the first variant (normally full/full).
+
+Variants are MODE/VERBOSITY pairs; verbosity only applies to compact mode.
+Token counts and latencies are only meaningful against the real model; with
+--backend local they come from the stand-in's estimates and fixed latency.
+
+Usage:
+    python benchmarks/bench_prompt_modes.py --manifest eval/manifest.jsonl --parallel 4
+    python benchmarks/bench_prompt_modes.py --synthetic 40 --backend local --env LOCAL_BACKEND_LATENCY_MS=300
+    python benchmarks/bench_prompt_modes.py --payload-only
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from system_prompt import build_user_prompt, get_response_schema, get_system_prompt  # noqa: E402
+
+SHADOW_EVAL = os.path.join(os.path.dirname(os.path.abspath(__file__)), "shadow_eval.py")
+DEFAULT_VARIANTS = "full/full,compact/full,compact/short,compact/verdict"
+
+
+def payload_sizes(variants: list):
+    print("Request payload besides the image (characters, ~tokens at 4 chars/token)")
+    print(f"{'variant':<16} {'system':>8} {'user':>6} {'schema':>7} {'total':>7} {'~tokens':>8}")
+    for mode, verbosity in variants:
+        system = len(get_system_prompt(mode))
+        user = len(build_user_prompt(mode, verbosity, "2025-01-01T10:00:00", "2025-01-01T10:30:00",
+                                     "2025-01-01T11:00:00.000000", 1.0, 0.5))
+        schema = len(json.dumps(get_response_schema(verbosity))) if mode == "compact" else 0
+        total = system + user + schema
+        print(f"{mode + '/' + verbosity:<16} {system:>8} {user:>6} {schema:>7} {total:>7} {total // 4:>8}")
+
+
+def run_variant(mode: str, verbosity: str, args, output: str, baseline: str = None) -> dict:
+    command = [sys.executable, SHADOW_EVAL, "--backend", args.backend, "--parallel", str(args.parallel),
+               "--output", output,
+               "--env", f"ANALYSIS_PROMPT_MODE={mode}", "--env", f"ANALYSIS_REASONING_VERBOSITY={verbosity}"]
+    command += ["--manifest", args.manifest] if args.manifest else ["--synthetic", str(args.synthetic)]
+    for assignment in args.env:
+        command += ["--env", assignment]
+    if baseline:
+        command += ["--baseline", baseline]
+    subprocess.run(command, check=True, stdout=subprocess.DEVNULL, env={**os.environ, "PYTHONWARNINGS": "ignore"})
+    with open(output, "r", encoding="utf-8") as f:
+        return json.load(f)["summary"]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    source = parser.add_mutually_exclusive_group()
+    source.add_argument("--manifest", help="JSONL manifest of labelled images (see shadow_eval.py)")
+    source.add_argument("--synthetic", type=int, metavar="N", help="generate N rule-labelled noise images")
+    parser.add_argument("--backend", default=os.getenv("ANALYZER_BACKEND", "gemini"))
+    parser.add_argument("--parallel", type=int, default=4)
+    parser.add_argument("--env", action="append", default=[], metavar="KEY=VALUE",
+                        help="passed through to shadow_eval.py")
+    parser.add_argument("--variants", default=DEFAULT_VARIANTS, help="comma-separated MODE/VERBOSITY pairs")
+    parser.add_argument("--payload-only", action="store_true", help="only print the offline payload sizes")
+    args = parser.parse_args()
+
+    variants = [tuple(variant.strip().split("/")) for variant in args.variants.split(",")]
+    payload_sizes(variants)
+    if args.payload_only:
+        return
+    if not args.manifest and not args.synthetic:
+        parser.error("--manifest or --synthetic is required unless --payload-only is given")
+
+    print(f"\nReplay through the {args.backend} backend, parallel {args.parallel}")
+    print(f"{'variant':<16} {'prompt tok':>10} {'output tok':>10} {'e2e p50':>8} {'e2e p90':>8} "
+          f"{'model p50':>9} {'fallback':>8} {'labels':>7} {'vs first':>8}")
+    with tempfile.TemporaryDirectory(prefix="bench-prompt-modes-") as work_dir:
+        baseline = None
+        for mode, verbosity in variants:
+            output = os.path.join(work_dir, f"{mode}-{verbosity}.json")
+            summary = run_variant(mode, verbosity, args, output, baseline)
+            baseline = baseline or output
+
+            def rate(section: dict) -> str:
+                value = section.get("decision", {}).get("rate")
+                return f"{value * 100:.1f}%" if value is not None else "-"
+
+            tokens = summary["tokens"]
+            latency = summary["latency_ms"]
+            fallback = summary["parse_fallback_rate"]
+            print(f"{mode + '/' + verbosity:<16} "
+                  f"{tokens.get('promptTokens', {}).get('mean', float('nan')):>10.1f} "
+                  f"{tokens.get('outputTokens', {}).get('mean', float('nan')):>10.1f} "
+                  f"{latency['end_to_end']['p50']:>8.1f} {latency['end_to_end']['p90']:>8.1f} "
+                  f"{latency['model_call']['p50']:>9.1f} "
+                  f"{(f'{fallback * 100:.1f}%' if fallback is not None else '-'):>8} "
+                  f"{rate(summary['labels']):>7} {rate(summary.get('baseline', {})) if 'baseline' in summary else '-':>8}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+"""
+Benchmark: serving modes under the same stubbed-model load.
+
+Starts the API in each serving mode with ANALYZER_BACKEND=local (fixed model
+latency, no quota used) and a throwaway data directory, drives it with
+benchmarks/load_test.py at the same request rate, and prints each run's
+throughput and latency percentiles. Modes:
+
+    flask-dev         python app.py (Werkzeug development server)
+    gunicorn-sync     gunicorn sync workers, one request per process (sqlite log)
+    gunicorn-gthread  gunicorn.conf.py defaults: 1 worker, 32 threads
+    gunicorn-gevent   gunicorn.conf.py with GUNICORN_WORKER_CLASS=gevent
+
+Usage:
+    python benchmarks/bench_serving.py [--rps 40] [--duration 20] [--latency-ms 1500]
+                                       [--modes flask-dev,gunicorn-gthread] [--sync-workers 4]
+"""
+
+import argparse
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+
+BACKEND_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+LOAD_TEST = os.path.join(BACKEND_DIR, "benchmarks", "load_test.py")
+
+MODES = ("flask-dev", "gunicorn-sync", "gunicorn-gthread", "gunicorn-gevent")
+
+
+def _server_command(mode: str, port: int, sync_workers: int) -> tuple:
+    """Return (argv, extra environment) for a serving mode."""
+    gunicorn = [sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py", "--bind", f"127.0.0.1:{port}",
+                "--access-logfile", "/dev/null"]
+    if mode == "flask-dev":
+        return [sys.executable, "app.py"], {"PORT": str(port)}
+    if mode == "gunicorn-sync":
+        # Gunicorn silently switches sync to gthread when threads > 1
+        return gunicorn + ["app:create_app()"], {"GUNICORN_WORKER_CLASS": "sync", "GUNICORN_WORKERS": str(sync_workers),
+                                                 "GUNICORN_THREADS": "1", "ANALYSIS_STORAGE_BACKEND": "sqlite"}
+    if mode == "gunicorn-gthread":
+        return gunicorn + ["app:create_app()"], {"GUNICORN_WORKER_CLASS": "gthread"}
+    if mode == "gunicorn-gevent":
+        return gunicorn + ["app:create_app()"], {"GUNICORN_WORKER_CLASS": "gevent"}
+    raise ValueError(f"Unknown mode '{mode}'")
+
+
+def _wait_healthy(port: int, timeout: float = 30) -> bool:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            with urllib.request.urlopen(f"http://127.0.0.1:{port}/api/health", timeout=1) as response:
+                if response.status == 200:
+                    return True
+        except OSError:
+            time.sleep(0.2)
+    return False
+
+
+def run_mode(mode: str, args, port: int) -> str:
+    data_dir = tempfile.mkdtemp(prefix=f"bench-serving-{mode}-")
+    argv, extra_env = _server_command(mode, port, args.sync_workers)
+    env = {
+        **os.environ,
+        "ANALYZER_BACKEND": "local",
+        "LOCAL_BACKEND_LATENCY_DISTRIBUTION": "fixed",
+        "LOCAL_BACKEND_LATENCY_MS": str(args.latency_ms),
+        "ANALYSIS_DATA_DIR": data_dir,
+        "ANALYSIS_DB_IMPORT_CSV": "false",
+        "ANALYSIS_DB_FILE": os.path.join(data_dir, "food_analysis_log.db"),
+        # Measure the serving mode itself, not admission control
+        "RATE_LIMIT_ENABLED": "false",
+        "ADMISSION_MAX_IN_FLIGHT": "0",
+        **extra_env
+    }
+    server = subprocess.Popen(argv, cwd=BACKEND_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        if not _wait_healthy(port):
+            return "server did not become healthy"
+        output = subprocess.run(
+            [sys.executable, LOAD_TEST, "--url", f"http://127.0.0.1:{port}", "--rps", str(args.rps),
+             "--duration", str(args.duration), "--concurrency", str(args.concurrency)],
+            cwd=BACKEND_DIR, capture_output=True, text=True
+        ).stdout
+        return "\n".join(line for line in output.splitlines() if not line.startswith(("Target", "Offering")))
+    finally:
+        server.terminate()
+        try:
+            server.wait(timeout=30)
+        except subprocess.TimeoutExpired:
+            server.kill()
+        shutil.rmtree(data_dir, ignore_errors=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rps", type=float, default=40)
+    parser.add_argument("--duration", type=float, default=20)
+    parser.add_argument("--latency-ms", type=float, default=1500, help="Stubbed model latency")
+    parser.add_argument("--concurrency", type=int, default=256, help="Load generator in-flight limit")
+    parser.add_argument("--sync-workers", type=int, default=4)
+    parser.add_argument("--modes", default=",".join(MODES))
+    parser.add_argument("--port", type=int, default=5099)
+    args = parser.parse_args()
+
+    print(f"{os.cpu_count()} CPUs, stubbed model latency {args.latency_ms:g}ms, "
+          f"{args.rps:g} rps for {args.duration:g}s per mode")
+    for mode in args.modes.split(","):
+        print(f"\n== {mode}")
+        print(run_mode(mode.strip(), args, args.port))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,140 @@
+"""
+Benchmark: cold-start cost of the API process.
+
+Part 1 runs `python -X importtime -c "import app"` and breaks the import time
+down by top-level package (self time summed over each package's modules), so
+a new heavy dependency on the startup path shows up by name.
+
+Part 2 starts fresh interpreters and times, in each, importing app (which
+builds the app via create_app()), the first /api/health response and the
+first analysis. Scenarios:
+
+    gemini        default deployment; the first analysis is represented by the
+                  client setup it pays before its network call (warm_up)
+    gemini-eager  ANALYZER_EAGER_INIT=true, client set up inside create_app()
+    local         ANALYZER_BACKEND=local with zero model latency, first
+                  analysis measured end to end through the test client
+
+No network calls are made; a placeholder GEMINI_API_KEY is used when none is
+set. Numbers are medians over --runs fresh processes; "process" is the wall
+time from spawning the interpreter to the end of the last phase.
+
+Usage:
+    python benchmarks/bench_startup.py [--runs 5] [--top 15]
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from collections import defaultdict
+
+BACKEND_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+
+SCENARIOS = {
+    "gemini": {"ANALYZER_BACKEND": "gemini", "ANALYZER_EAGER_INIT": "false"},
+    "gemini-eager": {"ANALYZER_BACKEND": "gemini", "ANALYZER_EAGER_INIT": "true"},
+    "local": {"ANALYZER_BACKEND": "local", "ANALYZER_EAGER_INIT": "false", "LOCAL_BACKEND_LATENCY_MS": "0",
+              "LOCAL_BACKEND_LATENCY_DISTRIBUTION": "fixed"},
+}
+
+_CHILD = r"""
+import io, json, sys, time
+from datetime import datetime, timedelta
+timings = {}
+started = time.perf_counter()
+import app
+timings["import_app"] = time.perf_counter() - started
+
+client = app.app.test_client()
+mark = time.perf_counter()
+assert client.get("/api/health").status_code == 200
+timings["first_health"] = time.perf_counter() - mark
+
+mark = time.perf_counter()
+if app.get_analyzer_backend().name == "local":
+    from PIL import Image
+    image = io.BytesIO()
+    Image.new("RGB", (64, 64), (200, 120, 40)).save(image, format="JPEG")
+    image.seek(0)
+    response = client.post("/api/analyze-food", data={
+        "image": (image, "startup.jpg"),
+        "preparationTime": (datetime.now() - timedelta(hours=1)).isoformat(),
+        "packageTime": (datetime.now() - timedelta(minutes=30)).isoformat()
+    })
+    assert response.status_code == 200, response.get_data(as_text=True)
+else:
+    app.get_analyzer_backend().warm_up()
+timings["first_analysis"] = time.perf_counter() - mark
+print(json.dumps(timings))
+"""
+
+
+def _env(extra: dict, data_dir: str) -> dict:
+    env = {**os.environ, "PYTHONWARNINGS": "ignore", "ANALYSIS_DATA_DIR": data_dir, **extra}
+    env.setdefault("GEMINI_API_KEY", "benchmark-placeholder-key")
+    return env
+
+
+def import_breakdown(top: int, data_dir: str):
+    stderr = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import app"],
+        cwd=BACKEND_DIR, env=_env(SCENARIOS["gemini"], data_dir), capture_output=True, text=True, check=True
+    ).stderr
+
+    by_package = defaultdict(int)
+    total = 0
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, raw_name = line[len("import time:"):].split("|")
+        name = raw_name.strip()
+        by_package[name.split(".")[0]] += int(self_us)
+        if raw_name.rstrip() == " app":
+            total = int(cumulative_us)
+
+    print(f"import app: {total / 1000:.1f}ms cumulative (gemini backend, lazy client)")
+    print(f"{'package':<32} {'self ms':>8}")
+    for package, self_us in sorted(by_package.items(), key=lambda item: -item[1])[:top]:
+        print(f"{package:<32} {self_us / 1000:>8.1f}")
+    heavy = [name for name in ("google", "grpc", "IPython") if name in by_package]
+    print(f"model client packages imported at startup: {', '.join(heavy) if heavy else 'none'}")
+
+
+def run_scenario(name: str, runs: int, data_dir: str) -> dict:
+    samples = defaultdict(list)
+    for _ in range(runs):
+        started = time.perf_counter()
+        output = subprocess.run(
+            [sys.executable, "-c", _CHILD], cwd=BACKEND_DIR, env=_env(SCENARIOS[name], data_dir),
+            capture_output=True, text=True, check=True
+        ).stdout
+        samples["process"].append(time.perf_counter() - started)
+        for phase, seconds in json.loads(output.strip().splitlines()[-1]).items():
+            samples[phase].append(seconds)
+    return {phase: statistics.median(values) for phase, values in samples.items()}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=15)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix="bench-startup-") as data_dir:
+        import_breakdown(args.top, data_dir)
+
+        print(f"\nTime to first response, median of {args.runs} fresh processes (ms)")
+        print(f"{'scenario':<14} {'import app':>11} {'1st health':>11} {'1st analysis':>13} {'process':>9}")
+        for name in SCENARIOS:
+            result = run_scenario(name, args.runs, data_dir)
+            print(f"{name:<14} {result['import_app'] * 1000:>11.1f} {result['first_health'] * 1000:>11.1f} "
+                  f"{result['first_analysis'] * 1000:>13.1f} {result['process'] * 1000:>9.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+"""
+Benchmark: peak memory held per in-flight upload.
+
+Runs each upload-handling path in a fresh subprocess against the same large
+JPEG, spooled to a temporary file exactly as Werkzeug spools a multipart
+upload, and reports the Python heap peak (tracemalloc) and the growth of the
+process RSS high-water mark (resource.getrusage) while the request payload is
+built. Paths:
+
+    legacy     file.read() + base64 str for the image part (previous behaviour)
+    current    image_upload.read_upload() memory map + raw bytes image part
+
+each with IMAGE_PREPROCESS_ENABLED off (the original is sent to the model)
+and on (the original is only decoded and re-encoded). When google-generativeai
+is installed the image part is also converted to the protobuf Blob the client
+sends, which is where the legacy base64 str was decoded back to bytes.
+
+Usage:
+    python benchmarks/bench_upload_memory.py [--width 3000] [--height 2250] [--quality 95]
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+BACKEND_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+
+SCENARIOS = (
+    ("legacy", False), ("current", False),
+    ("legacy", True), ("current", True)
+)
+
+_CHILD = r"""
+import base64, json, os, resource, shutil, sys, tempfile, tracemalloc
+sys.path.insert(0, BACKEND_DIR)
+from werkzeug.datastructures import FileStorage
+from analyzer_backends import AnalysisRequest, GeminiBackend
+from image_preprocessor import preprocess_image
+from image_upload import read_upload, sniff_image_type
+try:
+    from google.generativeai import protos
+except ImportError:
+    protos = None
+
+def rss_kb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+spool = tempfile.SpooledTemporaryFile(max_size=500 * 1024, mode="rb+")
+with open(IMAGE_PATH, "rb") as source:
+    shutil.copyfileobj(source, spool)
+spool.seek(0)
+upload = FileStorage(stream=spool, filename="upload.jpg")
+
+baseline = rss_kb()
+tracemalloc.start()
+
+if PATH == "legacy":
+    image_bytes = upload.read()
+    mime_type = "image/jpeg"
+else:
+    image_bytes = read_upload(upload)
+    mime_type = sniff_image_type(image_bytes)
+if PREPROCESS:
+    image_bytes, mime_type, _ = preprocess_image(image_bytes)
+if PATH == "legacy":
+    part = {"mime_type": mime_type, "data": base64.b64encode(image_bytes).decode("utf-8")}
+else:
+    part = GeminiBackend._contents(AnalysisRequest("", image_bytes, mime_type, {}))[1]
+blob = protos.Blob(part) if protos is not None else part
+
+_, heap_peak = tracemalloc.get_traced_memory()
+print(json.dumps({"heap_peak": heap_peak, "rss_growth": (rss_kb() - baseline) * 1024,
+                  "protobuf": protos is not None}))
+"""
+
+
+def run_scenario(image_path: str, path: str, preprocess: bool) -> dict:
+    code = (f"BACKEND_DIR = {BACKEND_DIR!r}\nIMAGE_PATH = {image_path!r}\n"
+            f"PATH = {path!r}\nPREPROCESS = {preprocess!r}\n") + _CHILD
+    env = {**os.environ, "PYTHONWARNINGS": "ignore"}
+    output = subprocess.run([sys.executable, "-c", code], cwd=BACKEND_DIR, env=env,
+                            capture_output=True, text=True, check=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def _make_image(args) -> str:
+    from PIL import Image
+
+    image = Image.effect_noise((args.width, args.height), 64).convert("RGB")
+    handle, image_path = tempfile.mkstemp(suffix=".jpg", prefix="bench-upload-")
+    with os.fdopen(handle, "wb") as output:
+        image.save(output, format="JPEG", quality=args.quality)
+    return image_path
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--width", type=int, default=3000)
+    parser.add_argument("--height", type=int, default=2250)
+    parser.add_argument("--quality", type=int, default=95)
+    args = parser.parse_args()
+
+    image_path = _make_image(args)
+    try:
+        upload_size = os.path.getsize(image_path)
+        print(f"Upload: {args.width}x{args.height} JPEG, {upload_size / 1_048_576:.2f} MiB")
+        print(f"{'path':<10} {'preprocess':<11} {'heap peak':>12} {'x upload':>9} {'RSS growth':>12} {'x upload':>9}")
+        for path, preprocess in SCENARIOS:
+            result = run_scenario(image_path, path, preprocess)
+            print(f"{path:<10} {'on' if preprocess else 'off':<11} "
+                  f"{result['heap_peak'] / 1_048_576:>9.2f} MiB {result['heap_peak'] / upload_size:>8.2f}x "
+                  f"{result['rss_growth'] / 1_048_576:>9.2f} MiB {result['rss_growth'] / upload_size:>8.2f}x")
+        if not result["protobuf"]:
+            print("google-generativeai not installed: protobuf Blob conversion not measured")
+    finally:
+        os.unlink(image_path)
+
+
+if __name__ == "__main__":
+    main()
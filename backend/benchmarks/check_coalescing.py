@@ -0,0 +1,220 @@
+"""
+Concurrency check: identical in-flight analyses share one model call.
+
+Fires bursts of simultaneous POST /api/analyze-food requests at an in-process
+app backed by the local analyzer (counting its model calls) and a throwaway
+data directory, then checks for each scenario:
+
+    identical   N copies of one image and time pair -> 1 model call,
+                N identical verdicts, N-1 marked coalesced, N audit entries
+    stream      the same with every other request on the SSE route
+                (?stream=true) -> still 1 model call; every stream ends in
+                the shared verdict, with its fields sent as events
+    distinct    N different images -> N model calls, nothing coalesced
+    outage      N copies while the model is unavailable -> 1 model call,
+                every caller gets the 503, nothing logged
+    sequential  the same request twice in a row -> not coalesced (the
+                second is a verdict-cache hit instead)
+
+Exits non-zero if any check fails.
+
+Usage:
+    python benchmarks/check_coalescing.py [--clients 16] [--latency-ms 300] [--rounds 5]
+"""
+
+import argparse
+import io
+import json
+import os
+import random
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+DATA_DIR = tempfile.mkdtemp(prefix="check-coalescing-")
+os.environ.update({
+    "ANALYZER_BACKEND": "local",
+    "ANALYSIS_DATA_DIR": DATA_DIR,
+    "GEMINI_MAX_RETRIES": "0",
+    "NEAR_DUPLICATE_MODE": "off",
+    "RATE_LIMIT_ENABLED": "false"
+})
+
+from PIL import Image  # noqa: E402
+
+import app as app_module  # noqa: E402
+import csv_storage  # noqa: E402
+from analyzer_backends import LocalBackend, set_analyzer_backend  # noqa: E402
+
+
+class CountingBackend(LocalBackend):
+    """Local backend that counts generate() and stream() calls and can simulate an outage."""
+
+    def __init__(self, latency_ms: float):
+        super().__init__(latency_ms=latency_ms, distribution="fixed")
+        self.calls = 0
+        self.unavailable = False
+        self._count_lock = threading.Lock()
+
+    def generate(self, request, timeout):
+        with self._count_lock:
+            self.calls += 1
+        if self.unavailable:
+            from google.api_core import exceptions
+            time.sleep(self.latency_ms / 1000)
+            raise exceptions.ServiceUnavailable("simulated outage")
+        return super().generate(request, timeout)
+
+    def stream(self, request, timeout):
+        with self._count_lock:
+            self.calls += 1
+        return super().stream(request, timeout)
+
+
+def _image(seed: int) -> bytes:
+    """Deterministic noise JPEG, so the same seed always gives the same bytes."""
+    pixels = random.Random(seed).randbytes(320 * 240 * 3)
+    output = io.BytesIO()
+    Image.frombytes("RGB", (320, 240), pixels).save(output, format="JPEG")
+    return output.getvalue()
+
+
+def _burst(client_factory, uploads: list, streamed: set = frozenset()) -> list:
+    """
+    POST every upload at the same instant and return the responses in order.
+
+    Uploads whose index is in `streamed` use the SSE route; their body is the
+    final "result" event, with the names of the "field" events before it
+    under "_fields".
+    """
+    barrier = threading.Barrier(len(uploads))
+    responses = [None] * len(uploads)
+    preparation_time = (datetime.now() - timedelta(hours=1)).isoformat()
+    package_time = (datetime.now() - timedelta(minutes=30)).isoformat()
+
+    def worker(index: int, data: bytes):
+        client = client_factory()
+        barrier.wait()
+        response = client.post("/api/analyze-food" + ("?stream=true" if index in streamed else ""), data={
+            "image": (io.BytesIO(data), f"burst-{index}.jpg"),
+            "preparationTime": preparation_time,
+            "packageTime": package_time
+        })
+        if index not in streamed:
+            responses[index] = (response.status_code, response.get_json())
+            return
+        body, fields = {}, []
+        for event in response.get_data(as_text=True).split("\n\n"):
+            if not event.strip():
+                continue
+            name, data_line = event.split("\n", 1)
+            payload = json.loads(data_line.split("data: ", 1)[1])
+            if name == "event: field":
+                fields.append(payload["field"])
+            elif name == "event: result":
+                body = dict(payload, _fields=fields)
+        responses[index] = (response.status_code, body)
+
+    threads = [threading.Thread(target=worker, args=(i, data)) for i, data in enumerate(uploads)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return responses
+
+
+def _audit_entries() -> int:
+    csv_storage.flush_audit_log()
+    return len(csv_storage.get_analysis_history(limit=100_000))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--clients", type=int, default=16)
+    parser.add_argument("--latency-ms", type=float, default=300)
+    parser.add_argument("--rounds", type=int, default=5)
+    args = parser.parse_args()
+
+    backend = CountingBackend(args.latency_ms)
+    set_analyzer_backend(backend)
+    flask_app = app_module.create_app({"TESTING": True})
+    failures = []
+
+    def check(label: str, condition: bool, detail: str):
+        print(f"  [{'ok' if condition else 'FAIL'}] {label}: {detail}")
+        if not condition:
+            failures.append(label)
+
+    seed = 0
+    for round_number in range(1, args.rounds + 1):
+        print(f"round {round_number}")
+
+        seed += 1
+        calls, entries = backend.calls, _audit_entries()
+        responses = _burst(flask_app.test_client, [_image(seed)] * args.clients)
+        coalesced = sum(1 for _, body in responses if body.get("coalesced"))
+        decisions = {body.get("decision") for _, body in responses}
+        check("identical", backend.calls - calls == 1 and coalesced == args.clients - 1 and len(decisions) == 1
+              and all(status == 200 for status, _ in responses) and _audit_entries() - entries == args.clients,
+              f"{backend.calls - calls} model call(s), {coalesced} coalesced, decisions {sorted(decisions)}, "
+              f"{_audit_entries() - entries} audit entries")
+
+        seed += 1
+        calls, entries = backend.calls, _audit_entries()
+        streamed = set(range(0, args.clients, 2))
+        responses = _burst(flask_app.test_client, [_image(seed)] * args.clients, streamed)
+        coalesced = sum(1 for _, body in responses if body.get("coalesced"))
+        decisions = {body.get("decision") for _, body in responses}
+        complete = all("decision" in body.get("_fields", []) for index, (_, body) in enumerate(responses)
+                       if index in streamed)
+        check("stream", backend.calls - calls == 1 and coalesced == args.clients - 1 and len(decisions) == 1
+              and None not in decisions and complete and _audit_entries() - entries == args.clients,
+              f"{backend.calls - calls} model call(s), {coalesced} coalesced, decisions {sorted(map(str, decisions))}, "
+              f"field events on every stream {complete}, {_audit_entries() - entries} audit entries")
+
+        calls = backend.calls
+        uploads = []
+        for _ in range(args.clients):
+            seed += 1
+            uploads.append(_image(seed))
+        responses = _burst(flask_app.test_client, uploads)
+        coalesced = sum(1 for _, body in responses if body.get("coalesced"))
+        check("distinct", backend.calls - calls == args.clients and coalesced == 0,
+              f"{backend.calls - calls} model calls, {coalesced} coalesced")
+
+        seed += 1
+        calls, entries = backend.calls, _audit_entries()
+        backend.unavailable = True
+        try:
+            responses = _burst(flask_app.test_client, [_image(seed)] * args.clients)
+        finally:
+            backend.unavailable = False
+        statuses = sorted({status for status, _ in responses})
+        check("outage", backend.calls - calls == 1 and statuses == [503] and _audit_entries() == entries,
+              f"{backend.calls - calls} model call(s), statuses {statuses}, {_audit_entries() - entries} audit entries")
+        app_module.upstream_caller.breaker.record_success()
+
+        seed += 1
+        calls = backend.calls
+        first = _burst(flask_app.test_client, [_image(seed)])[0][1]
+        second = _burst(flask_app.test_client, [_image(seed)])[0][1]
+        check("sequential", backend.calls - calls == 1 and not second.get("coalesced") and second.get("cached"),
+              f"{backend.calls - calls} model call(s), second cached={second.get('cached')} "
+              f"coalesced={bool(second.get('coalesced'))}, first decision {first.get('decision')}")
+
+    print(f"\ncoalescing stats: {app_module.inflight_analyses.stats()}")
+    if failures:
+        print(f"{len(failures)} check(s) failed")
+        sys.exit(1)
+    print("all checks passed")
+
+
+if __name__ == "__main__":
+    try:
+        main()
+    finally:
+        shutil.rmtree(DATA_DIR, ignore_errors=True)
@@ -0,0 +1,202 @@
+"""
+Record/replay check: archived model responses reproduce /api/analyze-food.
+
+Runs an in-process app against the local analyzer backend (lognormal latency,
+a share of malformed responses) wrapped in a RecordReplayBackend with a
+throwaway archive, with the verdict cache and near-duplicate reuse off so
+every request reaches the backend. Phases:
+
+    record          N distinct images through the JSON route and M through
+                    the SSE route, all responses archived
+    replay-instant  the same requests, MODEL_REPLAY_LATENCY_SCALE=0 -> every
+                    verdict identical to the recorded one, no backend calls
+    replay-original the same requests at scale 1 -> identical verdicts and
+                    latencies close to the recorded ones
+    miss            an unseen image in strict replay mode -> 503, nothing logged,
+                    counted as a miss
+
+Prints latency percentiles per phase and the archive size per response.
+Exits non-zero if any check fails.
+
+Usage:
+    python benchmarks/check_replay.py [--requests 40] [--streamed 8] [--latency-ms 400] [--parallel 8]
+"""
+
+import argparse
+import io
+import json
+import os
+import random
+import shutil
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+DATA_DIR = tempfile.mkdtemp(prefix="check-replay-")
+os.environ.update({
+    "ANALYZER_BACKEND": "local",
+    "ANALYSIS_DATA_DIR": DATA_DIR,
+    "GEMINI_MAX_RETRIES": "0",
+    "VERDICT_CACHE_ENABLED": "false",
+    "NEAR_DUPLICATE_MODE": "off",
+    "RATE_LIMIT_ENABLED": "false"
+})
+
+from PIL import Image  # noqa: E402
+
+from _stats import percentile  # noqa: E402
+import app as app_module  # noqa: E402
+import csv_storage  # noqa: E402
+from analyzer_backends import LocalBackend, set_analyzer_backend  # noqa: E402
+from response_archive import RecordReplayBackend, ResponseArchive  # noqa: E402
+
+# Fields that must come back byte-for-byte identical from a replay
+COMPARED_FIELDS = ("classification", "decision", "risk_level", "confidence", "reasoning", "advisory", "modelUsage")
+
+
+class CountingBackend(LocalBackend):
+    def __init__(self, latency_ms: float, malformed_rate: float, seed: int):
+        super().__init__(latency_ms=latency_ms, distribution="lognormal", malformed_rate=malformed_rate, seed=seed)
+        self.calls = 0
+        self._count_lock = threading.Lock()
+
+    def _respond(self, request, timeout, delay_fraction=1.0):
+        with self._count_lock:
+            self.calls += 1
+        return super()._respond(request, timeout, delay_fraction)
+
+
+def _image(seed: int) -> bytes:
+    pixels = random.Random(seed).randbytes(320 * 240 * 3)
+    output = io.BytesIO()
+    Image.frombytes("RGB", (320, 240), pixels).save(output, format="JPEG")
+    return output.getvalue()
+
+
+def _post(flask_app, item: dict) -> tuple:
+    now = datetime.now()
+    started = time.perf_counter()
+    response = flask_app.test_client().post(
+        "/api/analyze-food" + ("?stream=true" if item["stream"] else ""),
+        data={
+            "image": (io.BytesIO(item["image"]), f"{item['id']}.jpg"),
+            "preparationTime": (now - timedelta(hours=item["preparation_hours"])).isoformat(),
+            "packageTime": (now - timedelta(hours=item["package_hours"])).isoformat()
+        }
+    )
+    if item["stream"]:
+        events = response.get_data(as_text=True).split("\n\n")
+        result = next(json.loads(event.split("data: ", 1)[1]) for event in reversed(events)
+                      if event.startswith("event: result"))
+    else:
+        result = response.get_json()
+    return {field: result.get(field) for field in COMPARED_FIELDS + ("error",)}, time.perf_counter() - started
+
+
+def _audit_entries() -> int:
+    csv_storage.flush_audit_log()
+    return len(csv_storage.get_analysis_history(limit=100_000))
+
+
+def run_phase(flask_app, items: list, parallel: int) -> tuple:
+    with ThreadPoolExecutor(max_workers=parallel) as pool:
+        outcomes = list(pool.map(lambda item: _post(flask_app, item), items))
+    return [verdict for verdict, _ in outcomes], [seconds for _, seconds in outcomes]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=40)
+    parser.add_argument("--streamed", type=int, default=8)
+    parser.add_argument("--latency-ms", type=float, default=400)
+    parser.add_argument("--malformed-rate", type=float, default=0.2)
+    parser.add_argument("--parallel", type=int, default=8)
+    args = parser.parse_args()
+
+    rng = random.Random(11)
+    items = []
+    for index in range(args.requests + args.streamed):
+        preparation = rng.uniform(0.2, 3.5)
+        items.append({
+            "id": f"replay-{index}",
+            "image": _image(1000 + index),
+            "preparation_hours": preparation,
+            "package_hours": preparation * rng.uniform(0.3, 1.0),
+            "stream": index >= args.requests
+        })
+
+    inner = CountingBackend(args.latency_ms, args.malformed_rate, seed=5)
+    archive = ResponseArchive(os.path.join(DATA_DIR, "model_responses.db"))
+    flask_app = app_module.create_app({"TESTING": True})
+    failures = []
+
+    def check(label: str, condition: bool, detail: str):
+        print(f"  [{'ok' if condition else 'FAIL'}] {label}: {detail}")
+        if not condition:
+            failures.append(label)
+
+    def use(mode: str, latency_scale: float = 0.0) -> RecordReplayBackend:
+        backend = RecordReplayBackend("local", lambda: inner, mode, archive=archive, latency_scale=latency_scale)
+        set_analyzer_backend(backend)
+        return backend
+
+    def report(name: str, latencies: list):
+        print(f"{name:<16} p50 {percentile(latencies, 0.5) * 1000:8.1f}ms  p90 {percentile(latencies, 0.9) * 1000:8.1f}ms  "
+              f"max {max(latencies) * 1000:8.1f}ms")
+
+    use("record")
+    recorded, recorded_latency = run_phase(flask_app, items, args.parallel)
+    report("record", recorded_latency)
+    check("record", inner.calls == len(items) and archive.count() == len(items),
+          f"{inner.calls} backend calls, {archive.count()} archived, "
+          f"{sum(1 for verdict in recorded if verdict['error'])} parse-error verdicts")
+
+    for name, scale in (("replay-instant", 0.0), ("replay-original", 1.0)):
+        calls = inner.calls
+        backend = use("replay", scale)
+        replayed, latency = run_phase(flask_app, items, args.parallel)
+        report(name, latency)
+        mismatched = [item["id"] for item, before, after in zip(items, recorded, replayed) if before != after]
+        check(name, not mismatched and inner.calls == calls and backend.stats()["hits"] == len(items),
+              f"{len(items) - len(mismatched)}/{len(items)} identical verdicts, {inner.calls - calls} backend calls, "
+              f"stats {backend.stats()['hits']} hits / {backend.stats()['misses']} misses"
+              + (f", mismatched {mismatched[:5]}" if mismatched else ""))
+        if scale == 1.0:
+            ratio = percentile(latency, 0.5) / percentile(recorded_latency, 0.5)
+            check("original latency", 0.8 <= ratio <= 1.25, f"replay p50 / record p50 = {ratio:.2f}")
+
+    backend = use("replay")
+    entries = _audit_entries()
+    now = datetime.now()
+    response = flask_app.test_client().post("/api/analyze-food", data={
+        "image": (io.BytesIO(_image(99)), "unseen.jpg"),
+        "preparationTime": (now - timedelta(hours=1)).isoformat(),
+        "packageTime": (now - timedelta(minutes=30)).isoformat()
+    })
+    check("miss", response.status_code == 503 and _audit_entries() == entries and backend.stats()["misses"] == 1,
+          f"status {response.status_code}, {_audit_entries() - entries} audit entries, "
+          f"{backend.stats()['misses']} miss(es)")
+
+    with sqlite3.connect(archive.db_path) as conn:
+        blobs = conn.execute("SELECT chunks, request FROM responses").fetchall()
+    stored = sum(len(chunks) + len(request) for chunks, request in blobs)
+    raw = sum(len(zlib.decompress(chunks)) + len(zlib.decompress(request)) for chunks, request in blobs)
+    print(f"\narchive: {len(blobs)} responses, {stored / len(blobs):.0f} bytes stored per response "
+          f"({raw / len(blobs):.0f} uncompressed, {raw / stored:.1f}x)")
+    if failures:
+        print(f"{len(failures)} check(s) failed")
+        sys.exit(1)
+    print("all checks passed")
+
+
+if __name__ == "__main__":
+    try:
+        main()
+    finally:
+        shutil.rmtree(DATA_DIR, ignore_errors=True)
@@ -0,0 +1,185 @@
+"""
+Load test: drive /api/analyze-food at a target request rate.
+
+Requests are issued open-loop: request i is scheduled at start + i / rps
+whether or not earlier requests have finished, and latency is measured from
+the scheduled time, so a saturated server shows up as growing latency rather
+than a silently lower send rate. Reports status counts, achieved throughput
+and latency percentiles.
+
+Two targets:
+    --url http://host:5000   an already running server (start it with
+                             ANALYZER_BACKEND=local to avoid spending quota)
+    (default)                the Flask app in-process via its test client,
+                             with ANALYZER_BACKEND defaulting to "local"
+
+Each request uploads a distinct generated JPEG so the verdict cache does not
+short-circuit the model path; pass --same-image to measure cache hits instead.
+
+Usage:
+    python benchmarks/load_test.py [--rps 20] [--duration 30] [--concurrency 64]
+                                   [--url URL] [--image PATH] [--same-image] [--stream]
+"""
+
+import argparse
+import io
+import json
+import os
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+import uuid
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from PIL import Image  # noqa: E402
+
+from _stats import percentile  # noqa: E402
+
+
+def _make_image(index: int, size: int = 512) -> bytes:
+    """Generate a small JPEG whose bytes differ per index."""
+    color = (index * 37 % 256, index * 91 % 256, index * 53 % 256)
+    buffer = io.BytesIO()
+    # The comment keeps the bytes (and so the verdict cache key) unique
+    Image.new("RGB", (size, size), color).save(buffer, "JPEG", quality=85, comment=f"load-test-{index}")
+    return buffer.getvalue()
+
+
+def _form_fields(minutes_ago: int = 30) -> dict:
+    timestamp = (datetime.now() - timedelta(minutes=minutes_ago)).strftime("%Y-%m-%dT%H:%M")
+    return {"preparationTime": timestamp, "packageTime": timestamp}
+
+
+def _multipart(fields: dict, image_bytes: bytes, filename: str) -> tuple:
+    """Encode a multipart/form-data body, returning (body, content type)."""
+    boundary = uuid.uuid4().hex
+    parts = []
+    for name, value in fields.items():
+        parts.append(
+            f"--{boundary}\r\nContent-Disposition: form-data; name=\"{name}\"\r\n\r\n{value}\r\n".encode("utf-8")
+        )
+    parts.append(
+        f"--{boundary}\r\nContent-Disposition: form-data; name=\"image\"; filename=\"{filename}\"\r\n"
+        f"Content-Type: image/jpeg\r\n\r\n".encode("utf-8") + image_bytes + b"\r\n"
+    )
+    parts.append(f"--{boundary}--\r\n".encode("utf-8"))
+    return b"".join(parts), f"multipart/form-data; boundary={boundary}"
+
+
+class _HttpTarget:
+    def __init__(self, base_url: str, stream: bool):
+        self.url = base_url.rstrip("/") + "/api/analyze-food" + ("?stream=true" if stream else "")
+
+    def post(self, image_bytes: bytes, filename: str) -> tuple:
+        body, content_type = _multipart(_form_fields(), image_bytes, filename)
+        req = urllib.request.Request(self.url, data=body, headers={"Content-Type": content_type}, method="POST")
+        try:
+            with urllib.request.urlopen(req, timeout=300) as response:
+                return response.status, response.read()
+        except urllib.error.HTTPError as e:
+            return e.code, e.read()
+
+
+class _InProcessTarget:
+    def __init__(self, stream: bool):
+        os.environ.setdefault("ANALYZER_BACKEND", "local")
+        # Every in-process request comes from the same client address
+        os.environ.setdefault("RATE_LIMIT_ENABLED", "false")
+        from app import app
+
+        self.client = app.test_client()
+        self.path = "/api/analyze-food" + ("?stream=true" if stream else "")
+
+    def post(self, image_bytes: bytes, filename: str) -> tuple:
+        data = {**_form_fields(), "image": (io.BytesIO(image_bytes), filename)}
+        response = self.client.post(self.path, data=data, content_type="multipart/form-data")
+        return response.status_code, response.get_data()
+
+
+def _outcome(status: int, body: bytes) -> str:
+    """Classify a response as ok, verdict error (error: true), or the HTTP status."""
+    if status != 200:
+        return str(status)
+    if body.startswith(b"event:"):
+        return "ok-stream" if b"event: result" in body else "stream-error"
+    try:
+        return "verdict-error" if json.loads(body).get("error") else "ok"
+    except ValueError:
+        return "bad-json"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rps", type=float, default=20)
+    parser.add_argument("--duration", type=float, default=30, help="Seconds of request arrivals")
+    parser.add_argument("--concurrency", type=int, default=64, help="Maximum in-flight requests")
+    parser.add_argument("--url", help="Base URL of a running server (default: in-process)")
+    parser.add_argument("--image", help="JPEG to upload instead of generated images")
+    parser.add_argument("--same-image", action="store_true", help="Upload identical bytes every time")
+    parser.add_argument("--stream", action="store_true", help="Use the SSE streaming response")
+    args = parser.parse_args()
+
+    target = _HttpTarget(args.url, args.stream) if args.url else _InProcessTarget(args.stream)
+    total = int(args.rps * args.duration)
+
+    if args.image:
+        with open(args.image, "rb") as f:
+            fixed_image = f.read()
+    else:
+        fixed_image = _make_image(0) if args.same_image else None
+    images = [fixed_image or _make_image(i) for i in range(total)]
+
+    latencies = []
+    service_times = []
+    outcomes = Counter()
+    lock = threading.Lock()
+
+    def send(index: int, scheduled: float):
+        sent = time.perf_counter()
+        try:
+            status, body = target.post(images[index], f"load-{index}.jpg")
+            outcome = _outcome(status, body)
+        except Exception as e:
+            outcome = f"exception:{type(e).__name__}"
+        done = time.perf_counter()
+        with lock:
+            outcomes[outcome] += 1
+            latencies.append(done - scheduled)
+            service_times.append(done - sent)
+
+    print(f"Target: {args.url or 'in-process test client'} "
+          f"(ANALYZER_BACKEND={os.getenv('ANALYZER_BACKEND', 'gemini') if args.url is None else 'server-side'})")
+    print(f"Offering {total} requests at {args.rps:g} rps over {args.duration:g}s, max {args.concurrency} in flight")
+
+    executor = ThreadPoolExecutor(max_workers=args.concurrency, thread_name_prefix="load")
+    start = time.perf_counter()
+    for i in range(total):
+        scheduled = start + i / args.rps
+        delay = scheduled - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+        executor.submit(send, i, scheduled)
+    executor.shutdown(wait=True)
+    elapsed = time.perf_counter() - start
+
+    if "csv_storage" in sys.modules:
+        sys.modules["csv_storage"].flush_audit_log()
+
+    print(f"Completed {len(latencies)} requests in {elapsed:.1f}s: {len(latencies) / elapsed:.1f} req/s achieved")
+    print("Outcomes: " + ", ".join(f"{k}={v}" for k, v in sorted(outcomes.items())))
+    if latencies:
+        for label, samples in (("latency (from schedule)", latencies), ("service time", service_times)):
+            print(f"{label:<24} p50={percentile(samples, 0.5) * 1000:8.0f}ms  "
+                  f"p90={percentile(samples, 0.9) * 1000:8.0f}ms  "
+                  f"p99={percentile(samples, 0.99) * 1000:8.0f}ms  "
+                  f"max={max(samples) * 1000:8.0f}ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,446 @@
+"""
+Shadow evaluation: verdict quality vs. latency on a labelled image set.
+
+Replays a manifest of labelled food photos through analyze_food_image() with
+a pool of worker threads and reports, in one place, whether a tuning change
+(generation config, prompt, image size) kept the verdicts and what it did to
+speed:
+
+    agreement   classification / decision / risk_level against the labels
+                (risk also within one level), the decision confusion matrix
+                and unsafe accepts (labelled DISCARD, served as donatable)
+    shadow      with --baseline, the same agreement against a previous run's
+                report, item by item, plus the list of items that changed
+    latency     end to end and model call p50 / p90 / p99, attempts
+    tokens      prompt and output token counts per model call
+    parsing     which extract_json_with_level() level parsed each response
+                ("direct" means no fallback was needed), and failures
+
+The verdict cache, near-duplicate reuse and request coalescing are switched
+off so every item reaches the model; the time-temperature prescreen stays on
+because it is part of the production verdict, and its verdicts are counted
+separately.
+
+Manifest (JSONL, image paths relative to the manifest; hours are relative to
+the replay time because elapsed time drives the verdict; any subset of the
+expected fields may be given):
+
+    {"id": "dal-01", "image": "images/dal-01.jpg", "preparationHoursAgo": 1.5,
+     "packageHoursAgo": 1.0, "foodCategory": "high_risk",
+     "expected": {"classification": "EDIBLE", "decision": "SAFE_FOR_DONATION", "risk_level": "LOW"}}
+
+Responses recorded with MODEL_ARCHIVE_MODE=record (see response_archive) can
+be replayed with --env MODEL_ARCHIVE_MODE=replay, so changes to parsing or
+post-processing are evaluated without calling the model again.
+
+--synthetic N replaces the manifest with N noise images labelled by the
+2 h / 4 h rule, which the local backend follows; it exercises the harness
+offline, it says nothing about model quality.
+
+Usage:
+    python benchmarks/shadow_eval.py --manifest eval/manifest.jsonl --parallel 8 --output baseline.json
+    python benchmarks/shadow_eval.py --manifest eval/manifest.jsonl --parallel 8 \\
+        --config max_output_tokens=1024 --env IMAGE_MAX_EDGE=768 --baseline baseline.json --fail-under 0.98
+    python benchmarks/shadow_eval.py --manifest eval/manifest.jsonl --env MODEL_ARCHIVE_MODE=replay \\
+        --env MODEL_ARCHIVE_FILE=eval/responses.db --baseline baseline.json
+    python benchmarks/shadow_eval.py --synthetic 60 --backend local --env LOCAL_BACKEND_MALFORMED_RATE=0.2
+"""
+
+import argparse
+import io
+import json
+import os
+import random
+import sys
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from _stats import percentile  # noqa: E402
+
+VERDICT_FIELDS = ("classification", "decision", "risk_level")
+RISK_ORDER = ("VERY_LOW", "LOW", "MODERATE", "HIGH", "VERY_HIGH")
+
+
+def _parse_assignment(text: str) -> tuple:
+    key, sep, value = text.partition("=")
+    if not sep:
+        raise argparse.ArgumentTypeError(f"expected KEY=VALUE, got '{text}'")
+    return key.strip(), value
+
+
+def load_manifest(path: str) -> list:
+    """Read a JSONL manifest, loading every image into memory up front."""
+    from image_upload import sniff_image_type
+
+    base_dir = os.path.dirname(os.path.abspath(path))
+    items = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line_number, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            entry = json.loads(line)
+            with open(os.path.join(base_dir, entry["image"]), "rb") as image_file:
+                image_bytes = image_file.read()
+            mime_type = sniff_image_type(image_bytes)
+            if mime_type is None:
+                raise ValueError(f"{path}:{line_number}: {entry['image']} is not a JPEG, PNG, GIF or WEBP image")
+            items.append({
+                "id": str(entry.get("id", line_number)),
+                "image_bytes": image_bytes,
+                "mime_type": mime_type,
+                "preparation_hours_ago": float(entry["preparationHoursAgo"]),
+                "package_hours_ago": float(entry.get("packageHoursAgo", entry["preparationHoursAgo"])),
+                "food_category": entry.get("foodCategory"),
+                "expected": {field: entry["expected"][field] for field in VERDICT_FIELDS
+                             if field in entry.get("expected", {})}
+            })
+    return items
+
+
+def synthetic_items(count: int, seed: int) -> list:
+    """Noise images with times spread across the 2 h / 4 h thresholds, labelled by that rule."""
+    from PIL import Image
+
+    rng = random.Random(seed)
+    items = []
+    for index in range(count):
+        output = io.BytesIO()
+        Image.frombytes("RGB", (320, 240), rng.randbytes(320 * 240 * 3)).save(output, format="JPEG")
+        preparation = rng.uniform(0.2, 6.0)
+        package = preparation * rng.uniform(0.3, 1.0)
+        hours = max(preparation, package)
+        if hours > 4:
+            expected = ("NOT-EDIBLE", "DISCARD", "HIGH")
+        elif hours > 2:
+            expected = ("EDIBLE", "SAFE_WITH_ADVISORY", "MODERATE")
+        else:
+            expected = ("EDIBLE", "SAFE_FOR_DONATION", "LOW")
+        items.append({
+            "id": f"synthetic-{index:04d}",
+            "image_bytes": output.getvalue(),
+            "mime_type": "image/jpeg",
+            "preparation_hours_ago": preparation,
+            "package_hours_ago": package,
+            "food_category": None,
+            "expected": dict(zip(VERDICT_FIELDS, expected))
+        })
+    return items
+
+
+def make_capturing_backend(inner):
+    """
+    Wrap a backend so each worker thread can see the raw responses and call
+    times behind its last analysis. Coalescing is off, so the model call runs
+    on the thread that called analyze_food_image().
+    """
+    from analyzer_backends import AnalyzerBackend
+
+    class CapturingBackend(AnalyzerBackend):
+        name = inner.name
+
+        def __init__(self):
+            self._local = threading.local()
+
+        def attempts(self) -> list:
+            attempts = getattr(self._local, "attempts", [])
+            self._local.attempts = []
+            return attempts
+
+        def _attempt(self) -> dict:
+            if not hasattr(self._local, "attempts"):
+                self._local.attempts = []
+            attempt = {"seconds": None, "response": None}
+            self._local.attempts.append(attempt)
+            return attempt
+
+        def generate(self, request, timeout):
+            attempt = self._attempt()
+            started = time.perf_counter()
+            try:
+                response = inner.generate(request, timeout)
+            finally:
+                attempt["seconds"] = time.perf_counter() - started
+            attempt["response"] = response
+            return response
+
+        def stream(self, request, timeout):
+            return inner.stream(request, timeout)
+
+        def warm_up(self):
+            inner.warm_up()
+
+    return CapturingBackend()
+
+
+def run_item(item: dict, backend) -> dict:
+    import food_analyzer
+    from resilience import UpstreamUnavailableError
+
+    now = datetime.now()
+    preparation_time = (now - timedelta(hours=item["preparation_hours_ago"])).isoformat()
+    package_time = (now - timedelta(hours=item["package_hours_ago"])).isoformat()
+    backend.attempts()
+
+    started = time.perf_counter()
+    error = None
+    try:
+        result = food_analyzer.analyze_food_image(
+            item["image_bytes"], preparation_time, package_time, item["mime_type"], item["food_category"]
+        )
+    except UpstreamUnavailableError as e:
+        result, error = None, f"upstream_unavailable: {e}"
+    except Exception as e:
+        result, error = None, f"{type(e).__name__}: {e}"
+    latency = time.perf_counter() - started
+    attempts = backend.attempts()
+
+    answered = [attempt for attempt in attempts if attempt["response"] is not None]
+    parse_level = None
+    usage = {}
+    if answered:
+        response = answered[-1]["response"]
+        try:
+            parse_level = food_analyzer.extract_json_with_level(response.text.strip())[1]
+        except json.JSONDecodeError:
+            parse_level = "failed"
+        usage = {"promptTokens": response.prompt_tokens, "outputTokens": response.output_tokens}
+
+    if result is None:
+        source = "unavailable"
+    elif result.get("error"):
+        source = "error"
+        error = result.get("reasoning", {}).get("final_assessment")
+    elif result.get("ruleBased"):
+        source = "rule"
+    else:
+        source = "model"
+
+    return {
+        "id": item["id"],
+        "expected": item["expected"],
+        "verdict": {field: result.get(field) for field in VERDICT_FIELDS + ("confidence",)} if result else None,
+        "source": source,
+        "error": error,
+        "latencyMs": round(latency * 1000, 2),
+        "modelMs": round(sum(attempt["seconds"] for attempt in attempts) * 1000, 2) if attempts else None,
+        "attempts": len(attempts),
+        "parseLevel": parse_level,
+        **usage
+    }
+
+
+def _risk_within_one(expected: str, actual: str) -> bool:
+    if expected not in RISK_ORDER or actual not in RISK_ORDER:
+        return expected == actual
+    return abs(RISK_ORDER.index(expected) - RISK_ORDER.index(actual)) <= 1
+
+
+def agreement(rows: list, reference_of) -> dict:
+    """Per-field agreement between each row's verdict and reference_of(row)."""
+    summary = {}
+    for field in VERDICT_FIELDS:
+        pairs = [(reference_of(row).get(field), row["verdict"].get(field)) for row in rows
+                 if row["verdict"] is not None and reference_of(row) and field in reference_of(row)]
+        if pairs:
+            summary[field] = {"n": len(pairs), "rate": round(sum(a == b for a, b in pairs) / len(pairs), 4)}
+            if field == "risk_level":
+                summary["risk_level_within_one"] = {
+                    "n": len(pairs), "rate": round(sum(_risk_within_one(a, b) for a, b in pairs) / len(pairs), 4)
+                }
+    return summary
+
+
+def summarize(rows: list, baseline: dict = None) -> dict:
+    answered = [row for row in rows if row["verdict"] is not None]
+    model_rows = [row for row in rows if row["attempts"]]
+    parse_levels = Counter(row["parseLevel"] for row in rows if row["parseLevel"] is not None)
+    parsed = sum(parse_levels.values())
+    summary = {
+        "items": len(rows),
+        "sources": dict(Counter(row["source"] for row in rows)),
+        "labels": agreement(rows, lambda row: row["expected"]),
+        "unsafe_accepts": sum(
+            1 for row in answered
+            if row["expected"].get("decision") == "DISCARD" and row["verdict"]["decision"] != "DISCARD"
+        ),
+        "decision_confusion": dict(Counter(
+            f"{row['expected']['decision']} -> {row['verdict']['decision']}"
+            for row in answered if "decision" in row["expected"]
+        )),
+        "latency_ms": {
+            name: {
+                "p50": round(percentile(samples, 0.5), 1),
+                "p90": round(percentile(samples, 0.9), 1),
+                "p99": round(percentile(samples, 0.99), 1)
+            }
+            for name, samples in (
+                ("end_to_end", [row["latencyMs"] for row in rows]),
+                ("model_call", [row["modelMs"] for row in model_rows])
+            )
+        },
+        "attempts_per_model_item": round(sum(row["attempts"] for row in model_rows) / len(model_rows), 3)
+        if model_rows else None,
+        "tokens": {},
+        "parse_levels": {level: {"n": count, "rate": round(count / parsed, 4)}
+                         for level, count in sorted(parse_levels.items())},
+        "parse_fallback_rate": round(1 - parse_levels.get("direct", 0) / parsed, 4) if parsed else None
+    }
+    for field in ("promptTokens", "outputTokens"):
+        counts = [row[field] for row in rows if row.get(field) is not None]
+        if counts:
+            summary["tokens"][field] = {
+                "mean": round(sum(counts) / len(counts), 1),
+                "p50": percentile(counts, 0.5),
+                "p90": percentile(counts, 0.9),
+                "max": max(counts)
+            }
+
+    if baseline is not None:
+        previous = {row["id"]: row["verdict"] for row in baseline["items"] if row["verdict"] is not None}
+        summary["baseline"] = agreement(rows, lambda row: previous.get(row["id"]))
+        summary["baseline_changes"] = [
+            {"id": row["id"], **{
+                field: f"{previous[row['id']].get(field)} -> {row['verdict'].get(field)}"
+                for field in VERDICT_FIELDS if previous[row["id"]].get(field) != row["verdict"].get(field)
+            }}
+            for row in answered
+            if row["id"] in previous
+            and any(previous[row["id"]].get(field) != row["verdict"].get(field) for field in VERDICT_FIELDS)
+        ]
+        baseline_latency = baseline["summary"]["latency_ms"]
+        summary["baseline_latency_ms"] = baseline_latency
+        summary["baseline_tokens"] = baseline["summary"]["tokens"]
+    return summary
+
+
+def print_report(summary: dict, settings: dict):
+    print(f"\n{summary['items']} items, backend {settings['backend']}, parallel {settings['parallel']}, "
+          f"{settings['wall_seconds']:.1f}s wall")
+    if settings["config"] or settings["env"]:
+        print(f"overrides: config {settings['config']} env {settings['env']}")
+    print(f"sources: {summary['sources']}")
+
+    def agreement_lines(title: str, section: dict):
+        print(title)
+        for field, values in section.items():
+            print(f"  {field:<24} {values['rate'] * 100:6.1f}%  (n={values['n']})")
+
+    agreement_lines("agreement with labels", summary["labels"])
+    print(f"  unsafe accepts           {summary['unsafe_accepts']}")
+    if summary["decision_confusion"]:
+        print("decision confusion (label -> verdict)")
+        for pair, count in sorted(summary["decision_confusion"].items()):
+            print(f"  {pair:<44} {count}")
+    if "baseline" in summary:
+        agreement_lines("agreement with baseline", summary["baseline"])
+        for change in summary["baseline_changes"][:20]:
+            print(f"  changed {change}")
+        if len(summary["baseline_changes"]) > 20:
+            print(f"  ... {len(summary['baseline_changes']) - 20} more")
+
+    print("latency (ms)          p50      p90      p99" + ("   baseline p50 / p90" if "baseline" in summary else ""))
+    for name, values in summary["latency_ms"].items():
+        line = f"  {name:<14} {values['p50']:>8.1f} {values['p90']:>8.1f} {values['p99']:>8.1f}"
+        if "baseline" in summary and name in summary["baseline_latency_ms"]:
+            previous = summary["baseline_latency_ms"][name]
+            line += f"   {previous['p50']:>8.1f} / {previous['p90']:.1f}"
+        print(line)
+    print(f"  attempts per model item: {summary['attempts_per_model_item']}")
+    for field, values in summary["tokens"].items():
+        line = f"tokens {field:<13} mean {values['mean']:>7.1f}  p50 {values['p50']}  p90 {values['p90']}  max {values['max']}"
+        if "baseline" in summary and field in summary["baseline_tokens"]:
+            line += f"   baseline mean {summary['baseline_tokens'][field]['mean']}"
+        print(line)
+    levels = ", ".join(f"{level} {values['rate'] * 100:.1f}%" for level, values in summary["parse_levels"].items())
+    print(f"parse levels: {levels or 'none'}; fallback rate {summary['parse_fallback_rate']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--manifest", help="JSONL manifest of labelled images")
+    source.add_argument("--synthetic", type=int, metavar="N", help="generate N rule-labelled noise images")
+    parser.add_argument("--backend", default=os.getenv("ANALYZER_BACKEND", "gemini"),
+                        help="analyzer backend (ANALYZER_BACKEND)")
+    parser.add_argument("--parallel", type=int, default=4)
+    parser.add_argument("--config", type=_parse_assignment, action="append", default=[], metavar="KEY=VALUE",
+                        help="override a GENERATION_CONFIG entry (value parsed as JSON when possible)")
+    parser.add_argument("--env", type=_parse_assignment, action="append", default=[], metavar="KEY=VALUE",
+                        help="set an environment variable before the analyzer modules load")
+    parser.add_argument("--output", help="write the per-item report as JSON")
+    parser.add_argument("--baseline", help="previous --output report to compare verdicts against")
+    parser.add_argument("--fail-under", type=float,
+                        help="exit non-zero if decision agreement (with the baseline if given, else the labels) "
+                             "is below this fraction")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    os.environ.update({
+        "ANALYZER_BACKEND": args.backend,
+        "VERDICT_CACHE_ENABLED": "false",
+        "VERDICT_CACHE_DISK_DIR": "",
+        "NEAR_DUPLICATE_MODE": "off",
+        "REQUEST_COALESCING_ENABLED": "false"
+    })
+    os.environ.update(dict(args.env))
+    # Settings from backend/.env (e.g. GEMINI_API_KEY) apply as they do for the app
+    from dotenv import load_dotenv
+
+    load_dotenv()
+
+    import food_analyzer
+    from analyzer_backends import get_analyzer_backend, set_analyzer_backend
+
+    for key, value in args.config:
+        try:
+            food_analyzer.GENERATION_CONFIG[key] = json.loads(value)
+        except json.JSONDecodeError:
+            food_analyzer.GENERATION_CONFIG[key] = value
+
+    items = load_manifest(args.manifest) if args.manifest else synthetic_items(args.synthetic, args.seed)
+    baseline = None
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+
+    backend = make_capturing_backend(get_analyzer_backend())
+    set_analyzer_backend(backend)
+    backend.warm_up()
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.parallel) as pool:
+        rows = list(pool.map(lambda item: run_item(item, backend), items))
+    settings = {
+        "backend": args.backend,
+        "parallel": args.parallel,
+        "manifest": args.manifest,
+        "synthetic": args.synthetic,
+        "config": dict(args.config),
+        "env": dict(args.env),
+        "generation_config": dict(food_analyzer.GENERATION_CONFIG),
+        "wall_seconds": round(time.perf_counter() - started, 3),
+        "ran_at": datetime.now().isoformat()
+    }
+    summary = summarize(rows, baseline)
+    print_report(summary, settings)
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({"settings": settings, "summary": summary, "items": rows}, f, indent=2)
+        print(f"report written to {args.output}")
+
+    if args.fail_under is not None:
+        section = summary["baseline"] if baseline is not None else summary["labels"]
+        rate = section.get("decision", {}).get("rate", 0.0)
+        if rate < args.fail_under:
+            print(f"decision agreement {rate:.4f} is below --fail-under {args.fail_under}")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
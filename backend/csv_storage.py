@@ -1,36 +1,52 @@
 """
 CSV Storage Module - Thread-safe CSV persistence for audit trail.
 Stores all food analysis requests and results for compliance and debugging.
+
+The module-level functions delegate to the storage backend selected by
+ANALYSIS_STORAGE_BACKEND ("csv" by default, or "sqlite").
 """
 
+import atexit
 import csv
+import io
 import os
 import threading
-from datetime import datetime
+from itertools import islice
 from typing import Optional
-import json
+
+from analysis_statistics import RunningStatistics, StoreStatistics
+from audit_writer import AUDIT_WRITER_ENABLED, AuditWriter
+from csv_tail import iter_rows_reverse
+from log_rotation import (
+    MANIFEST_FILENAME,
+    load_manifest,
+    open_segment_text,
+    read_segment,
+    rotate,
+    save_manifest,
+    should_rotate
+)
+from metrics import record_error, stage_timer
+from storage_backend import (
+    RECORD_FIELDS,
+    StorageBackend,
+    build_record,
+    record_matches,
+    summarize_statistics
+)
 
 # Thread lock for file operations
 _file_lock = threading.Lock()
 
 # Data directory
-DATA_DIR = os.path.join(os.path.dirname(__file__), "data")
+DATA_DIR = os.getenv("ANALYSIS_DATA_DIR", os.path.join(os.path.dirname(__file__), "data"))
 ANALYSIS_LOG_FILE = os.path.join(DATA_DIR, "food_analysis_log.csv")
 
+# Storage backend selection: "csv" or "sqlite"
+ANALYSIS_STORAGE_BACKEND = os.getenv("ANALYSIS_STORAGE_BACKEND", "csv").lower()
+
 # CSV headers
-CSV_HEADERS = [
-    "timestamp",
-    "image_filename",
-    "preparation_time",
-    "package_time",
-    "classification",
-    "decision",
-    "risk_level",
-    "confidence",
-    "reasoning_summary",
-    "advisory",
-    "error"
-]
+CSV_HEADERS = RECORD_FIELDS
 
 
 def _ensure_data_dir():
@@ -48,6 +64,307 @@ def _ensure_csv_file():
             writer.writerow(CSV_HEADERS)
 
 
+def _archive_dir() -> str:
+    """Directory holding rotated log segments and their manifest."""
+    return os.path.join(DATA_DIR, "archive")
+
+
+def _parse_cursor(cursor: str, active_id: str) -> tuple:
+    """Split a history cursor into (segment id, byte offset)."""
+    if ":" not in cursor:
+        # Cursors issued before rotation support were plain active-log offsets
+        return active_id, int(cursor)
+    segment_id, offset = cursor.rsplit(":", 1)
+    if not offset.isdigit():
+        raise ValueError("Invalid cursor")
+    return segment_id, int(offset)
+
+
+def _iter_lines(f, end: int):
+    """Decode lines of a binary file up to byte offset `end`, which falls on a row boundary."""
+    position = 0
+    for line in f:
+        position += len(line)
+        if position > end:
+            return
+        yield line.decode("utf-8")
+
+
+class CsvStorageBackend(StorageBackend):
+    """
+    Append-only CSV file backend (the original audit log format).
+
+    The active log is rotated into compressed archive segments according to
+    LOG_ROTATION; reads consult the segment manifest so only segments that
+    overlap the requested time range are opened.
+    """
+
+    name = "csv"
+
+    def __init__(self):
+        self._manifest = None
+        self._manifest_dir = None
+
+    def _load_manifest(self) -> dict:
+        """Return the cached segment manifest. Caller holds _file_lock."""
+        archive_dir = _archive_dir()
+        if self._manifest is None or self._manifest_dir != archive_dir:
+            is_new = not os.path.exists(os.path.join(archive_dir, MANIFEST_FILENAME))
+            self._manifest = load_manifest(archive_dir)
+            self._manifest_dir = archive_dir
+            if is_new:
+                _ensure_data_dir()
+                save_manifest(archive_dir, self._manifest)
+        return self._manifest
+
+    def append(self, record: dict):
+        self.append_many([record])
+
+    def append_many(self, records: list):
+        with _file_lock:
+            manifest = self._load_manifest()
+            if should_rotate(ANALYSIS_LOG_FILE, manifest):
+                rotate(ANALYSIS_LOG_FILE, _archive_dir(), manifest)
+            _ensure_csv_file()
+            with open(ANALYSIS_LOG_FILE, "a", newline="", encoding="utf-8") as f:
+                writer = csv.writer(f)
+                for record in records:
+                    writer.writerow([record[field] for field in CSV_HEADERS])
+
+    def rotate(self):
+        """Rotate the active log now, regardless of the rotation policy."""
+        with _file_lock:
+            manifest = self._load_manifest()
+            if os.path.exists(ANALYSIS_LOG_FILE):
+                rotate(ANALYSIS_LOG_FILE, _archive_dir(), manifest)
+            _ensure_csv_file()
+
+    def recent(self, limit: int = 100) -> list:
+        records, _ = self.query_history(limit=limit)
+        records.reverse()
+        return records
+
+    def query_history(
+        self,
+        limit: int = 50,
+        cursor: str = None,
+        classification: str = None,
+        decision: str = None,
+        start: str = None,
+        end: str = None
+    ) -> tuple:
+        # The cursor is "<segment id>:<byte offset where the oldest returned record starts>"
+        if limit <= 0:
+            return [], cursor
+
+        active_file = None
+        with _file_lock:
+            manifest = self._load_manifest()
+            active_id = manifest["active"]["id"]
+            segments = list(manifest["segments"])
+            if os.path.exists(ANALYSIS_LOG_FILE):
+                # Rows are only appended under the lock, so everything before the
+                # current size is complete. The open handle keeps reading the same
+                # file even if it is rotated away afterwards.
+                active_file = open(ANALYSIS_LOG_FILE, "rb")
+                active_end = os.path.getsize(ANALYSIS_LOG_FILE)
+
+        cursor_id, cursor_offset = _parse_cursor(cursor, active_id) if cursor else (None, None)
+        archive_dir = _archive_dir()
+        records = []
+        last_position = None
+
+        try:
+            sources = [{"id": active_id, "active": True}] + list(reversed(segments))
+            for source in sources:
+                # Segment ids are creation timestamps, so they sort oldest to newest
+                if cursor_id is not None and source["id"] > cursor_id:
+                    continue
+                end_offset = cursor_offset if source["id"] == cursor_id else None
+
+                if source.get("active"):
+                    if active_file is None:
+                        continue
+                    f = active_file
+                    end_offset = active_end if end_offset is None else min(end_offset, active_end)
+                else:
+                    if start and (source.get("last_timestamp") or "") < start:
+                        break
+                    first = source.get("first_timestamp") or ""
+                    if end and first[:len(end)] > end:
+                        continue
+                    try:
+                        f = io.BytesIO(read_segment(archive_dir, source))
+                    except FileNotFoundError:
+                        # Removed by retention since the manifest snapshot
+                        continue
+
+                for offset, row in iter_rows_reverse(f, end_offset):
+                    record = dict(zip(CSV_HEADERS, row))
+                    if start and record.get("timestamp", "") < start:
+                        # The log is in time order - nothing older can match
+                        return records, None
+                    if not record_matches(record, classification, decision, start, end):
+                        continue
+                    if len(records) == limit:
+                        # At least one more match exists - resume before the oldest returned record
+                        return records, last_position
+                    records.append(record)
+                    last_position = f"{source['id']}:{offset}"
+            return records, None
+        finally:
+            if active_file is not None:
+                active_file.close()
+
+    def sync(self):
+        with _file_lock:
+            if os.path.exists(ANALYSIS_LOG_FILE):
+                with open(ANALYSIS_LOG_FILE, "a", encoding="utf-8") as f:
+                    os.fsync(f.fileno())
+
+    def iter_records(self, start: int = 0):
+        # Positions count every record ever logged, including segments that
+        # retention has since deleted, so statistics watermarks stay valid.
+        # Like query_history, only the snapshot is taken under the lock so
+        # appends, rotation and sync are not blocked while the caller consumes.
+        active_file = None
+        with _file_lock:
+            manifest = self._load_manifest()
+            skip = max(start - manifest.get("deleted_records", 0), 0)
+            segments = list(manifest["segments"])
+            if os.path.exists(ANALYSIS_LOG_FILE):
+                active_file = open(ANALYSIS_LOG_FILE, "rb")
+                active_end = os.path.getsize(ANALYSIS_LOG_FILE)
+
+        archive_dir = _archive_dir()
+        try:
+            for segment in segments:
+                if skip >= segment["records"]:
+                    skip -= segment["records"]
+                    continue
+                try:
+                    f = open_segment_text(archive_dir, segment)
+                except FileNotFoundError:
+                    # Removed by retention since the manifest snapshot
+                    skip = 0
+                    continue
+                with f:
+                    yield from islice(csv.DictReader(f), skip, None)
+                skip = 0
+
+            if active_file is not None:
+                yield from islice(csv.DictReader(_iter_lines(active_file, active_end)), skip, None)
+        finally:
+            if active_file is not None:
+                active_file.close()
+
+    def count(self) -> int:
+        with _file_lock:
+            manifest = self._load_manifest()
+            archived = manifest.get("deleted_records", 0) + sum(s["records"] for s in manifest["segments"])
+            if not os.path.exists(ANALYSIS_LOG_FILE):
+                return archived
+            with open(ANALYSIS_LOG_FILE, "r", newline="", encoding="utf-8") as f:
+                return archived + sum(1 for _ in csv.DictReader(f))
+
+
+_backend_lock = threading.Lock()
+_backend = None
+_statistics = None
+_writer_lock = threading.Lock()
+_audit_writer = None
+
+
+def get_storage_backend() -> StorageBackend:
+    """Return the process-wide storage backend, creating it on first use."""
+    global _backend
+    if _backend is None:
+        with _backend_lock:
+            if _backend is None:
+                if ANALYSIS_STORAGE_BACKEND == "sqlite":
+                    from sqlite_storage import SqliteStorageBackend
+                    _backend = SqliteStorageBackend()
+                elif ANALYSIS_STORAGE_BACKEND == "csv":
+                    _backend = CsvStorageBackend()
+                else:
+                    raise ValueError(f"Unknown ANALYSIS_STORAGE_BACKEND '{ANALYSIS_STORAGE_BACKEND}'")
+    return _backend
+
+
+def set_storage_backend(backend: Optional[StorageBackend]):
+    """Replace the process-wide storage backend (None resets to the configured default)."""
+    global _backend, _statistics
+    flush_audit_log()
+    with _backend_lock:
+        if _backend is not None and _backend is not backend:
+            _backend.close()
+        _backend = backend
+        _statistics = None
+
+
+def get_running_statistics():
+    """
+    Return the statistics for the active backend.
+
+    Backends that aggregate in the store (SQLite) are queried on each read.
+    Otherwise, on first use, the persisted in-process counters are loaded and
+    caught up from the audit log; afterwards they are updated by
+    log_analysis(). Those counters require a single writer process.
+    """
+    global _statistics
+    if _statistics is None:
+        backend = get_storage_backend()
+        with _backend_lock:
+            if _statistics is None and backend.computes_statistics:
+                _statistics = StoreStatistics(backend)
+            elif _statistics is None:
+                state_file = os.path.join(DATA_DIR, f"analysis_statistics_{backend.name}.json")
+                _ensure_data_dir()
+                statistics = RunningStatistics(state_file)
+                statistics.bootstrap(backend)
+                _statistics = statistics
+    return _statistics
+
+
+def _write_records(records: list):
+    """Append records to the backend and fold them into the running statistics."""
+    # Bootstrap the counters before appending so new records are not counted twice
+    statistics = get_running_statistics()
+    get_storage_backend().append_many(records)
+    for record in records:
+        statistics.record(record)
+
+
+def _sync_backend():
+    get_storage_backend().sync()
+
+
+def get_audit_writer() -> Optional[AuditWriter]:
+    """Return the background audit writer, or None when writes are synchronous."""
+    global _audit_writer
+    if not AUDIT_WRITER_ENABLED:
+        return None
+    if _audit_writer is None:
+        with _writer_lock:
+            if _audit_writer is None:
+                _audit_writer = AuditWriter(_write_records, _sync_backend)
+    return _audit_writer
+
+
+def flush_audit_log():
+    """Drain the background writer (if any) and persist the statistics."""
+    global _audit_writer
+    with _writer_lock:
+        writer, _audit_writer = _audit_writer, None
+    if writer is not None:
+        writer.close()
+    if _statistics is not None:
+        _statistics.persist()
+
+
+atexit.register(flush_audit_log)
+
+
 def log_analysis(
     image_filename: str,
     preparation_time: str,
@@ -55,53 +372,31 @@ def log_analysis(
     analysis_result: dict
 ) -> bool:
     """
-    Log a food analysis result to the CSV file.
-    
+    Log a food analysis result to the audit trail.
+
+    With the background audit writer enabled the record is queued and
+    written in the next group commit; otherwise it is written immediately.
+
     Args:
         image_filename: Original filename of the uploaded image
         preparation_time: ISO format datetime string
         package_time: ISO format datetime string
         analysis_result: Dict containing the analysis result from food_analyzer
-    
+
     Returns:
-        bool: True if logging succeeded, False otherwise
+        bool: True if logging succeeded (or the record was queued), False otherwise
     """
     try:
-        with _file_lock:
-            _ensure_csv_file()
-            
-            # Extract reasoning summary
-            reasoning = analysis_result.get("reasoning", {})
-            if isinstance(reasoning, dict):
-                reasoning_summary = reasoning.get("final_assessment", str(reasoning))
-            else:
-                reasoning_summary = str(reasoning)
-            
-            # Truncate reasoning if too long
-            if len(reasoning_summary) > 500:
-                reasoning_summary = reasoning_summary[:497] + "..."
-            
-            row = [
-                datetime.now().isoformat(),
-                image_filename,
-                preparation_time,
-                package_time,
-                analysis_result.get("classification", "UNKNOWN"),
-                analysis_result.get("decision", "UNKNOWN"),
-                analysis_result.get("risk_level", "UNKNOWN"),
-                analysis_result.get("confidence", 0.0),
-                reasoning_summary,
-                analysis_result.get("advisory", ""),
-                analysis_result.get("error", False)
-            ]
-            
-            with open(ANALYSIS_LOG_FILE, "a", newline="", encoding="utf-8") as f:
-                writer = csv.writer(f)
-                writer.writerow(row)
-            
+        with stage_timer("audit_log"):
+            record = build_record(image_filename, preparation_time, package_time, analysis_result)
+            writer = get_audit_writer()
+            if writer is not None:
+                return writer.submit(record)
+            _write_records([record])
             return True
-            
+
     except Exception as e:
+        record_error("audit_log")
         print(f"Error logging analysis: {e}")
         return False
 
@@ -109,69 +404,78 @@ def log_analysis(
 def get_analysis_history(limit: int = 100) -> list:
     """
     Retrieve recent analysis history.
-    
+
     Args:
         limit: Maximum number of records to return
-    
+
     Returns:
         List of dicts containing analysis records
     """
     try:
-        with _file_lock:
-            if not os.path.exists(ANALYSIS_LOG_FILE):
-                return []
-            
-            with open(ANALYSIS_LOG_FILE, "r", encoding="utf-8") as f:
-                reader = csv.DictReader(f)
-                rows = list(reader)
-            
-            # Return most recent records
-            return rows[-limit:] if len(rows) > limit else rows
-            
+        return get_storage_backend().recent(limit)
+
     except Exception as e:
         print(f"Error reading analysis history: {e}")
         return []
 
 
-def get_statistics() -> dict:
+def query_analysis_history(
+    limit: int = 50,
+    cursor: str = None,
+    classification: str = None,
+    decision: str = None,
+    start: str = None,
+    end: str = None
+) -> dict:
+    """
+    Retrieve one page of analysis history, newest first.
+
+    Args:
+        limit: Maximum number of records in the page
+        cursor: Cursor returned with the previous page
+        classification: Only include this classification
+        decision: Only include this decision
+        start: Only include records at or after this ISO date/datetime
+        end: Only include records at or before this ISO date/datetime
+
+    Returns:
+        Dict with "records" and "nextCursor" (None on the last page)
+    """
+    records, next_cursor = get_storage_backend().query_history(
+        limit=limit,
+        cursor=cursor,
+        classification=classification,
+        decision=decision,
+        start=start,
+        end=end
+    )
+    return {"records": records, "nextCursor": next_cursor}
+
+
+def get_statistics(totals: dict = None) -> dict:
     """
     Get statistics about food analysis results.
-    
+
+    Totals come from get_running_statistics() and cover the whole audit trail.
+
+    Args:
+        totals: Totals already read from get_running_statistics(), if any
+
     Returns:
         Dict containing analysis statistics
     """
     try:
-        history = get_analysis_history(limit=10000)
-        
-        if not history:
-            return {
-                "total_analyses": 0,
-                "edible_count": 0,
-                "not_edible_count": 0,
-                "error_count": 0,
-                "edible_rate": 0.0
-            }
-        
-        total = len(history)
-        edible = sum(1 for r in history if r.get("classification") == "EDIBLE")
-        not_edible = sum(1 for r in history if r.get("classification") == "NOT-EDIBLE")
-        errors = sum(1 for r in history if r.get("error") == "True")
-        
-        return {
-            "total_analyses": total,
-            "edible_count": edible,
-            "not_edible_count": not_edible,
-            "error_count": errors,
-            "edible_rate": round(edible / total * 100, 2) if total > 0 else 0.0
-        }
-        
+        if totals is None:
+            totals = get_running_statistics().totals()
+        return summarize_statistics(
+            totals["total"],
+            totals["by_classification"].get("EDIBLE", 0),
+            totals["by_classification"].get("NOT-EDIBLE", 0),
+            totals["errors"]
+        )
+
     except Exception as e:
         print(f"Error calculating statistics: {e}")
-        return {
-            "total_analyses": 0,
-            "edible_count": 0,
-            "not_edible_count": 0,
-            "error_count": 0,
-            "edible_rate": 0.0,
-            "error": str(e)
-        }
+        stats = summarize_statistics(0, 0, 0, 0)
+        stats["error"] = str(e)
+        return stats
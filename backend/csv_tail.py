@@ -0,0 +1,92 @@
+"""
+CSV Tail Module - Read CSV records from the end of a file backwards.
+Lets history queries stop after the newest N matching rows instead of
+parsing the whole audit log.
+"""
+
+import csv
+import io
+import os
+
+# Bytes read per backward seek
+TAIL_BLOCK_SIZE = int(os.getenv("CSV_TAIL_BLOCK_SIZE", 64 * 1024))
+
+
+def _reverse_lines(f, end_offset: int, block_size: int):
+    """Yield (start_offset, line_bytes) for each physical line before end_offset, last first."""
+    position = end_offset
+    remainder = b""
+    while position > 0:
+        read_size = min(block_size, position)
+        position -= read_size
+        f.seek(position)
+        chunk = f.read(read_size) + remainder
+        lines = chunk.split(b"\n")
+        # The first piece may be a partial line - keep it for the next block
+        remainder = lines[0]
+        line_end = position + len(chunk)
+        for line in reversed(lines[1:]):
+            line_end -= len(line) + 1
+            yield line_end + 1, line
+    if remainder:
+        yield 0, remainder
+
+
+def iter_rows_reverse(source, end_offset: int = None, block_size: int = TAIL_BLOCK_SIZE):
+    """
+    Yield (start_offset, row) for each CSV record in `source`, newest first.
+
+    Records whose quoted fields span several physical lines are reassembled:
+    fragments are joined backwards until the quotes balance and the record
+    parses to a complete row. The header row (offset 0) is not yielded.
+
+    Args:
+        source: Path of the CSV file to read, or a seekable binary file object
+        end_offset: Only consider bytes before this offset (default: file size)
+        block_size: Bytes read per backward seek
+
+    Yields:
+        tuple of (byte offset where the record starts, list of field strings)
+    """
+    if isinstance(source, (str, os.PathLike)):
+        with open(source, "rb") as f:
+            yield from _iter_file_rows_reverse(f, end_offset, block_size)
+    else:
+        yield from _iter_file_rows_reverse(source, end_offset, block_size)
+
+
+def _iter_file_rows_reverse(f, end_offset: int, block_size: int):
+    if end_offset is None:
+        f.seek(0, os.SEEK_END)
+        end_offset = f.tell()
+
+    pending = b""
+    expected_fields = None
+    for offset, line in _reverse_lines(f, end_offset, block_size):
+        record = line + b"\n" + pending if pending else line
+        if not record.strip(b"\r\n"):
+            continue
+        if record.count(b'"') % 2:
+            pending = record
+            continue
+
+        if offset == 0:
+            return
+        row = next(csv.reader(io.StringIO(record.decode("utf-8", errors="replace"))), [])
+        if expected_fields is None:
+            expected_fields = _header_length(f)
+        if len(row) < expected_fields:
+            pending = record
+            continue
+
+        pending = b""
+        yield offset, row
+
+
+def _header_length(f) -> int:
+    """Return the number of columns in the header row."""
+    position = f.tell()
+    f.seek(0)
+    header = f.readline().decode("utf-8", errors="replace")
+    f.seek(position)
+    return len(next(csv.reader(io.StringIO(header)), []))
@@ -1,77 +1,84 @@
 """
 Food Analyzer Module - Google Gemini 2.5 Flash Integration
 Provides AI-powered food safety analysis for donation decisions.
+The model call goes through the backend selected by ANALYZER_BACKEND.
 """
 
-import os
+import hashlib
 import json
-import base64
+import os
 import re
 from datetime import datetime
 from typing import Optional
 
-import google.generativeai as genai
-from dotenv import load_dotenv
+from admission_control import OverloadedError, model_call_limiter
+from analyzer_backends import AnalysisRequest, get_analyzer_backend
+from image_preprocessor import IMAGE_PREPROCESS_ENABLED, ImagePreprocessingError, compute_dhash, preprocess_image
+from json_scanner import scan_json_object
+from metrics import record_error, record_parse_level, record_verdict, stage_timer
+from near_duplicate_index import NEAR_DUPLICATE_MODE, near_duplicate_index
+from prescreen_rules import PRESCREEN_ENABLED, evaluate_time_rules
+from resilience import UpstreamUnavailableError, is_transient_error, upstream_caller
+from single_flight import SingleFlight
+from streaming_parser import IncrementalJsonParser
+from system_prompt import build_user_prompt, get_response_schema, get_system_prompt
+from verdict_cache import (
+    VERDICT_CACHE_ENABLED,
+    VERDICT_CACHE_TIME_BUCKET_HOURS,
+    make_cache_key,
+    verdict_cache
+)
 
-from system_prompt import get_system_prompt
+# Concurrent requests for the same image and times, streamed or not, share one analysis
+REQUEST_COALESCING_ENABLED = os.getenv("REQUEST_COALESCING_ENABLED", "true").lower() == "true"
 
-# Load environment variables
-load_dotenv()
+# In-flight analyses keyed by image digest and the submitted times
+inflight_analyses = SingleFlight()
 
-# Configure Gemini API
-GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
-if not GEMINI_API_KEY:
-    raise EnvironmentError("GEMINI_API_KEY environment variable is not set")
+# Top-level fields emitted as soon as they are parsed in streaming mode
+STREAMED_FIELDS = ("classification", "decision", "risk_level", "confidence", "advisory")
 
-genai.configure(api_key=GEMINI_API_KEY)
 
-# Initialize the model
-MODEL_NAME = "gemini-2.5-flash"
+# Parse levels reported by extract_json_with_level, cheapest first
+PARSE_LEVELS = ("direct", "tolerant", "partial", "fields")
 
 
-def extract_json_from_response(response_text: str) -> dict:
+def extract_json_with_level(response_text: str) -> tuple:
     """
-    Extract and parse JSON from model response, handling various formats.
+    Extract and parse JSON from model response, reporting which fallback worked.
+
+    Valid JSON takes the json.loads fast path. Anything else goes through a
+    single tolerant scan (code fences, raw newlines, trailing commas,
+    truncation), and only if that finds no object are the key fields pulled
+    out with regular expressions.
+
+    Returns:
+        tuple of (dict, level) where level is one of PARSE_LEVELS:
+        "direct" (valid JSON), "tolerant" (repaired complete object),
+        "partial" (truncated object, complete fields only) or
+        "fields" (regex field extraction)
+
+    Raises:
+        json.JSONDecodeError: If nothing could be recovered
     """
     text = response_text.strip()
     
     # Try direct JSON parse first
     try:
-        return json.loads(text)
+        result = json.loads(text)
+        if isinstance(result, dict):
+            return result, "direct"
     except json.JSONDecodeError:
         pass
     
-    # Remove markdown code blocks
-    if "```" in text:
-        # Extract content between code blocks
-        pattern = r"```(?:json)?\s*([\s\S]*?)```"
-        matches = re.findall(pattern, text)
-        if matches:
-            text = matches[0].strip()
-            try:
-                return json.loads(text)
-            except json.JSONDecodeError:
-                pass
-    
-    # Try to find JSON object pattern
-    json_pattern = r'\{[\s\S]*\}'
-    matches = re.findall(json_pattern, text)
-    
-    # Try each match, starting with the longest (most complete)
-    for match in sorted(matches, key=len, reverse=True):
-        try:
-            return json.loads(match)
-        except json.JSONDecodeError:
-            # Try to fix common issues
-            fixed = match
-            # Fix unescaped newlines in strings
-            fixed = re.sub(r'(?<!\\)\n', '\\n', fixed)
-            # Fix trailing commas
-            fixed = re.sub(r',(\s*[}\]])', r'\1', fixed)
-            try:
-                return json.loads(fixed)
-            except json.JSONDecodeError:
-                continue
+    try:
+        result, complete = scan_json_object(text)
+        if complete:
+            return result, "tolerant"
+        if "classification" in result or "decision" in result:
+            return result, "partial"
+    except ValueError:
+        pass
     
     # Last resort: extract key fields manually
     result = {}
@@ -97,25 +104,251 @@ def extract_json_from_response(response_text: str) -> dict:
         result["confidence"] = float(conf_match.group(1))
     
     if result:
-        return result
+        return result, "fields"
     
     raise json.JSONDecodeError("Could not extract valid JSON from response", text, 0)
 
 
+def extract_json_from_response(response_text: str) -> dict:
+    """
+    Extract and parse JSON from model response, handling various formats.
+    """
+    return extract_json_with_level(response_text)[0]
+
+
+# Generation settings for the analysis call (JSON mode)
+GENERATION_CONFIG = {
+    "temperature": 0.1,
+    "top_p": 0.95,
+    "max_output_tokens": 2048,
+    "response_mime_type": "application/json",
+}
+
+# Prompt variant: "full" sends the markdown system prompt and spells out the
+# JSON structure in the user prompt; "compact" sends a condensed prompt and
+# enforces the structure with a response schema. In compact mode the
+# reasoning verbosity is "verdict" (none), "short" or "full".
+ANALYSIS_PROMPT_MODE = os.getenv("ANALYSIS_PROMPT_MODE", "full").lower()
+ANALYSIS_REASONING_VERBOSITY = os.getenv("ANALYSIS_REASONING_VERBOSITY", "full").lower()
+
+_SYSTEM_INSTRUCTION = get_system_prompt(ANALYSIS_PROMPT_MODE)
+_RESPONSE_SCHEMA = get_response_schema(ANALYSIS_REASONING_VERBOSITY) if ANALYSIS_PROMPT_MODE == "compact" else None
+
+
+def _prepare_analysis(
+    image_bytes: bytes,
+    preparation_time: str,
+    package_time: str,
+    mime_type: str,
+    food_category: Optional[str],
+    image_digest: Optional[str] = None
+) -> dict:
+    """
+    Run every stage that precedes the model call.
+    
+    Returns:
+        dict with either "result" (a verdict that needs no model call) or the
+        backend "request" plus the "cache_key", "preprocessing_info" and
+        near-duplicate match state needed to finish the analysis
+    """
+    # Parse times for context
+    prep_dt = datetime.fromisoformat(preparation_time.replace('Z', '+00:00'))
+    pkg_dt = datetime.fromisoformat(package_time.replace('Z', '+00:00'))
+    current_dt = datetime.now()
+    
+    # Calculate time elapsed
+    hours_since_prep = (current_dt - prep_dt).total_seconds() / 3600
+    hours_since_pkg = (current_dt - pkg_dt).total_seconds() / 3600
+    
+    # Food clearly past its time limits is discarded without a model call
+    if PRESCREEN_ENABLED:
+        rule_result = evaluate_time_rules(hours_since_prep, hours_since_pkg, food_category)
+        if rule_result is not None:
+            return {"result": rule_result}
+    
+    # Serve repeated submissions of the same image from the verdict cache
+    cache_key = None
+    if VERDICT_CACHE_ENABLED:
+        with stage_timer("cache_lookup"):
+            cache_key = make_cache_key(image_bytes, hours_since_prep, hours_since_pkg, image_digest=image_digest)
+            cached_result = verdict_cache.get(cache_key)
+        if cached_result is not None:
+            cached_result["cached"] = True
+            return {"result": cached_result}
+    
+    # Downscale and re-encode before any network work, hashing the decoded
+    # image for near-duplicate lookup on the way
+    preprocessing_info = None
+    image_hash = None
+    if IMAGE_PREPROCESS_ENABLED:
+        with stage_timer("preprocess"):
+            image_bytes, mime_type, preprocessing_info = preprocess_image(
+                image_bytes, dhash_size=8 if NEAR_DUPLICATE_MODE != "off" else 0
+            )
+        image_hash = preprocessing_info.pop("dhash", None)
+    
+    # Look for a recent verdict on a near-identical photo of the same dish
+    near_context = None
+    near_duplicate = None
+    if NEAR_DUPLICATE_MODE != "off":
+        with stage_timer("near_duplicate_lookup"):
+            if image_hash is None:
+                image_hash = compute_dhash(image_bytes)
+            near_context = (
+                int(round(hours_since_prep / VERDICT_CACHE_TIME_BUCKET_HOURS)),
+                int(round(hours_since_pkg / VERDICT_CACHE_TIME_BUCKET_HOURS)),
+                food_category
+            )
+            near_duplicate = near_duplicate_index.find(image_hash, near_context)
+        if near_duplicate is not None and NEAR_DUPLICATE_MODE == "reuse":
+            reused_result = near_duplicate["verdict"]
+            reused_result["cached"] = True
+            reused_result["nearDuplicate"] = _near_duplicate_info(near_duplicate, reused=True)
+            return {"result": reused_result}
+    
+    # Build the user prompt with the time context
+    user_prompt = build_user_prompt(
+        ANALYSIS_PROMPT_MODE,
+        ANALYSIS_REASONING_VERBOSITY,
+        preparation_time,
+        package_time,
+        current_dt.isoformat(),
+        hours_since_prep,
+        hours_since_pkg
+    )
+    
+    analysis_request = AnalysisRequest(
+        prompt=user_prompt,
+        image_bytes=image_bytes,
+        mime_type=mime_type,
+        generation_config=GENERATION_CONFIG if _RESPONSE_SCHEMA is None
+        else {**GENERATION_CONFIG, "response_schema": _RESPONSE_SCHEMA},
+        hours_since_prep=hours_since_prep,
+        hours_since_pkg=hours_since_pkg,
+        food_category=food_category,
+        system_instruction=_SYSTEM_INSTRUCTION
+    )
+    
+    return {
+        "request": analysis_request,
+        "cache_key": cache_key,
+        "preprocessing_info": preprocessing_info,
+        "image_hash": image_hash,
+        "near_context": near_context,
+        "near_duplicate": near_duplicate
+    }
+
+
+def _near_duplicate_info(match: dict, reused: bool) -> dict:
+    """Describe a near-duplicate match for the response."""
+    return {
+        "reused": reused,
+        "distance": match["distance"],
+        "matchedAnalyzedAt": match["analyzedAt"],
+        "matchedDecision": match["verdict"].get("decision")
+    }
+
+
+def _finalize_result(response_text: str, prepared: dict, usage: dict = None) -> dict:
+    """Parse the model response, fill in defaults and populate the verdict cache."""
+    # Parse the response using robust extraction
+    with stage_timer("parse"):
+        result, parse_level = extract_json_with_level(response_text)
+    record_parse_level(parse_level)
+    
+    # Add analysis timestamp
+    result["analyzedAt"] = datetime.now().isoformat()
+    
+    # Ensure required fields exist with defaults
+    if "classification" not in result:
+        if result.get("decision") == "DISCARD":
+            result["classification"] = "NOT-EDIBLE"
+        elif result.get("decision") == "SAFE_FOR_DONATION":
+            result["classification"] = "EDIBLE"
+        else:
+            result["classification"] = "NOT-EDIBLE"
+    
+    if "confidence" not in result:
+        result["confidence"] = 0.5
+    
+    if not result.get("reasoning"):
+        result["reasoning"] = {"final_assessment": "Analysis completed"}
+    
+    if "risk_level" not in result:
+        result["risk_level"] = "MODERATE"
+    
+    if "decision" not in result:
+        result["decision"] = "SAFE_FOR_DONATION" if result["classification"] == "EDIBLE" else "DISCARD"
+    
+    # Truncated responses are served but not cached, so a retry can do better
+    if prepared["cache_key"] is not None and parse_level != "partial":
+        verdict_cache.set(prepared["cache_key"], result)
+    if prepared["image_hash"] is not None and parse_level != "partial":
+        near_duplicate_index.add(prepared["image_hash"], prepared["near_context"], result)
+    
+    result["cached"] = False
+    if prepared["near_duplicate"] is not None:
+        result["nearDuplicate"] = _near_duplicate_info(prepared["near_duplicate"], reused=False)
+    if usage is not None:
+        result["modelUsage"] = usage
+    if prepared["preprocessing_info"] is not None:
+        result["imagePreprocessing"] = prepared["preprocessing_info"]
+    return result
+
+
+def _parse_error_result(error: json.JSONDecodeError, response_text: str) -> dict:
+    """Build the verdict returned when the model response cannot be parsed."""
+    return {
+        "classification": "NOT-EDIBLE",
+        "decision": "DISCARD",
+        "risk_level": "HIGH",
+        "confidence": 0.0,
+        "reasoning": {
+            "final_assessment": f"Analysis failed due to response parsing error: {str(error)}",
+            "raw_response": response_text[:500] if response_text else "No response"
+        },
+        "advisory": "Manual review required - automated analysis failed",
+        "analyzedAt": datetime.now().isoformat(),
+        "error": True
+    }
+
+
+def _error_result(error: Exception) -> dict:
+    """Build the verdict returned when the analysis fails."""
+    return {
+        "classification": "NOT-EDIBLE",
+        "decision": "DISCARD", 
+        "risk_level": "HIGH",
+        "confidence": 0.0,
+        "reasoning": {
+            "final_assessment": f"Analysis failed due to error: {str(error)}"
+        },
+        "advisory": "Manual review required - automated analysis failed",
+        "analyzedAt": datetime.now().isoformat(),
+        "error": True
+    }
+
+
 def analyze_food_image(
     image_bytes: bytes,
     preparation_time: str,
     package_time: str,
-    mime_type: str = "image/jpeg"
+    mime_type: str = "image/jpeg",
+    food_category: Optional[str] = None
 ) -> dict:
     """
     Analyze a food image for safety and donation eligibility.
     
+    Concurrent calls for the same image and times share one analysis; see
+    REQUEST_COALESCING_ENABLED.
+    
     Args:
-        image_bytes: Raw bytes of the food image
+        image_bytes: Raw bytes of the food image (bytes or a memoryview over the upload)
         preparation_time: ISO format datetime string of when food was prepared
         package_time: ISO format datetime string of when food was packaged
         mime_type: MIME type of the image (default: image/jpeg)
+        food_category: Optional food-risk category key (e.g. "high_risk") used
+            by the time-temperature prescreen
     
     Returns:
         dict containing:
@@ -126,114 +359,238 @@ def analyze_food_image(
             - risk_level: Risk category string
             - advisory: Optional handling instructions
             - analyzedAt: ISO timestamp of analysis
+            - cached: True if the verdict was served from the verdict cache
+            - coalesced: True if this call waited on an identical in-flight one
+            - modelUsage: Prompt/output/total token counts reported by the backend
+            - imagePreprocessing: Original/processed sizes and time spent, when
+              the image was downscaled before the model call
+            - ruleBased / rule: Present when the verdict came from the
+              deterministic time-temperature prescreen instead of the model
+    
+    Raises:
+        ImagePreprocessingError: If the upload is not a decodable, safely sized image
+        UpstreamUnavailableError: If the model could not be reached (timeouts,
+            rate limits or server errors after retries, or the circuit breaker
+            is open); OverloadedError, a subclass, if the call was shed by
+            admission control
     """
+    if not REQUEST_COALESCING_ENABLED:
+        return _analyze_food_image(image_bytes, preparation_time, package_time, mime_type, food_category)
+    
+    with stage_timer("image_hash"):
+        image_digest = hashlib.sha256(image_bytes).hexdigest()
+    key = _coalescing_key(image_digest, preparation_time, package_time, food_category)
+    result, shared = inflight_analyses.do(key, lambda: _analyze_food_image(
+        image_bytes, preparation_time, package_time, mime_type, food_category, image_digest
+    ))
+    if shared:
+        result["coalesced"] = True
+        record_verdict(result)
+    return result
+
+
+def _coalescing_key(image_digest: str, preparation_time: str, package_time: str, food_category: Optional[str]) -> str:
+    """Key under which identical in-flight analyses, streamed or not, are shared."""
+    return f"{image_digest}:{preparation_time}:{package_time}:{food_category}"
+
+
+def _analyze_food_image(
+    image_bytes: bytes,
+    preparation_time: str,
+    package_time: str,
+    mime_type: str,
+    food_category: Optional[str],
+    image_digest: Optional[str] = None
+) -> dict:
+    """Run one analysis end to end; analyze_food_image() coalesces calls to this."""
     response_text = ""
     
     try:
-        # Parse times for context
-        prep_dt = datetime.fromisoformat(preparation_time.replace('Z', '+00:00'))
-        pkg_dt = datetime.fromisoformat(package_time.replace('Z', '+00:00'))
-        current_dt = datetime.now()
-        
-        # Calculate time elapsed
-        hours_since_prep = (current_dt - prep_dt).total_seconds() / 3600
-        hours_since_pkg = (current_dt - pkg_dt).total_seconds() / 3600
-        
-        # Build the user prompt with context - emphasize JSON format
-        user_prompt = f"""Analyze this food image for donation safety.
-
-**Time Context:**
-- Preparation Time: {preparation_time}
-- Packaging Time: {package_time}
-- Current Time: {current_dt.isoformat()}
-- Hours since preparation: {hours_since_prep:.1f} hours
-- Hours since packaging: {hours_since_pkg:.1f} hours
-
-Evaluate this food item following the 6-step FSSAI evaluation pipeline.
-
-CRITICAL: Respond with ONLY a valid JSON object. No markdown, no code blocks, no explanation text.
-Use this exact structure:
-{{"classification": "EDIBLE" or "NOT-EDIBLE", "decision": "SAFE_FOR_DONATION" or "SAFE_WITH_ADVISORY" or "DISCARD", "risk_level": "VERY_LOW" or "LOW" or "MODERATE" or "HIGH" or "VERY_HIGH", "confidence": 0.0 to 1.0, "reasoning": {{"visual_inspection": "...", "food_identification": "...", "time_temperature": "...", "protective_factors": "...", "donation_context": "...", "final_assessment": "..."}}, "advisory": null or "..."}}"""
-
-        # Initialize the model
-        model = genai.GenerativeModel(
-            model_name=MODEL_NAME,
-            system_instruction=get_system_prompt()
+        prepared = _prepare_analysis(
+            image_bytes, preparation_time, package_time, mime_type, food_category, image_digest
         )
+        if "result" in prepared:
+            record_verdict(prepared["result"])
+            return prepared["result"]
         
-        # Create the image part
-        image_part = {
-            "mime_type": mime_type,
-            "data": base64.b64encode(image_bytes).decode("utf-8")
-        }
-        
-        # Generate response with JSON mode
-        response = model.generate_content(
-            [user_prompt, image_part],
-            generation_config={
-                "temperature": 0.1,
-                "top_p": 0.95,
-                "max_output_tokens": 2048,
-                "response_mime_type": "application/json",
-            }
-        )
+        backend = get_analyzer_backend()
+        
+        # Generate response with JSON mode, under the call deadline and retries,
+        # holding one of the process-wide model call slots
+        with model_call_limiter.slot():
+            with stage_timer("model_call"):
+                response = upstream_caller.call(lambda timeout: backend.generate(prepared["request"], timeout))
         
         response_text = response.text.strip()
         
-        # Parse the response using robust extraction
-        result = extract_json_from_response(response_text)
+        usage = response.usage() if response.total_tokens is not None else None
+        result = _finalize_result(response_text, prepared, usage)
         
-        # Add analysis timestamp
-        result["analyzedAt"] = datetime.now().isoformat()
+    except ImagePreprocessingError:
+        record_error("preprocessing")
+        raise
         
-        # Ensure required fields exist with defaults
-        if "classification" not in result:
-            if result.get("decision") == "DISCARD":
-                result["classification"] = "NOT-EDIBLE"
-            elif result.get("decision") == "SAFE_FOR_DONATION":
-                result["classification"] = "EDIBLE"
-            else:
-                result["classification"] = "NOT-EDIBLE"
+    except OverloadedError:
+        record_error("overloaded")
+        raise
+        
+    except UpstreamUnavailableError:
+        record_error("upstream_unavailable")
+        raise
+        
+    except json.JSONDecodeError as e:
+        record_parse_level("failed")
+        record_error("parse")
+        result = _parse_error_result(e, response_text)
+        
+    except Exception as e:
+        record_error("analysis")
+        result = _error_result(e)
+    
+    record_verdict(result)
+    return result
+
+
+def stream_food_analysis(
+    image_bytes: bytes,
+    preparation_time: str,
+    package_time: str,
+    mime_type: str = "image/jpeg",
+    food_category: Optional[str] = None
+):
+    """
+    Analyze a food image, yielding verdict fields as the model generates them.
+    
+    Uses streaming generation and an incremental JSON parser so the
+    classification, decision and risk level reach the client before the
+    reasoning is complete. The final result is built from the full response
+    exactly as analyze_food_image() builds it.
+    
+    Concurrent calls for the same image and times, streamed or not, share one
+    analysis: a caller that waited on another receives the shared verdict's
+    fields in one burst, marked coalesced.
+    
+    Args:
+        Same as analyze_food_image()
+    
+    Yields:
+        tuple of (event, payload): ("field", {"field": name, "value": value})
+        for each top-level field and ("reasoning", {"field": name, "value": text})
+        for each reasoning section as it completes, then ("result", result)
+    
+    Raises:
+        ImagePreprocessingError: If the upload is not a decodable, safely sized image
+        UpstreamUnavailableError: If the model could not be reached, including a
+            stream that breaks off part-way, or the call was shed by admission
+            control (OverloadedError)
+    """
+    if not REQUEST_COALESCING_ENABLED:
+        yield from _stream_food_analysis(image_bytes, preparation_time, package_time, mime_type, food_category)
+        return
+    
+    with stage_timer("image_hash"):
+        image_digest = hashlib.sha256(image_bytes).hexdigest()
+    key = _coalescing_key(image_digest, preparation_time, package_time, food_category)
+    for event, payload in inflight_analyses.stream(key, lambda: _stream_food_analysis(
+        image_bytes, preparation_time, package_time, mime_type, food_category, image_digest
+    )):
+        if event == "shared":
+            payload["coalesced"] = True
+            record_verdict(payload)
+            yield from _field_events(payload)
+            yield "result", payload
+        else:
+            yield event, payload
+
+
+def _stream_food_analysis(
+    image_bytes: bytes,
+    preparation_time: str,
+    package_time: str,
+    mime_type: str,
+    food_category: Optional[str],
+    image_digest: Optional[str] = None
+):
+    """Run one streamed analysis end to end; stream_food_analysis() coalesces calls to this."""
+    response_text = ""
+    
+    try:
+        prepared = _prepare_analysis(
+            image_bytes, preparation_time, package_time, mime_type, food_category, image_digest
+        )
+        if "result" in prepared:
+            record_verdict(prepared["result"])
+            yield from _field_events(prepared["result"])
+            yield "result", prepared["result"]
+            return
         
-        if "confidence" not in result:
-            result["confidence"] = 0.5
+        backend = get_analyzer_backend()
+        with model_call_limiter.slot():
+            with stage_timer("model_stream_open"):
+                response = upstream_caller.call(lambda timeout: backend.stream(prepared["request"], timeout))
+            
+            parser = IncrementalJsonParser()
+            chunks = []
+            usage = None
+            try:
+                for chunk in response:
+                    text = chunk.text
+                    chunks.append(text)
+                    if chunk.total_tokens is not None:
+                        usage = chunk.usage()
+                    for path, value in parser.feed(text):
+                        event = _field_event(path, value)
+                        if event is not None:
+                            yield event
+            except Exception as e:
+                # Fields already sent cannot be retracted, so a broken stream is not retried
+                if is_transient_error(e):
+                    raise upstream_caller.record_failure(e) from e
+                raise
         
-        if "reasoning" not in result:
-            result["reasoning"] = {"final_assessment": "Analysis completed"}
+        response_text = "".join(chunks).strip()
+        result = _finalize_result(response_text, prepared, usage)
         
-        if "risk_level" not in result:
-            result["risk_level"] = "MODERATE"
+    except ImagePreprocessingError:
+        record_error("preprocessing")
+        raise
         
-        if "decision" not in result:
-            result["decision"] = "SAFE_FOR_DONATION" if result["classification"] == "EDIBLE" else "DISCARD"
+    except OverloadedError:
+        record_error("overloaded")
+        raise
         
-        return result
+    except UpstreamUnavailableError:
+        record_error("upstream_unavailable")
+        raise
         
     except json.JSONDecodeError as e:
-        return {
-            "classification": "NOT-EDIBLE",
-            "decision": "DISCARD",
-            "risk_level": "HIGH",
-            "confidence": 0.0,
-            "reasoning": {
-                "final_assessment": f"Analysis failed due to response parsing error: {str(e)}",
-                "raw_response": response_text[:500] if response_text else "No response"
-            },
-            "advisory": "Manual review required - automated analysis failed",
-            "analyzedAt": datetime.now().isoformat(),
-            "error": True
-        }
+        record_parse_level("failed")
+        record_error("parse")
+        result = _parse_error_result(e, response_text)
         
     except Exception as e:
-        return {
-            "classification": "NOT-EDIBLE",
-            "decision": "DISCARD", 
-            "risk_level": "HIGH",
-            "confidence": 0.0,
-            "reasoning": {
-                "final_assessment": f"Analysis failed due to error: {str(e)}"
-            },
-            "advisory": "Manual review required - automated analysis failed",
-            "analyzedAt": datetime.now().isoformat(),
-            "error": True
-        }
+        record_error("analysis")
+        result = _error_result(e)
+    
+    record_verdict(result)
+    yield "result", result
+
+
+def _field_event(path: tuple, value):
+    """Map a parsed JSON path to a stream event, or None if it is not streamed."""
+    if len(path) == 1 and path[0] in STREAMED_FIELDS:
+        return "field", {"field": path[0], "value": value}
+    if len(path) == 2 and path[0] == "reasoning":
+        return "reasoning", {"field": path[1], "value": value}
+    return None
+
+
+def _field_events(result: dict):
+    """Yield stream events for a verdict that was produced without streaming."""
+    for field in STREAMED_FIELDS:
+        if field in result:
+            yield "field", {"field": field, "value": result[field]}
+    reasoning = result.get("reasoning")
+    if isinstance(reasoning, dict):
+        for name, text in reasoning.items():
+            yield "reasoning", {"field": name, "value": text}
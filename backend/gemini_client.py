@@ -0,0 +1,105 @@
+"""
+Gemini Client Module - Process-wide pool of configured GenerativeModel instances.
+Models are created lazily, shared across requests and threads, and can optionally
+reference a server-side cached copy of the system prompt.
+"""
+
+import datetime
+import os
+import threading
+import time
+
+import google.generativeai as genai
+
+from system_prompt import get_system_prompt
+
+# Model used for food safety analysis
+MODEL_NAME = "gemini-2.5-flash"
+
+# Server-side context caching of the system prompt (opt-in)
+CONTEXT_CACHE_ENABLED = os.getenv("GEMINI_CONTEXT_CACHE_ENABLED", "false").lower() == "true"
+CONTEXT_CACHE_TTL_SECONDS = int(os.getenv("GEMINI_CONTEXT_CACHE_TTL_SECONDS", 3600))
+
+# Refresh the cached content this many seconds before it expires server-side
+_CONTEXT_CACHE_REFRESH_MARGIN = 60
+
+_pool_lock = threading.Lock()
+_model_pool = {}  # (model_name, system_instruction) -> (model, expires_at or None)
+
+
+def _create_cached_model(model_name: str, system_instruction: str):
+    """Create a model bound to a server-side cached copy of the system instruction."""
+    cached_content = genai.caching.CachedContent.create(
+        model=f"models/{model_name}",
+        display_name="food-safety-system-prompt",
+        system_instruction=system_instruction,
+        ttl=datetime.timedelta(seconds=CONTEXT_CACHE_TTL_SECONDS)
+    )
+    model = genai.GenerativeModel.from_cached_content(cached_content=cached_content)
+    expires_at = time.monotonic() + CONTEXT_CACHE_TTL_SECONDS - _CONTEXT_CACHE_REFRESH_MARGIN
+    return model, expires_at
+
+
+def _create_model(model_name: str, system_instruction: str):
+    """Create a model, preferring context caching when enabled."""
+    if CONTEXT_CACHE_ENABLED:
+        try:
+            return _create_cached_model(model_name, system_instruction)
+        except Exception as e:
+            # Context caching has a minimum token size and is not available on
+            # every tier - fall back to sending the system instruction inline.
+            print(f"Context caching unavailable, using inline system prompt: {e}")
+
+    model = genai.GenerativeModel(
+        model_name=model_name,
+        system_instruction=system_instruction
+    )
+    return model, None
+
+
+def get_model(model_name: str = MODEL_NAME, system_instruction: str = None):
+    """
+    Return the shared GenerativeModel for a model/system-instruction pair.
+
+    The instance is created on first use and reused by every subsequent
+    request. Models backed by server-side cached content are recreated shortly
+    before the cached content expires.
+
+    Args:
+        model_name: Gemini model name
+        system_instruction: System prompt (default: the FSSAI food safety prompt)
+
+    Returns:
+        genai.GenerativeModel: Shared, thread-safe model instance
+    """
+    if system_instruction is None:
+        system_instruction = get_system_prompt()
+    key = (model_name, system_instruction)
+
+    entry = _model_pool.get(key)
+    if entry is not None and (entry[1] is None or time.monotonic() < entry[1]):
+        return entry[0]
+
+    with _pool_lock:
+        # Re-check: another thread may have created the model while we waited
+        entry = _model_pool.get(key)
+        if entry is None or (entry[1] is not None and time.monotonic() >= entry[1]):
+            entry = _create_model(model_name, system_instruction)
+            _model_pool[key] = entry
+        return entry[0]
+
+
+def reset_model_pool():
+    """Drop all pooled models so the next request creates fresh ones."""
+    with _pool_lock:
+        _model_pool.clear()
+
+
+def model_pool_info() -> dict:
+    """Return a summary of the pooled models for diagnostics."""
+    with _pool_lock:
+        return {
+            "models": len(_model_pool),
+            "context_cache_enabled": CONTEXT_CACHE_ENABLED,
+            "context_cached_models": sum(1 for _, expires_at in _model_pool.values() if expires_at is not None)
+        }
@@ -0,0 +1,69 @@
+"""
+Gunicorn configuration for the Food Safety Analysis API.
+
+Usage (from the backend directory):
+    gunicorn -c gunicorn.conf.py "app:create_app()"
+
+Requests spend almost all their time waiting on the model call, so the
+defaults favour many concurrent requests per process over many processes:
+
+    GUNICORN_WORKER_CLASS=gthread  One thread per in-flight request (default)
+    GUNICORN_WORKER_CLASS=gevent   Cooperative greenlets; one process holds
+                                   hundreds of in-flight model calls
+                                   (requires the gevent package)
+
+See DEPLOYMENT.md for the trade-offs and measured numbers.
+"""
+
+import multiprocessing
+import os
+
+bind = f"{os.getenv('HOST', '0.0.0.0')}:{os.getenv('PORT', '5000')}"
+
+worker_class = os.getenv("GUNICORN_WORKER_CLASS", "gthread")
+
+# The CSV audit log, its rotation and its running statistics are coordinated
+# with in-process locks and counters, so the CSV backend is limited to one
+# worker. SQLite serialises writes and computes statistics in the database.
+storage_backend = os.getenv("ANALYSIS_STORAGE_BACKEND", "csv").lower()
+requested_workers = int(os.getenv("GUNICORN_WORKERS", 1))
+workers = 1 if storage_backend == "csv" else requested_workers
+
+# gthread: concurrent requests per worker
+threads = int(os.getenv("GUNICORN_THREADS", 32))
+
+# gevent: concurrent connections per worker
+worker_connections = int(os.getenv("GUNICORN_WORKER_CONNECTIONS", 500))
+
+# Long enough for a model call that uses its whole retry deadline
+timeout = int(os.getenv("GUNICORN_TIMEOUT", int(float(os.getenv("GEMINI_DEADLINE_SECONDS", 90))) + 30))
+graceful_timeout = int(os.getenv("GUNICORN_GRACEFUL_TIMEOUT", timeout))
+keepalive = int(os.getenv("GUNICORN_KEEPALIVE", 5))
+
+# Load the app in each worker, after fork, so background threads (audit
+# writer, job pool) are started in the process that uses them
+preload_app = False
+
+accesslog = os.getenv("GUNICORN_ACCESS_LOG", "-")
+errorlog = "-"
+loglevel = os.getenv("GUNICORN_LOG_LEVEL", "info")
+
+
+def post_worker_init(worker):
+    # gRPC (used by google.generativeai) blocks the gevent hub unless told to cooperate
+    if worker_class == "gevent":
+        try:
+            from grpc.experimental import gevent as grpc_gevent
+
+            grpc_gevent.init_gevent()
+        except ImportError:
+            worker.log.warning("grpc gevent support unavailable; model calls will block the worker")
+
+
+def on_starting(server):
+    if requested_workers > workers:
+        server.log.warning(
+            f"GUNICORN_WORKERS={requested_workers} ignored: the CSV audit log and its statistics "
+            "need a single worker; set ANALYSIS_STORAGE_BACKEND=sqlite to run more"
+        )
+    server.log.info(f"{multiprocessing.cpu_count()} CPUs, {workers} worker(s) of class {worker_class}")
@@ -0,0 +1,192 @@
+"""
+Image Preprocessor Module - Downscale and re-encode uploads before analysis.
+Decodes the uploaded image, rejects decompression bombs and truncated files,
+strips EXIF metadata and re-encodes at a bounded size so model calls carry
+far fewer bytes than the raw phone photo.
+"""
+
+import io
+import os
+import time
+
+from PIL import Image, ImageFile, ImageOps, UnidentifiedImageError
+
+# Preprocessing configuration
+IMAGE_PREPROCESS_ENABLED = os.getenv("IMAGE_PREPROCESS_ENABLED", "true").lower() == "true"
+IMAGE_MAX_EDGE = int(os.getenv("IMAGE_MAX_EDGE", 1024))
+IMAGE_OUTPUT_FORMAT = os.getenv("IMAGE_OUTPUT_FORMAT", "JPEG").upper()
+IMAGE_OUTPUT_QUALITY = int(os.getenv("IMAGE_OUTPUT_QUALITY", 85))
+
+# Images above this many pixels are treated as decompression bombs
+IMAGE_MAX_PIXELS = int(os.getenv("IMAGE_MAX_PIXELS", 40_000_000))
+
+# Truncated files must fail loudly rather than decode as partially grey images
+ImageFile.LOAD_TRUNCATED_IMAGES = False
+
+OUTPUT_MIME_TYPES = {
+    "JPEG": "image/jpeg",
+    "WEBP": "image/webp",
+    "PNG": "image/png"
+}
+
+
+class ImagePreprocessingError(ValueError):
+    """Raised when an upload is not a decodable, safely sized image."""
+
+
+class _BufferReader(io.RawIOBase):
+    """Seekable read-only file over a buffer, so memory-mapped uploads decode without a copy."""
+
+    def __init__(self, buffer):
+        self._view = memoryview(buffer).cast("B")
+        self._pos = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def readinto(self, target) -> int:
+        count = max(0, min(len(target), len(self._view) - self._pos))
+        target[:count] = self._view[self._pos:self._pos + count]
+        self._pos += count
+        return count
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        base = {io.SEEK_SET: 0, io.SEEK_CUR: self._pos, io.SEEK_END: len(self._view)}[whence]
+        self._pos = max(0, base + offset)
+        return self._pos
+
+    def tell(self) -> int:
+        return self._pos
+
+
+def _open_image(image_bytes) -> Image.Image:
+    """Open an image from bytes or any buffer without copying it."""
+    source = io.BytesIO(image_bytes) if isinstance(image_bytes, bytes) else _BufferReader(image_bytes)
+    return Image.open(source)
+
+
+def _dhash(image: Image.Image, hash_size: int) -> int:
+    """Difference hash of a decoded image: one bit per horizontally adjacent pixel pair."""
+    pixels = image.convert("L").resize((hash_size + 1, hash_size), Image.Resampling.BILINEAR).tobytes()
+    value = 0
+    for row in range(hash_size):
+        offset = row * (hash_size + 1)
+        for column in range(hash_size):
+            value = (value << 1) | (pixels[offset + column] > pixels[offset + column + 1])
+    return value
+
+
+def compute_dhash(image_bytes, hash_size: int = 8) -> int:
+    """
+    Compute a difference hash (dHash) of an image for near-duplicate matching.
+
+    The image is reduced to (hash_size + 1) x hash_size greyscale pixels and
+    each bit records whether a pixel is brighter than its right neighbour, so
+    re-encoding, rescaling and small shifts in framing change only a few bits.
+    JPEGs are decoded at 1/8 scale, which keeps this to a few milliseconds
+    even for full-size phone photos. When the image is being preprocessed
+    anyway, pass dhash_size to preprocess_image() instead so it is decoded
+    only once.
+
+    Args:
+        image_bytes: Raw bytes of the image (any bytes-like object)
+        hash_size: Rows of the hash grid; the hash has hash_size ** 2 bits
+
+    Returns:
+        int: The hash as an unsigned integer
+
+    Raises:
+        ImagePreprocessingError: If the image cannot be decoded
+    """
+    try:
+        image = _open_image(image_bytes)
+        if image.size[0] * image.size[1] > IMAGE_MAX_PIXELS:
+            raise ImagePreprocessingError("Image exceeds the pixel limit")
+        image.draft("L", (hash_size * 8, hash_size * 8))
+        return _dhash(ImageOps.exif_transpose(image), hash_size)
+    except (UnidentifiedImageError, OSError, Image.DecompressionBombError) as e:
+        raise ImagePreprocessingError(f"Image could not be hashed: {e}") from e
+
+
+def preprocess_image(
+    image_bytes: bytes,
+    max_edge: int = IMAGE_MAX_EDGE,
+    output_format: str = IMAGE_OUTPUT_FORMAT,
+    quality: int = IMAGE_OUTPUT_QUALITY,
+    dhash_size: int = 0
+) -> tuple:
+    """
+    Validate, downscale and re-encode an uploaded image.
+
+    Only the image header is read before the pixel-count check, so oversized
+    and malformed files are rejected without decoding them.
+
+    Args:
+        image_bytes: Raw bytes of the uploaded image (any bytes-like object,
+            e.g. a memoryview over a memory-mapped upload)
+        max_edge: Maximum width/height of the output in pixels
+        output_format: Pillow format name for the re-encoded image
+        quality: Encoder quality for lossy formats
+        dhash_size: If set, also hash the downscaled image (see compute_dhash)
+            and return it as info["dhash"], saving a second decode
+
+    Returns:
+        tuple of (processed_bytes, mime_type, info) where info records the
+        original and processed byte counts and dimensions and the time spent
+
+    Raises:
+        ImagePreprocessingError: If the image is unreadable, truncated or too large
+    """
+    start = time.perf_counter()
+
+    try:
+        image = _open_image(image_bytes)
+    except Image.DecompressionBombError as e:
+        raise ImagePreprocessingError(f"Image rejected as a decompression bomb: {e}") from e
+    except (UnidentifiedImageError, OSError) as e:
+        raise ImagePreprocessingError(f"Unsupported or corrupt image: {e}") from e
+
+    original_size = image.size
+    if original_size[0] * original_size[1] > IMAGE_MAX_PIXELS:
+        raise ImagePreprocessingError(
+            f"Image dimensions {original_size[0]}x{original_size[1]} exceed the "
+            f"{IMAGE_MAX_PIXELS} pixel limit"
+        )
+
+    try:
+        # Let the JPEG decoder scale down by a power of two while decoding
+        image.draft("RGB", (max_edge, max_edge))
+        image.load()
+    except (OSError, Image.DecompressionBombError) as e:
+        raise ImagePreprocessingError(f"Image could not be decoded: {e}") from e
+
+    # Apply the EXIF orientation, then drop all metadata by re-encoding
+    image = ImageOps.exif_transpose(image)
+
+    if image.mode in ("RGBA", "LA", "P") and output_format == "JPEG":
+        image = image.convert("RGBA")
+        background = Image.new("RGB", image.size, (255, 255, 255))
+        background.paste(image, mask=image.getchannel("A"))
+        image = background
+    elif image.mode not in ("RGB", "L"):
+        image = image.convert("RGB")
+
+    image.thumbnail((max_edge, max_edge), Image.Resampling.LANCZOS, reducing_gap=2.0)
+
+    output = io.BytesIO()
+    image.save(output, format=output_format, quality=quality, optimize=True)
+    processed_bytes = output.getvalue()
+
+    info = {
+        "originalBytes": len(image_bytes),
+        "processedBytes": len(processed_bytes),
+        "originalSize": list(original_size),
+        "processedSize": list(image.size),
+        "durationMs": round((time.perf_counter() - start) * 1000, 2)
+    }
+    if dhash_size:
+        info["dhash"] = _dhash(image, dhash_size)
+    return processed_bytes, OUTPUT_MIME_TYPES.get(output_format, "image/jpeg"), info
@@ -0,0 +1,194 @@
+"""
+JSON Scanner Module - Single-pass tolerant JSON parsing for model responses.
+Recovers objects from responses wrapped in code fences or prose, with raw
+newlines inside strings, trailing commas, or output truncated mid-string,
+returning whatever fields were complete instead of failing outright.
+"""
+
+import json
+import re
+
+_NUMBER = re.compile(r"-?\d+(?:\.\d+)?(?:[eE][+-]?\d+)?")
+_LITERALS = {"true": True, "false": False, "null": None}
+_WHITESPACE = re.compile(r"[ \t\r\n]*")
+_STRING_SPECIAL = re.compile(r'["\\]')
+_DECODER = json.JSONDecoder(strict=False)
+
+# How many "{" positions to try before giving up on prose with stray braces
+MAX_START_CANDIDATES = 8
+
+
+class _Scanner:
+    def __init__(self, text: str, pos: int):
+        self.text = text
+        self.pos = pos
+        self.truncated = False
+
+    def _skip(self):
+        self.pos = _WHITESPACE.match(self.text, self.pos).end()
+
+    def _at_end(self) -> bool:
+        self._skip()
+        if self.pos >= len(self.text):
+            self.truncated = True
+            return True
+        return False
+
+    def value(self):
+        if self._at_end():
+            raise _Incomplete()
+        char = self.text[self.pos]
+        if char == "{":
+            return self.object()
+        if char == "[":
+            return self.array()
+        if char == "\"":
+            return self.string()
+        match = _NUMBER.match(self.text, self.pos)
+        if match:
+            self.pos = match.end()
+            if self.pos == len(self.text):
+                # A number at the very end may be missing digits
+                self.truncated = True
+                raise _Incomplete()
+            number = match.group()
+            return float(number) if any(c in number for c in ".eE") else int(number)
+        for literal, result in _LITERALS.items():
+            if self.text.startswith(literal, self.pos):
+                self.pos += len(literal)
+                return result
+        remaining = self.text[self.pos:].rstrip()
+        if any(literal.startswith(remaining) for literal in _LITERALS):
+            # Truncated in the middle of a literal
+            self.truncated = True
+            raise _Incomplete()
+        raise ValueError(f"Unexpected character {char!r} at position {self.pos}")
+
+    def object(self) -> dict:
+        self.pos += 1
+        result = {}
+        while True:
+            if self._at_end():
+                return result
+            char = self.text[self.pos]
+            if char == "}":
+                self.pos += 1
+                return result
+            if char == ",":
+                # Separators, including trailing and doubled commas
+                self.pos += 1
+                continue
+            if char != "\"":
+                raise ValueError(f"Expected object key at position {self.pos}")
+
+            try:
+                key = self.string()
+            except _Incomplete:
+                return result
+            if self._at_end():
+                return result
+            if self.text[self.pos] != ":":
+                raise ValueError(f"Expected ':' at position {self.pos}")
+            self.pos += 1
+
+            try:
+                result[key] = self.value()
+            except _Incomplete:
+                return result
+            if self.truncated:
+                return result
+
+    def array(self) -> list:
+        self.pos += 1
+        result = []
+        while True:
+            if self._at_end():
+                return result
+            char = self.text[self.pos]
+            if char == "]":
+                self.pos += 1
+                return result
+            if char == ",":
+                self.pos += 1
+                continue
+            try:
+                result.append(self.value())
+            except _Incomplete:
+                return result
+            if self.truncated:
+                return result
+
+    def string(self) -> str:
+        """Parse the string at the current position; raise _Incomplete if it is cut off."""
+        text = self.text
+        start = self.pos
+        i = start + 1
+        escaped = False
+        while True:
+            match = _STRING_SPECIAL.search(text, i)
+            if match is None or match.end() == len(text) and match.group() == "\\":
+                # Unterminated: the value is unknown, so it is dropped
+                self.truncated = True
+                self.pos = len(text)
+                raise _Incomplete()
+            i = match.start()
+            if match.group() == "\\":
+                escaped = True
+                i += 2
+                continue
+            self.pos = i + 1
+            if not escaped:
+                return text[start + 1:i]
+            return json.loads(text[start:i + 1], strict=False)
+
+
+class _Incomplete(Exception):
+    """Raised when the input ends before a value is complete."""
+
+
+def scan_json_object(text: str) -> tuple:
+    """
+    Parse the first JSON object in `text`, tolerating common model output defects.
+
+    Handles leading/trailing prose and code fences, raw control characters in
+    strings, trailing or doubled commas, and truncation at any point (open
+    containers are closed, complete fields are kept and a value that was cut
+    off part-way is dropped rather than guessed).
+
+    Args:
+        text: Raw model response
+
+    Returns:
+        tuple of (dict, complete) where complete is False if the object was
+        truncated and only partially recovered
+
+    Raises:
+        ValueError: If no object could be recovered
+    """
+    start = text.find("{")
+    if start == -1:
+        raise ValueError("No JSON object found in response")
+
+    # Fast path: a well-formed object surrounded by fences or prose
+    try:
+        result, _ = _DECODER.raw_decode(text, start)
+        if isinstance(result, dict) and result:
+            return result, True
+    except ValueError:
+        pass
+
+    attempts = 0
+    last_error = None
+    while start != -1 and attempts < MAX_START_CANDIDATES:
+        attempts += 1
+        scanner = _Scanner(text, start)
+        try:
+            result = scanner.object()
+            if result:
+                return result, not scanner.truncated
+        except ValueError as e:
+            last_error = e
+        # Braces inside a rejected candidate belong to it, so resume after it
+        start = text.find("{", max(scanner.pos, start + 1))
+
+    raise ValueError(str(last_error) if last_error else "No JSON object found in response")
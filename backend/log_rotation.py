@@ -0,0 +1,200 @@
+"""
+Log Rotation Module - Segment rotation, compression and retention for the CSV audit log.
+The active log is rotated by size or by day into compressed archive segments.
+A JSON manifest records each segment's time range so readers only open the
+segments a query needs.
+"""
+
+import csv
+import gzip
+import io
+import json
+import os
+import shutil
+from datetime import datetime, timedelta
+
+try:
+    import zstandard
+except ImportError:  # Optional dependency - gzip is used when unavailable
+    zstandard = None
+
+# Rotation policy: "size", "daily" or "none"
+LOG_ROTATION = os.getenv("LOG_ROTATION", "size").lower()
+LOG_ROTATION_MAX_BYTES = int(os.getenv("LOG_ROTATION_MAX_BYTES", 50 * 1024 * 1024))
+
+# Archive compression: "gzip", "zstd" or "none"
+LOG_ARCHIVE_COMPRESSION = os.getenv("LOG_ARCHIVE_COMPRESSION", "gzip").lower()
+
+# Retention: 0 keeps archives forever
+LOG_RETENTION_DAYS = int(os.getenv("LOG_RETENTION_DAYS", 0))
+LOG_RETENTION_MAX_SEGMENTS = int(os.getenv("LOG_RETENTION_MAX_SEGMENTS", 0))
+
+MANIFEST_FILENAME = "manifest.json"
+
+_EXTENSIONS = {"gzip": ".csv.gz", "zstd": ".csv.zst", "none": ".csv"}
+
+
+def _new_segment_id() -> str:
+    return datetime.now().strftime("%Y%m%dT%H%M%S%f")
+
+
+def load_manifest(archive_dir: str) -> dict:
+    """
+    Load the segment manifest, creating an empty one if none exists.
+
+    Returns:
+        dict with "active" (id and creation time of the live log),
+        "segments" (archived segments, oldest first) and "deleted_records"
+        (records removed by retention)
+    """
+    path = os.path.join(archive_dir, MANIFEST_FILENAME)
+    if os.path.exists(path):
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    return {
+        "active": {"id": _new_segment_id(), "created_at": datetime.now().isoformat()},
+        "segments": [],
+        "deleted_records": 0
+    }
+
+
+def save_manifest(archive_dir: str, manifest: dict):
+    """Atomically write the segment manifest."""
+    os.makedirs(archive_dir, exist_ok=True)
+    path = os.path.join(archive_dir, MANIFEST_FILENAME)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp_path, path)
+
+
+def should_rotate(active_path: str, manifest: dict, policy: str = LOG_ROTATION) -> bool:
+    """Check whether the active log is due for rotation under `policy`."""
+    if policy == "none" or not os.path.exists(active_path):
+        return False
+    if policy == "size":
+        return os.path.getsize(active_path) >= LOG_ROTATION_MAX_BYTES
+    if policy == "daily":
+        created_day = manifest["active"]["created_at"][:10]
+        return created_day < datetime.now().date().isoformat() and _has_records(active_path)
+    raise ValueError(f"Unknown LOG_ROTATION policy '{policy}'")
+
+
+def _has_records(path: str) -> bool:
+    with open(path, "rb") as f:
+        f.readline()
+        return bool(f.readline().strip())
+
+
+def _scan_segment(path: str) -> tuple:
+    """Return (first_timestamp, last_timestamp, record_count) of a CSV log."""
+    first = last = None
+    count = 0
+    with open(path, "r", newline="", encoding="utf-8") as f:
+        for row in csv.DictReader(f):
+            timestamp = row.get("timestamp")
+            if first is None:
+                first = timestamp
+            last = timestamp
+            count += 1
+    return first, last, count
+
+
+def _compress(src: str, dst_base: str, compression: str) -> tuple:
+    """Compress `src` next to `dst_base`, returning (path, compression used)."""
+    if compression == "zstd" and zstandard is None:
+        print("zstandard is not installed, archiving the log segment with gzip")
+        compression = "gzip"
+
+    dst = dst_base + _EXTENSIONS.get(compression, ".csv")
+    if compression == "gzip":
+        with open(src, "rb") as f_in, gzip.open(dst, "wb", compresslevel=6) as f_out:
+            shutil.copyfileobj(f_in, f_out, 1024 * 1024)
+    elif compression == "zstd":
+        with open(src, "rb") as f_in, open(dst, "wb") as f_out:
+            zstandard.ZstdCompressor(level=10).copy_stream(f_in, f_out)
+    else:
+        shutil.copyfile(src, dst)
+        compression = "none"
+    return dst, compression
+
+
+def read_segment(archive_dir: str, segment: dict) -> bytes:
+    """Return the decompressed CSV bytes of an archived segment."""
+    path = os.path.join(archive_dir, segment["file"])
+    compression = segment.get("compression", "none")
+    if compression == "gzip":
+        with gzip.open(path, "rb") as f:
+            return f.read()
+    if compression == "zstd":
+        if zstandard is None:
+            raise RuntimeError(f"zstandard is required to read archived segment {segment['file']}")
+        with open(path, "rb") as f:
+            return zstandard.ZstdDecompressor().stream_reader(f).read()
+    with open(path, "rb") as f:
+        return f.read()
+
+
+def open_segment_text(archive_dir: str, segment: dict):
+    """Return a text stream over an archived segment for forward CSV reading."""
+    return io.TextIOWrapper(io.BytesIO(read_segment(archive_dir, segment)), encoding="utf-8", newline="")
+
+
+def rotate(active_path: str, archive_dir: str, manifest: dict, compression: str = LOG_ARCHIVE_COMPRESSION) -> dict:
+    """
+    Move the active log into a compressed archive segment.
+
+    The caller must hold the log file lock and create a fresh active log
+    afterwards. The manifest is updated in place and saved.
+
+    Returns:
+        dict: The new segment entry
+    """
+    os.makedirs(archive_dir, exist_ok=True)
+    segment_id = manifest["active"]["id"]
+    first, last, count = _scan_segment(active_path)
+
+    staged = os.path.join(archive_dir, f"segment-{segment_id}.staging.csv")
+    os.replace(active_path, staged)
+    path, used = _compress(staged, os.path.join(archive_dir, f"segment-{segment_id}"), compression)
+    if path != staged:
+        os.remove(staged)
+
+    segment = {
+        "id": segment_id,
+        "file": os.path.basename(path),
+        "compression": used,
+        "first_timestamp": first,
+        "last_timestamp": last,
+        "records": count,
+        "bytes": os.path.getsize(path)
+    }
+    manifest["segments"].append(segment)
+    manifest["active"] = {"id": _new_segment_id(), "created_at": datetime.now().isoformat()}
+    apply_retention(archive_dir, manifest)
+    save_manifest(archive_dir, manifest)
+    return segment
+
+
+def apply_retention(archive_dir: str, manifest: dict):
+    """Delete archived segments that fall outside the retention policy."""
+    segments = manifest["segments"]
+    expired = []
+
+    if LOG_RETENTION_DAYS > 0:
+        cutoff = (datetime.now() - timedelta(days=LOG_RETENTION_DAYS)).isoformat()
+        expired = [s for s in segments if (s.get("last_timestamp") or "") < cutoff]
+
+    if LOG_RETENTION_MAX_SEGMENTS > 0:
+        kept = [s for s in segments if s not in expired]
+        if len(kept) > LOG_RETENTION_MAX_SEGMENTS:
+            expired.extend(kept[:len(kept) - LOG_RETENTION_MAX_SEGMENTS])
+
+    for segment in expired:
+        try:
+            os.remove(os.path.join(archive_dir, segment["file"]))
+        except OSError as e:
+            print(f"Error removing archived log segment {segment['file']}: {e}")
+        manifest["deleted_records"] = manifest.get("deleted_records", 0) + segment["records"]
+
+    manifest["segments"] = [s for s in segments if s not in expired]
@@ -0,0 +1,222 @@
+"""
+Metrics Module - In-process counters and latency histograms for the analysis path.
+Records per-stage timings (upload read, preprocessing, model call, JSON
+extraction, audit logging) and outcome counters, rendered in the Prometheus
+text exposition format for /metrics. Disable with METRICS_ENABLED=false, in
+which case every recording call is a no-op.
+"""
+
+import os
+import threading
+import time
+from bisect import bisect_left
+
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "true").lower() == "true"
+
+# Histogram bucket upper bounds in seconds, from fast local stages to model calls
+LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+
+def _format_labels(labelnames: tuple, values: tuple, extra: str = "") -> str:
+    pairs = [f"{name}=\"{_escape(value)}\"" for name, value in zip(labelnames, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_number(value: float) -> str:
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    """Monotonic counter with optional labels."""
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labelvalues, amount: float = 1):
+        with self._lock:
+            self._values[labelvalues] = self._values.get(labelvalues, 0) + amount
+
+    def render(self) -> list:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            items = sorted(self._values.items())
+        for labelvalues, value in items:
+            lines.append(f"{self.name}{_format_labels(self.labelnames, labelvalues)} {_format_number(value)}")
+        return lines
+
+
+class Histogram:
+    """Fixed-bucket histogram with optional labels."""
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple = (), buckets: tuple = LATENCY_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self.buckets = tuple(sorted(buckets))
+        self._series = {}  # labelvalues -> [bucket counts..., +Inf count, sum]
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *labelvalues):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labelvalues)
+            if series is None:
+                series = self._series[labelvalues] = [0] * (len(self.buckets) + 1) + [0.0]
+            series[index] += 1
+            series[-1] += value
+
+    def render(self) -> list:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            items = sorted((labels, list(series)) for labels, series in self._series.items())
+        for labelvalues, series in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), series[:-1]):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else _format_number(bound)
+                labels = _format_labels(self.labelnames, labelvalues, f"le=\"{le}\"")
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _format_labels(self.labelnames, labelvalues)
+            lines.append(f"{self.name}_sum{labels} {_format_number(series[-1])}")
+            lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+
+class _StageTimer:
+    __slots__ = ("stage", "start")
+
+    def __init__(self, stage: str):
+        self.stage = stage
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        STAGE_SECONDS.observe(time.perf_counter() - self.start, self.stage)
+        return False
+
+
+class _NoopTimer:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+_NOOP_TIMER = _NoopTimer()
+
+
+HTTP_REQUESTS = Counter(
+    "http_requests_total", "HTTP requests by route, method and status code", ("endpoint", "method", "status")
+)
+HTTP_REQUEST_SECONDS = Histogram(
+    "http_request_duration_seconds", "Time to produce the HTTP response headers", ("endpoint",)
+)
+STAGE_SECONDS = Histogram(
+    "analysis_stage_duration_seconds", "Time spent per analysis stage", ("stage",)
+)
+VERDICTS = Counter(
+    "analysis_verdicts_total",
+    "Verdicts returned by decision and source (model, cache, near_duplicate, rule, coalesced, error)",
+    ("decision", "source")
+)
+PARSE_LEVELS = Counter(
+    "analysis_parse_level_total", "Model responses by the JSON extraction level that succeeded", ("level",)
+)
+ERRORS = Counter(
+    "analysis_errors_total", "Analysis failures by kind", ("kind",)
+)
+ADMISSION_DECISIONS = Counter(
+    "admission_decisions_total",
+    "Admission control outcomes (admitted, shed_queue_full, shed_timeout, allowed, rate_limited)",
+    ("outcome",)
+)
+ADMISSION_WAIT_SECONDS = Histogram(
+    "admission_queue_wait_seconds", "Time admitted model calls waited for a concurrency slot"
+)
+
+_METRICS = (
+    HTTP_REQUESTS, HTTP_REQUEST_SECONDS, STAGE_SECONDS, VERDICTS, PARSE_LEVELS, ERRORS,
+    ADMISSION_DECISIONS, ADMISSION_WAIT_SECONDS
+)
+
+
+def stage_timer(stage: str):
+    """
+    Return a context manager that records the duration of an analysis stage.
+
+    Usage:
+        with stage_timer("model_call"):
+            ...
+    """
+    if not METRICS_ENABLED:
+        return _NOOP_TIMER
+    return _StageTimer(stage)
+
+
+def record_http_request(endpoint: str, method: str, status: int, seconds: float):
+    """Count an HTTP request and observe its duration."""
+    if METRICS_ENABLED:
+        HTTP_REQUESTS.inc(endpoint, method, str(status))
+        HTTP_REQUEST_SECONDS.observe(seconds, endpoint)
+
+
+def record_verdict(result: dict):
+    """Count a verdict by decision and by where it came from."""
+    if not METRICS_ENABLED:
+        return
+    if result.get("error"):
+        source = "error"
+    elif result.get("coalesced"):
+        source = "coalesced"
+    elif result.get("ruleBased"):
+        source = "rule"
+    elif result.get("nearDuplicate", {}).get("reused"):
+        source = "near_duplicate"
+    elif result.get("cached"):
+        source = "cache"
+    else:
+        source = "model"
+    VERDICTS.inc(result.get("decision", "UNKNOWN"), source)
+
+
+def record_parse_level(level: str):
+    """Count which JSON extraction level parsed a model response ("failed" if none)."""
+    if METRICS_ENABLED:
+        PARSE_LEVELS.inc(level)
+
+
+def record_error(kind: str):
+    """Count an analysis failure of the given kind."""
+    if METRICS_ENABLED:
+        ERRORS.inc(kind)
+
+
+def record_admission(outcome: str, wait_seconds: float = None):
+    """Count an admission decision and, for admitted calls, observe the queue wait."""
+    if METRICS_ENABLED:
+        ADMISSION_DECISIONS.inc(outcome)
+        if wait_seconds is not None:
+            ADMISSION_WAIT_SECONDS.observe(wait_seconds)
+
+
+def render_metrics() -> str:
+    """Render every metric in the Prometheus text exposition format (version 0.0.4)."""
+    lines = []
+    for metric in _METRICS:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
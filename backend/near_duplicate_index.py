@@ -0,0 +1,171 @@
+"""
+Near-Duplicate Index Module - Perceptual-hash lookup of recently analyzed images.
+The same dish is often photographed several times from slightly different
+angles within minutes. Verdicts are indexed by the image's 64-bit dHash with
+multi-index hashing, so a new upload within a small Hamming distance of a
+recent one can reuse that verdict or be flagged for review, depending on
+NEAR_DUPLICATE_MODE.
+"""
+
+import json
+import os
+import threading
+import time
+from collections import deque
+from typing import Optional
+
+# "off" disables hashing, "flag" annotates fresh verdicts with the match,
+# "reuse" returns the matched verdict instead of calling the model
+NEAR_DUPLICATE_MODE = os.getenv("NEAR_DUPLICATE_MODE", "flag").lower()
+NEAR_DUPLICATE_WINDOW_SECONDS = float(os.getenv("NEAR_DUPLICATE_WINDOW_SECONDS", 10 * 60))
+NEAR_DUPLICATE_MAX_DISTANCE = int(os.getenv("NEAR_DUPLICATE_MAX_DISTANCE", 6))
+NEAR_DUPLICATE_MAX_ENTRIES = int(os.getenv("NEAR_DUPLICATE_MAX_ENTRIES", 50000))
+
+NEAR_DUPLICATE_MODES = ("off", "flag", "reuse")
+if NEAR_DUPLICATE_MODE not in NEAR_DUPLICATE_MODES:
+    raise ValueError(
+        f"Unknown NEAR_DUPLICATE_MODE '{NEAR_DUPLICATE_MODE}' (expected one of: {', '.join(NEAR_DUPLICATE_MODES)})"
+    )
+
+
+class _Entry:
+    __slots__ = ("image_hash", "context", "stored_at", "analyzed_at", "verdict", "alive")
+
+    def __init__(self, image_hash: int, context: tuple, verdict: str, analyzed_at: str):
+        self.image_hash = image_hash
+        self.context = context
+        self.stored_at = time.monotonic()
+        self.analyzed_at = analyzed_at
+        self.verdict = verdict
+        self.alive = True
+
+
+def _chunk_bounds(bits: int, chunks: int) -> list:
+    """Split `bits` into `chunks` contiguous (shift, mask) ranges of near-equal width."""
+    bounds = []
+    shift = 0
+    for index in range(chunks):
+        width = bits // chunks + (1 if index < bits % chunks else 0)
+        bounds.append((shift, (1 << width) - 1))
+        shift += width
+    return bounds
+
+
+class NearDuplicateIndex:
+    """
+    Thread-safe multi-index hash table of recent verdicts.
+
+    The 64-bit hash is split into max_distance + 1 chunks with one table per
+    chunk. Two hashes within max_distance bits must agree exactly on at least
+    one chunk, so only entries sharing a chunk value are compared - a few
+    hundred candidates at tens of thousands of entries, where a BK-tree over
+    uniformly spread hashes visits most of its nodes.
+
+    A match must also share the request context (elapsed-time buckets and
+    food category), since the same photo taken hours later can deserve a
+    different verdict. Entries expire after the window; expired and evicted
+    entries are tombstoned and the tables are rebuilt once they outnumber the
+    live ones.
+    """
+
+    def __init__(
+        self,
+        window_seconds: float = NEAR_DUPLICATE_WINDOW_SECONDS,
+        max_distance: int = NEAR_DUPLICATE_MAX_DISTANCE,
+        max_entries: int = NEAR_DUPLICATE_MAX_ENTRIES,
+        hash_bits: int = 64
+    ):
+        self.window_seconds = window_seconds
+        self.max_distance = max_distance
+        self.max_entries = max_entries
+        self._bounds = _chunk_bounds(hash_bits, min(max_distance + 1, hash_bits))
+        self._tables = [{} for _ in self._bounds]  # chunk value -> [entries]
+        self._order = deque()  # live entries, oldest first
+        self._dead = 0
+        self._lock = threading.Lock()
+        self.lookups = 0
+        self.hits = 0
+
+    def find(self, image_hash: int, context: tuple) -> Optional[dict]:
+        """
+        Find the closest recent verdict within max_distance of `image_hash`.
+
+        Ties go to the most recent entry.
+
+        Returns:
+            dict with "verdict" (a copy), "distance" and "analyzedAt", or None
+        """
+        with self._lock:
+            self.lookups += 1
+            self._expire()
+            best = None
+            best_distance = self.max_distance + 1
+            for table, (shift, mask) in zip(self._tables, self._bounds):
+                for entry in table.get((image_hash >> shift) & mask, ()):
+                    if not entry.alive or entry.context != context:
+                        continue
+                    distance = (entry.image_hash ^ image_hash).bit_count()
+                    if distance < best_distance or (
+                        distance == best_distance and entry.stored_at > best.stored_at
+                    ):
+                        best, best_distance = entry, distance
+            if best is None:
+                return None
+            self.hits += 1
+            return {"verdict": json.loads(best.verdict), "distance": best_distance, "analyzedAt": best.analyzed_at}
+
+    def add(self, image_hash: int, context: tuple, verdict: dict):
+        """Index a verdict under the image's perceptual hash and request context."""
+        entry = _Entry(image_hash, context, json.dumps(verdict), verdict.get("analyzedAt"))
+        with self._lock:
+            self._insert(entry)
+            self._order.append(entry)
+            self._expire()
+            while len(self._order) > self.max_entries:
+                self._kill(self._order.popleft())
+            if self._dead > len(self._order) and self._dead > 1024:
+                self._rebuild()
+
+    def clear(self):
+        """Remove every entry."""
+        with self._lock:
+            self._tables = [{} for _ in self._bounds]
+            self._order.clear()
+            self._dead = 0
+
+    def stats(self) -> dict:
+        """Return occupancy and lookup hit counters."""
+        with self._lock:
+            return {
+                "mode": NEAR_DUPLICATE_MODE,
+                "entries": len(self._order),
+                "lookups": self.lookups,
+                "hits": self.hits,
+                "hit_rate": round(self.hits / self.lookups * 100, 2) if self.lookups > 0 else 0.0,
+                "window_seconds": self.window_seconds,
+                "max_distance": self.max_distance
+            }
+
+    def _insert(self, entry: _Entry):
+        for table, (shift, mask) in zip(self._tables, self._bounds):
+            table.setdefault((entry.image_hash >> shift) & mask, []).append(entry)
+
+    def _expire(self):
+        cutoff = time.monotonic() - self.window_seconds
+        while self._order and self._order[0].stored_at < cutoff:
+            self._kill(self._order.popleft())
+
+    def _kill(self, entry: _Entry):
+        entry.alive = False
+        entry.verdict = None
+        self._dead += 1
+
+    def _rebuild(self):
+        self._tables = [{} for _ in self._bounds]
+        self._dead = 0
+        for entry in self._order:
+            self._insert(entry)
+
+
+# Process-wide index used by food_analyzer
+near_duplicate_index = NearDuplicateIndex()
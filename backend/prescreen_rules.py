@@ -0,0 +1,125 @@
+"""
+Prescreen Rules Module - Deterministic time-temperature checks ahead of the model.
+Applies the FSSAI time limits from Step 3 of the system prompt to the elapsed
+preparation/packaging times and returns an immediate DISCARD verdict when the
+limit is exceeded, so no model call is needed.
+"""
+
+import json
+import os
+from datetime import datetime
+from typing import Optional
+
+PRESCREEN_ENABLED = os.getenv("PRESCREEN_ENABLED", "true").lower() == "true"
+
+# Extra hours beyond a limit before it counts as unambiguously exceeded,
+# absorbing clock skew between the donor's device and the server
+PRESCREEN_MARGIN_HOURS = float(os.getenv("PRESCREEN_MARGIN_HOURS", 0.25))
+
+# Maximum hours since preparation / packaging per food-risk category. The
+# "default" entry applies when no known category is sent. The prompt's
+# 2-hour/4-hour rule discards anything over 4 hours whatever its risk
+# category, so every entry matches it; a longer limit would only send food
+# the model must discard anyway to the model.
+# Override with PRESCREEN_RULES (JSON) or PRESCREEN_RULES_FILE (path to JSON).
+DEFAULT_RULE = "default"
+DEFAULT_PRESCREEN_RULES = {
+    DEFAULT_RULE: {"max_hours_since_preparation": 4.0, "max_hours_since_packaging": 4.0},
+    "high_risk": {"max_hours_since_preparation": 4.0, "max_hours_since_packaging": 4.0},
+    "medium_risk": {"max_hours_since_preparation": 4.0, "max_hours_since_packaging": 4.0},
+    "low_risk": {"max_hours_since_preparation": 4.0, "max_hours_since_packaging": 4.0}
+}
+
+
+def _load_rules() -> dict:
+    rules_json = os.getenv("PRESCREEN_RULES")
+    rules_file = os.getenv("PRESCREEN_RULES_FILE")
+    if rules_json:
+        return json.loads(rules_json)
+    if rules_file:
+        with open(rules_file, "r", encoding="utf-8") as f:
+            return json.load(f)
+    return DEFAULT_PRESCREEN_RULES
+
+
+PRESCREEN_RULES = _load_rules()
+
+
+def _limit(category_rules: dict, key: str) -> float:
+    value = category_rules.get(key)
+    return float("inf") if value is None else float(value)
+
+
+def evaluate_time_rules(
+    hours_since_prep: float,
+    hours_since_pkg: float,
+    food_category: Optional[str] = None,
+    rules: dict = None
+) -> Optional[dict]:
+    """
+    Return a rule-based DISCARD verdict if time limits are unambiguously exceeded.
+
+    Without a known food category the "default" rule is used. Custom rules
+    without one fall back to the most lenient limit across all categories, so
+    the rule only fires when no category could still be safe.
+
+    Args:
+        hours_since_prep: Hours elapsed since preparation
+        hours_since_pkg: Hours elapsed since packaging
+        food_category: Optional category key (e.g. "high_risk") supplied by the donor
+        rules: Category rules (default: PRESCREEN_RULES)
+
+    Returns:
+        dict in the analyze_food_image response schema, or None if the model
+        should decide
+    """
+    rules = PRESCREEN_RULES if rules is None else rules
+    if food_category in rules and food_category != DEFAULT_RULE:
+        applicable = {food_category: rules[food_category]}
+    else:
+        food_category = None
+        applicable = {DEFAULT_RULE: rules[DEFAULT_RULE]} if DEFAULT_RULE in rules else rules
+
+    if not applicable:
+        return None
+
+    prep_limit = max(_limit(r, "max_hours_since_preparation") for r in applicable.values())
+    pkg_limit = max(_limit(r, "max_hours_since_packaging") for r in applicable.values())
+
+    if hours_since_prep > prep_limit + PRESCREEN_MARGIN_HOURS:
+        rule_id, elapsed, limit, event = "max_hours_since_preparation", hours_since_prep, prep_limit, "preparation"
+    elif hours_since_pkg > pkg_limit + PRESCREEN_MARGIN_HOURS:
+        rule_id, elapsed, limit, event = "max_hours_since_packaging", hours_since_pkg, pkg_limit, "packaging"
+    else:
+        return None
+
+    category_text = food_category.replace("_", " ") if food_category else "any food category"
+    time_finding = (
+        f"{elapsed:.1f} hours have elapsed since {event}, exceeding the {limit:g}-hour "
+        f"limit for {category_text}. Under the FSSAI 2-hour/4-hour rule food held this "
+        f"long in the temperature danger zone must be discarded."
+    )
+
+    return {
+        "classification": "NOT-EDIBLE",
+        "decision": "DISCARD",
+        "risk_level": "HIGH",
+        "confidence": 1.0,
+        "reasoning": {
+            "visual_inspection": "Not performed - time-temperature limit already exceeded",
+            "food_identification": f"Not performed - rule applied for {category_text}",
+            "time_temperature": time_finding,
+            "protective_factors": "Not considered - time limits are non-negotiable",
+            "donation_context": "Food past safe holding time cannot be accepted for donation",
+            "final_assessment": f"Discarded by deterministic time-temperature rule: {time_finding}"
+        },
+        "advisory": "Do not donate - safe holding time has been exceeded",
+        "analyzedAt": datetime.now().isoformat(),
+        "ruleBased": True,
+        "rule": {
+            "id": rule_id,
+            "foodCategory": food_category,
+            "limitHours": limit,
+            "elapsedHours": round(elapsed, 2)
+        }
+    }
@@ -0,0 +1,297 @@
+"""
+Resilience Module - Deadlines, retries and a circuit breaker for upstream model calls.
+Bounds how long a request can wait on Gemini, retries transient failures with
+jittered exponential backoff and fails fast while the upstream is down, so
+outages surface as "upstream unavailable" instead of food safety verdicts.
+"""
+
+import os
+import random
+import threading
+import time
+from typing import Callable
+
+# Per-attempt timeout and overall deadline across retries (seconds)
+GEMINI_TIMEOUT_SECONDS = float(os.getenv("GEMINI_TIMEOUT_SECONDS", 45))
+GEMINI_DEADLINE_SECONDS = float(os.getenv("GEMINI_DEADLINE_SECONDS", 90))
+
+# Retries after the first attempt, with full-jitter exponential backoff
+GEMINI_MAX_RETRIES = int(os.getenv("GEMINI_MAX_RETRIES", 2))
+GEMINI_RETRY_BASE_DELAY_SECONDS = float(os.getenv("GEMINI_RETRY_BASE_DELAY_SECONDS", 0.5))
+GEMINI_RETRY_MAX_DELAY_SECONDS = float(os.getenv("GEMINI_RETRY_MAX_DELAY_SECONDS", 8))
+
+# Consecutive transient failures that open the breaker (0 disables it),
+# and how long it stays open before a single probe call is let through
+CIRCUIT_BREAKER_FAILURE_THRESHOLD = int(os.getenv("CIRCUIT_BREAKER_FAILURE_THRESHOLD", 5))
+CIRCUIT_BREAKER_RESET_SECONDS = float(os.getenv("CIRCUIT_BREAKER_RESET_SECONDS", 30))
+
+# Breaker states
+BREAKER_CLOSED = "closed"
+BREAKER_OPEN = "open"
+BREAKER_HALF_OPEN = "half_open"
+
+# google.api_core exception classes worth retrying, resolved on first use
+# because importing google.api_core pulls in grpc and protobuf
+TRANSIENT_GOOGLE_ERRORS = (
+    "TooManyRequests",
+    "ResourceExhausted",
+    "ServiceUnavailable",
+    "InternalServerError",
+    "BadGateway",
+    "GatewayTimeout",
+    "DeadlineExceeded",
+    "Aborted",
+    "Unknown"
+)
+
+_error_classes = None  # (transient errors, timeout errors)
+
+
+def _get_error_classes() -> tuple:
+    global _error_classes
+    if _error_classes is None:
+        from google.api_core import exceptions as google_exceptions
+
+        transient = tuple(getattr(google_exceptions, name) for name in TRANSIENT_GOOGLE_ERRORS)
+        _error_classes = (
+            transient + (TimeoutError, ConnectionError),
+            (google_exceptions.DeadlineExceeded, TimeoutError)
+        )
+    return _error_classes
+
+
+class UpstreamUnavailableError(Exception):
+    """
+    Raised when the model could not be reached within the retry budget or the
+    circuit breaker is open. This is not a verdict and must not be logged as one.
+    """
+
+    def __init__(self, message: str, retry_after: float = None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+def is_transient_error(error: Exception) -> bool:
+    """Check whether an upstream error is worth retrying (rate limits, 5xx, timeouts)."""
+    return isinstance(error, _get_error_classes()[0])
+
+
+class CircuitBreaker:
+    """
+    Consecutive-failure circuit breaker.
+
+    Closed: calls pass through. After `failure_threshold` consecutive transient
+    failures it opens and rejects calls for `reset_seconds`, then moves to
+    half-open and admits one probe call; the probe's outcome closes or
+    re-opens the breaker.
+    """
+
+    def __init__(
+        self,
+        failure_threshold: int = CIRCUIT_BREAKER_FAILURE_THRESHOLD,
+        reset_seconds: float = CIRCUIT_BREAKER_RESET_SECONDS
+    ):
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self._state = BREAKER_CLOSED
+        self._consecutive_failures = 0
+        self._opened_at = None
+        self._probe_in_flight = False
+        self._times_opened = 0
+        self._rejected = 0
+        self._lock = threading.Lock()
+
+    def before_call(self):
+        """
+        Admit a call or fail fast.
+
+        Raises:
+            UpstreamUnavailableError: If the breaker is open (or half-open with
+                a probe already in flight)
+        """
+        if self.failure_threshold <= 0:
+            return
+        with self._lock:
+            if self._state == BREAKER_OPEN:
+                remaining = self._opened_at + self.reset_seconds - time.monotonic()
+                if remaining > 0:
+                    self._rejected += 1
+                    raise UpstreamUnavailableError(
+                        "Circuit breaker is open after repeated upstream failures",
+                        retry_after=remaining
+                    )
+                self._state = BREAKER_HALF_OPEN
+
+            if self._state == BREAKER_HALF_OPEN:
+                if self._probe_in_flight:
+                    self._rejected += 1
+                    raise UpstreamUnavailableError(
+                        "Circuit breaker is half-open and waiting on a probe call",
+                        retry_after=self.reset_seconds
+                    )
+                self._probe_in_flight = True
+
+    def record_success(self):
+        """Record that the upstream answered; closes the breaker."""
+        with self._lock:
+            self._state = BREAKER_CLOSED
+            self._consecutive_failures = 0
+            self._probe_in_flight = False
+
+    def record_failure(self):
+        """Record a transient failure; opens the breaker at the threshold or on a failed probe."""
+        with self._lock:
+            self._consecutive_failures += 1
+            self._probe_in_flight = False
+            if self.failure_threshold <= 0:
+                return
+            if self._state == BREAKER_HALF_OPEN or self._consecutive_failures >= self.failure_threshold:
+                if self._state != BREAKER_OPEN:
+                    self._times_opened += 1
+                self._state = BREAKER_OPEN
+                self._opened_at = time.monotonic()
+
+    def stats(self) -> dict:
+        """Return breaker state for health reporting."""
+        with self._lock:
+            retry_after = None
+            if self._state == BREAKER_OPEN:
+                retry_after = round(max(0.0, self._opened_at + self.reset_seconds - time.monotonic()), 1)
+            return {
+                "enabled": self.failure_threshold > 0,
+                "state": self._state,
+                "consecutive_failures": self._consecutive_failures,
+                "failure_threshold": self.failure_threshold,
+                "times_opened": self._times_opened,
+                "rejected_calls": self._rejected,
+                "retry_after_seconds": retry_after
+            }
+
+
+class ResilientCaller:
+    """
+    Runs upstream calls under a deadline, a retry policy and a circuit breaker.
+
+    Each attempt receives the timeout it may use (the per-attempt timeout,
+    capped by what is left of the overall deadline). Transient errors are
+    retried with full-jitter exponential backoff while the deadline allows;
+    other errors propagate unchanged.
+    """
+
+    def __init__(
+        self,
+        timeout_seconds: float = GEMINI_TIMEOUT_SECONDS,
+        deadline_seconds: float = GEMINI_DEADLINE_SECONDS,
+        max_retries: int = GEMINI_MAX_RETRIES,
+        base_delay_seconds: float = GEMINI_RETRY_BASE_DELAY_SECONDS,
+        max_delay_seconds: float = GEMINI_RETRY_MAX_DELAY_SECONDS,
+        breaker: CircuitBreaker = None
+    ):
+        self.timeout_seconds = timeout_seconds
+        self.deadline_seconds = deadline_seconds
+        self.max_retries = max_retries
+        self.base_delay_seconds = base_delay_seconds
+        self.max_delay_seconds = max_delay_seconds
+        self.breaker = breaker if breaker is not None else CircuitBreaker()
+        self._calls = 0
+        self._retries = 0
+        self._transient_failures = 0
+        self._timeouts = 0
+        self._unavailable = 0
+        self._lock = threading.Lock()
+
+    def _count(self, name: str, amount: int = 1):
+        with self._lock:
+            setattr(self, name, getattr(self, name) + amount)
+
+    def backoff_delay(self, retry: int) -> float:
+        """Full-jitter backoff before retry number `retry` (0-based)."""
+        return random.uniform(0, min(self.max_delay_seconds, self.base_delay_seconds * (2 ** retry)))
+
+    def call(self, fn: Callable[[float], object]):
+        """
+        Call `fn(timeout_seconds)` with retries and circuit breaking.
+
+        Args:
+            fn: Performs one upstream attempt within the given timeout
+
+        Returns:
+            The value returned by `fn`
+
+        Raises:
+            UpstreamUnavailableError: If the breaker is open or transient
+                failures outlast the retries or the deadline
+        """
+        self._count("_calls")
+        deadline = time.monotonic() + self.deadline_seconds
+        retry = 0
+        while True:
+            try:
+                self.breaker.before_call()
+            except UpstreamUnavailableError:
+                self._count("_unavailable")
+                raise
+
+            timeout = min(self.timeout_seconds, max(deadline - time.monotonic(), 0.001))
+            try:
+                result = fn(timeout)
+            except Exception as e:
+                if not is_transient_error(e):
+                    # The upstream answered (e.g. invalid request) - not an outage
+                    self.breaker.record_success()
+                    raise
+                self.breaker.record_failure()
+                self._count("_transient_failures")
+                if isinstance(e, _get_error_classes()[1]):
+                    self._count("_timeouts")
+
+                delay = self.backoff_delay(retry)
+                if retry >= self.max_retries or time.monotonic() + delay >= deadline:
+                    self._count("_unavailable")
+                    raise UpstreamUnavailableError(
+                        f"Model service unavailable after {retry + 1} attempt(s): {e}",
+                        retry_after=self.breaker.reset_seconds
+                    ) from e
+                print(f"Transient model error, retrying in {delay:.2f}s: {e}")
+                time.sleep(delay)
+                retry += 1
+                self._count("_retries")
+                continue
+
+            self.breaker.record_success()
+            return result
+
+    def record_failure(self, error: Exception):
+        """
+        Record a transient failure that happened outside call(), such as a
+        streamed response breaking off, and return the error to raise.
+        """
+        self.breaker.record_failure()
+        self._count("_transient_failures")
+        self._count("_unavailable")
+        return UpstreamUnavailableError(
+            f"Model service unavailable: {error}",
+            retry_after=self.breaker.reset_seconds
+        )
+
+    def stats(self) -> dict:
+        """Return retry counters and circuit breaker state."""
+        with self._lock:
+            counters = {
+                "calls": self._calls,
+                "retries": self._retries,
+                "transient_failures": self._transient_failures,
+                "timeouts": self._timeouts,
+                "unavailable": self._unavailable
+            }
+        return {
+            **counters,
+            "max_retries": self.max_retries,
+            "timeout_seconds": self.timeout_seconds,
+            "deadline_seconds": self.deadline_seconds,
+            "circuit_breaker": self.breaker.stats()
+        }
+
+
+# Process-wide guard around the analyzer backend call
+upstream_caller = ResilientCaller()
@@ -0,0 +1,321 @@
+"""
+Response Archive Module - Record/replay of model responses.
+In record mode every successful model response is stored in a compact SQLite
+archive (zlib-compressed text plus chunk timings and token usage), keyed by
+a fingerprint of the request; in replay mode responses are served from the
+archive, optionally with their original latency, so /api/analyze-food can be
+benchmarked and production incidents reproduced offline and deterministically.
+Select with MODEL_ARCHIVE_MODE=off|record|replay|replay_or_record.
+"""
+
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+import zlib
+from datetime import datetime
+from typing import Optional
+
+from analyzer_backends import AnalysisRequest, AnalyzerBackend, ModelResponse
+from resilience import UpstreamUnavailableError
+from sqlite_connections import ThreadConnections
+from system_prompt import get_system_prompt
+
+# Archive location (defaults to the analysis data directory)
+MODEL_ARCHIVE_FILE = os.getenv(
+    "MODEL_ARCHIVE_FILE",
+    os.path.join(
+        os.getenv("ANALYSIS_DATA_DIR", os.path.join(os.path.dirname(__file__), "data")), "model_responses.db"
+    )
+)
+
+# Replayed responses wait this fraction of their recorded latency (0 = instant, 1 = original)
+MODEL_REPLAY_LATENCY_SCALE = float(os.getenv("MODEL_REPLAY_LATENCY_SCALE", 0))
+
+ARCHIVE_MODES = ("record", "replay", "replay_or_record")
+
+# Absolute timestamps in the prompt (submitted and current times) change on
+# every run; the elapsed hours derived from them stay in the fingerprint
+_TIMESTAMP = re.compile(r"\d{4}-\d{2}-\d{2}[T ]\d{2}:\d{2}(?::\d{2}(?:\.\d+)?)?(?:Z|[+-]\d{2}:?\d{2})?")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    fingerprint TEXT PRIMARY KEY,
+    backend TEXT NOT NULL,
+    recorded_at TEXT NOT NULL,
+    latency_ms REAL NOT NULL,
+    prompt_tokens INTEGER,
+    output_tokens INTEGER,
+    total_tokens INTEGER,
+    chunks BLOB NOT NULL,
+    request BLOB NOT NULL
+);
+"""
+
+
+class ArchiveMissError(UpstreamUnavailableError):
+    """
+    Raised in replay mode when no response was recorded for a request.
+    Handled like an upstream outage: 503 and nothing logged, so replay runs
+    never add error verdicts to the audit trail.
+    """
+
+
+def request_fingerprint(request: AnalysisRequest, backend_name: str) -> str:
+    """
+    Fingerprint an analysis request for the archive.
+
+    Covers the backend, system prompt, user prompt (absolute timestamps
+    masked), generation config, food category and a SHA-256 of the image
+    bytes actually sent, so any change that could alter the response gives
+    a new fingerprint.
+
+    Returns:
+        str: Hex digest
+    """
+    digest = hashlib.sha256()
+    for part in (
+        backend_name,
+        request.system_instruction or get_system_prompt(),
+        _TIMESTAMP.sub("<time>", request.prompt),
+        json.dumps(request.generation_config, sort_keys=True, default=str),
+        request.mime_type,
+        request.food_category or ""
+    ):
+        digest.update(part.encode("utf-8"))
+        digest.update(b"\0")
+    digest.update(hashlib.sha256(request.image_bytes).digest())
+    return digest.hexdigest()
+
+
+def _pack(value) -> bytes:
+    return zlib.compress(json.dumps(value, separators=(",", ":")).encode("utf-8"), 9)
+
+
+def _unpack(blob: bytes):
+    return json.loads(zlib.decompress(blob).decode("utf-8"))
+
+
+class ResponseArchive:
+    """SQLite store of recorded responses, one connection per thread (closed when the thread exits)."""
+
+    def __init__(self, db_path: str = MODEL_ARCHIVE_FILE):
+        self.db_path = db_path
+        self._write_lock = threading.Lock()
+        self._connections = ThreadConnections(self._open_connection)
+        if os.path.dirname(db_path):
+            os.makedirs(os.path.dirname(db_path), exist_ok=True)
+        self._connect().executescript(_SCHEMA)
+
+    def _open_connection(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.db_path, timeout=30, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        return conn
+
+    def _connect(self) -> sqlite3.Connection:
+        return self._connections.get()
+
+    def get(self, fingerprint: str) -> Optional[dict]:
+        """Return the recorded response ({chunks, latency_ms, usage}) or None."""
+        row = self._connect().execute(
+            "SELECT latency_ms, prompt_tokens, output_tokens, total_tokens, chunks "
+            "FROM responses WHERE fingerprint = ?",
+            (fingerprint,)
+        ).fetchone()
+        if row is None:
+            return None
+        return {
+            "latency_ms": row[0],
+            "usage": (row[1], row[2], row[3]),
+            "chunks": _unpack(row[4])
+        }
+
+    def put(
+        self,
+        fingerprint: str,
+        backend_name: str,
+        request: AnalysisRequest,
+        chunks: list,
+        latency_seconds: float,
+        usage: tuple
+    ):
+        """
+        Store a response, replacing any earlier recording of the same request.
+
+        Args:
+            chunks: [seconds since the call started, text] pairs; one pair
+                for a non-streamed response
+            usage: (prompt_tokens, output_tokens, total_tokens)
+        """
+        request_info = {
+            "prompt": request.prompt,
+            "generation_config": request.generation_config,
+            "mime_type": request.mime_type,
+            "image_sha256": hashlib.sha256(request.image_bytes).hexdigest(),
+            "image_bytes": len(request.image_bytes),
+            "hours_since_prep": request.hours_since_prep,
+            "hours_since_pkg": request.hours_since_pkg,
+            "food_category": request.food_category
+        }
+        conn = self._connect()
+        with self._write_lock, conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    fingerprint, backend_name, datetime.now().isoformat(), round(latency_seconds * 1000, 3),
+                    *usage, _pack(chunks), _pack(request_info)
+                )
+            )
+
+    def count(self) -> int:
+        return self._connect().execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+
+    def close(self):
+        """Close every open connection to the archive."""
+        self._connections.close()
+
+
+class RecordReplayBackend(AnalyzerBackend):
+    """
+    Wraps an analyzer backend to record its responses or replay recorded ones.
+
+    The wrapped backend is only constructed when a call has to reach it, so
+    replay mode needs no API key. Only successful responses are recorded;
+    errors and broken streams are left to the resilience layer as usual.
+    """
+
+    def __init__(
+        self,
+        backend_name: str,
+        backend_factory,
+        mode: str,
+        archive: Optional[ResponseArchive] = None,
+        latency_scale: float = MODEL_REPLAY_LATENCY_SCALE
+    ):
+        if mode not in ARCHIVE_MODES:
+            raise ValueError(f"Unknown MODEL_ARCHIVE_MODE '{mode}' (expected off or one of: {', '.join(ARCHIVE_MODES)})")
+        self.name = backend_name
+        self.mode = mode
+        self.archive = archive if archive is not None else ResponseArchive()
+        self.latency_scale = latency_scale
+        self._backend_factory = backend_factory
+        self._inner = None
+        self._inner_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._recorded = 0
+
+    def _count(self, name: str):
+        with self._stats_lock:
+            setattr(self, name, getattr(self, name) + 1)
+
+    def _backend(self) -> AnalyzerBackend:
+        if self._inner is None:
+            with self._inner_lock:
+                if self._inner is None:
+                    self._inner = self._backend_factory()
+        return self._inner
+
+    def warm_up(self):
+        if self.mode != "replay":
+            self._backend().warm_up()
+
+    def _lookup(self, fingerprint: str) -> Optional[dict]:
+        if self.mode == "record":
+            return None
+        recorded = self.archive.get(fingerprint)
+        if recorded is not None:
+            self._count("_hits")
+            return recorded
+        self._count("_misses")
+        if self.mode == "replay":
+            raise ArchiveMissError(f"No recorded model response for request {fingerprint[:16]}")
+        return None
+
+    def _replay_delay(self, seconds: float, timeout: float, already_waited: float = 0.0) -> float:
+        """Wait `seconds` of recorded time scaled by latency_scale, honouring the call timeout."""
+        delay = seconds * self.latency_scale - already_waited
+        if delay <= 0:
+            return already_waited
+        if already_waited + delay > timeout:
+            from google.api_core import exceptions as google_exceptions
+
+            time.sleep(max(0.0, timeout - already_waited))
+            raise google_exceptions.DeadlineExceeded("Replayed response exceeded the call deadline")
+        time.sleep(delay)
+        return already_waited + delay
+
+    def generate(self, request: AnalysisRequest, timeout: float) -> ModelResponse:
+        fingerprint = request_fingerprint(request, self.name)
+        recorded = self._lookup(fingerprint)
+        if recorded is not None:
+            self._replay_delay(recorded["latency_ms"] / 1000, timeout)
+            return ModelResponse("".join(text for _, text in recorded["chunks"]), *recorded["usage"])
+
+        started = time.perf_counter()
+        response = self._backend().generate(request, timeout)
+        latency = time.perf_counter() - started
+        usage = (response.prompt_tokens, response.output_tokens, response.total_tokens)
+        self.archive.put(fingerprint, self.name, request, [[round(latency, 4), response.text]], latency, usage)
+        self._count("_recorded")
+        return response
+
+    def stream(self, request: AnalysisRequest, timeout: float):
+        fingerprint = request_fingerprint(request, self.name)
+        recorded = self._lookup(fingerprint)
+        if recorded is not None:
+            return self._replay_stream(recorded, timeout)
+
+        started = time.perf_counter()
+        chunks = self._backend().stream(request, timeout)
+        return self._record_stream(fingerprint, request, chunks, started)
+
+    def _replay_stream(self, recorded: dict, timeout: float):
+        chunks = recorded["chunks"]
+        usage = recorded["usage"]
+        # Time to first chunk is spent before returning, like a real call
+        waited = self._replay_delay(chunks[0][0] if chunks else 0.0, timeout)
+
+        def replay():
+            elapsed = waited
+            for index, (offset, text) in enumerate(chunks):
+                elapsed = self._replay_delay(offset, timeout, elapsed)
+                if index == len(chunks) - 1:
+                    yield ModelResponse(text, *usage)
+                else:
+                    yield ModelResponse(text)
+
+        return replay()
+
+    def _record_stream(self, fingerprint: str, request: AnalysisRequest, chunks, started: float):
+        def record():
+            recorded = []
+            usage = (None, None, None)
+            for chunk in chunks:
+                recorded.append([round(time.perf_counter() - started, 4), chunk.text])
+                if chunk.total_tokens is not None:
+                    usage = (chunk.prompt_tokens, chunk.output_tokens, chunk.total_tokens)
+                yield chunk
+            self.archive.put(fingerprint, self.name, request, recorded, time.perf_counter() - started, usage)
+            self._count("_recorded")
+
+        return record()
+
+    def model_pool_info(self):
+        return self._inner.model_pool_info() if self._inner is not None else None
+
+    def stats(self) -> dict:
+        """Return the mode, archive size and hit/miss/record counts."""
+        with self._stats_lock:
+            counters = {"hits": self._hits, "misses": self._misses, "recorded": self._recorded}
+        return {
+            "mode": self.mode,
+            "file": self.archive.db_path,
+            "entries": self.archive.count(),
+            "latency_scale": self.latency_scale,
+            **counters
+        }
@@ -0,0 +1,174 @@
+"""
+Single Flight Module - Coalesce concurrent identical calls into one execution.
+When a donor double-taps submit, two identical analyses arrive within
+milliseconds, before either can populate the verdict cache. The first caller
+for a key runs the work; callers arriving while it is in flight wait for it
+and receive a copy of the same result (or the same exception). Streaming
+work (a generator ending in its result) is shared the same way via stream().
+"""
+
+import json
+import threading
+
+
+class _Call:
+    __slots__ = ("done", "result", "error", "waiters")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.waiters = 0
+
+
+class SingleFlight:
+    """Thread-safe per-key deduplication of in-flight calls."""
+
+    def __init__(self):
+        self._calls = {}
+        self._lock = threading.Lock()
+        self.executions = 0
+        self.coalesced = 0
+
+    def do(self, key: str, fn) -> tuple:
+        """
+        Run fn() once per key among concurrent callers.
+
+        Args:
+            key: Identity of the call; equal keys must produce equal results
+            fn: Zero-argument callable returning a JSON-serializable dict
+
+        Returns:
+            tuple of (result, shared) where shared is True for callers that
+            waited on another caller's execution. Each caller gets its own
+            copy, so results can be annotated independently.
+
+        Raises:
+            Whatever fn() raised, in the executing caller and every waiter
+        """
+        while True:
+            call, leader = self._join(key)
+            if leader:
+                break
+            result = self._wait(call)
+            if result is not None:
+                return result, True
+
+        try:
+            result = fn()
+        except BaseException as e:
+            call.error = e
+            self._finish(key, call)
+            raise
+
+        self._complete(key, call, result)
+        return result, False
+
+    def stream(self, key: str, fn):
+        """
+        Streaming counterpart of do() for work that yields events.
+
+        Args:
+            key: Identity of the call, shared with do() callers
+            fn: Zero-argument callable returning an iterator of (event, payload)
+                tuples whose last event is ("result", result)
+
+        Yields:
+            For the executing caller, fn()'s events as they are produced. For
+            callers that waited, a single ("shared", result) event carrying
+            a copy of the final result.
+
+        Raises:
+            Whatever fn() raised, in the executing caller and every waiter
+        """
+        while True:
+            call, leader = self._join(key)
+            if leader:
+                break
+            result = self._wait(call)
+            if result is not None:
+                yield "shared", result
+                return
+
+        completed = False
+        events = fn()
+        try:
+            for event, payload in events:
+                if event == "result" and not completed:
+                    # Release the waiters before handing the result to this caller
+                    completed = True
+                    self._complete(key, call, payload)
+                yield event, payload
+        except GeneratorExit:
+            # The consumer went away mid-stream: stop the work (releasing its
+            # model call slot) and let the waiters run it themselves
+            if hasattr(events, "close"):
+                events.close()
+            if not completed:
+                self._finish(key, call)
+            raise
+        except BaseException as e:
+            if not completed:
+                call.error = e
+                self._finish(key, call)
+            raise
+        if not completed:
+            self._finish(key, call)
+
+    def _join(self, key: str) -> tuple:
+        """Return (call, leader) for key, registering a new call if none is in flight."""
+        with self._lock:
+            call = self._calls.get(key)
+            if call is None:
+                call = self._calls[key] = _Call()
+                self.executions += 1
+                return call, True
+            call.waiters += 1
+            self.coalesced += 1
+            return call, False
+
+    def _wait(self, call: _Call):
+        """
+        Wait for another caller's execution and return a copy of its result.
+
+        Returns None if it finished without one (a stream abandoned by its
+        consumer), in which case the caller should run the work itself.
+        """
+        call.done.wait()
+        if call.error is not None:
+            raise call.error
+        if call.result is None:
+            with self._lock:
+                self.coalesced -= 1
+            return None
+        return json.loads(call.result)
+
+    def _complete(self, key: str, call: _Call, result: dict):
+        """Retire an in-flight call with its result and wake any waiters."""
+        # No new waiters can join once the key is removed, so the count is final
+        if self._finish(key, call, set_done=False):
+            try:
+                call.result = json.dumps(result)
+            except (TypeError, ValueError) as e:
+                call.error = e
+        call.done.set()
+
+    def _finish(self, key: str, call: _Call, set_done: bool = True) -> bool:
+        """Retire an in-flight call; returns whether anyone is waiting on it."""
+        with self._lock:
+            del self._calls[key]
+            waiting = call.waiters > 0
+        if set_done:
+            call.done.set()
+        return waiting
+
+    def stats(self) -> dict:
+        """Return in-flight and coalescing counters."""
+        with self._lock:
+            total = self.executions + self.coalesced
+            return {
+                "in_flight": len(self._calls),
+                "executions": self.executions,
+                "coalesced": self.coalesced,
+                "coalesced_rate": round(self.coalesced / total * 100, 2) if total > 0 else 0.0
+            }
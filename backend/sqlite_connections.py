@@ -0,0 +1,71 @@
+"""
+SQLite Connections Module - Per-thread SQLite connections that close with their thread.
+SQLite connections should not be shared between threads, but the threaded
+development server and gthread workers run each request on a thread that may
+never come back. Connections are therefore kept only in thread-local storage
+and closed when their thread exits, so open connections and file descriptors
+track the live threads rather than every thread that ever made a query.
+"""
+
+import sqlite3
+import threading
+import weakref
+from typing import Callable
+
+
+class _ThreadConnection:
+    """Owns one thread's connection; closed on close() or when the thread's locals are released."""
+
+    def __init__(self, conn: sqlite3.Connection):
+        self.conn = conn
+
+    def close(self):
+        conn, self.conn = self.conn, None
+        if conn is not None:
+            try:
+                conn.close()
+            except sqlite3.Error:
+                pass
+
+    def __del__(self):
+        self.close()
+
+
+class ThreadConnections:
+    """
+    Lazily opened SQLite connection per thread.
+
+    Only thread-local storage holds a strong reference to each connection;
+    the registry used by close() is weak, so it never keeps a finished
+    thread's connection open.
+    """
+
+    def __init__(self, factory: Callable[[], sqlite3.Connection]):
+        self._factory = factory
+        self._local = threading.local()
+        self._open = weakref.WeakSet()
+        self._lock = threading.Lock()
+
+    def get(self) -> sqlite3.Connection:
+        """Return the calling thread's connection, opening it on first use."""
+        holder = getattr(self._local, "holder", None)
+        if holder is None:
+            holder = _ThreadConnection(self._factory())
+            self._local.holder = holder
+            with self._lock:
+                self._open.add(holder)
+        return holder.conn
+
+    def open_count(self) -> int:
+        """Return the number of connections currently open."""
+        with self._lock:
+            return len(self._open)
+
+    def close(self):
+        """Close every open connection; threads that query again get new ones."""
+        with self._lock:
+            holders = list(self._open)
+            self._open = weakref.WeakSet()
+            self._local = threading.local()
+        for holder in holders:
+            holder.close()
@@ -0,0 +1,416 @@
+"""
+SQLite Storage Module - Indexed embedded store for the audit trail.
+Keeps analysis records in a WAL-mode SQLite database so history and
+statistics queries stay fast as the log grows to millions of rows.
+
+Usage (one-shot import of the CSV log, rotated segments included):
+    python sqlite_storage.py import
+"""
+
+import os
+import sqlite3
+import sys
+import threading
+from contextlib import contextmanager
+
+from analysis_statistics import WINDOW_KEY_LENGTHS
+from csv_storage import ANALYSIS_LOG_FILE, DATA_DIR, CsvStorageBackend, _archive_dir, _ensure_data_dir
+from log_rotation import MANIFEST_FILENAME
+from sqlite_connections import ThreadConnections
+from storage_backend import RECORD_FIELDS, StorageBackend
+
+# Database location
+ANALYSIS_DB_FILE = os.getenv("ANALYSIS_DB_FILE", os.path.join(DATA_DIR, "food_analysis_log.db"))
+
+# Import the CSV log automatically when the database has no records yet
+ANALYSIS_DB_IMPORT_CSV = os.getenv("ANALYSIS_DB_IMPORT_CSV", "true").lower() == "true"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS analyses (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    timestamp TEXT NOT NULL,
+    image_filename TEXT,
+    preparation_time TEXT,
+    package_time TEXT,
+    classification TEXT,
+    decision TEXT,
+    risk_level TEXT,
+    confidence REAL,
+    reasoning_summary TEXT,
+    advisory TEXT,
+    error INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS idx_analyses_timestamp ON analyses (timestamp);
+CREATE INDEX IF NOT EXISTS idx_analyses_classification ON analyses (classification);
+CREATE INDEX IF NOT EXISTS idx_analyses_decision ON analyses (decision);
+CREATE INDEX IF NOT EXISTS idx_analyses_risk_level ON analyses (risk_level);
+"""
+
+# Exact statistics counters, one row per (kind, period, breakdown) combination.
+# kind is "total" (period '') or a WINDOW_KEY_LENGTHS window whose period is
+# the timestamp prefix. The trigger updates them in the inserting transaction,
+# so they stay exact with any number of writer processes.
+_COUNTS_SCHEMA = (
+    """
+    CREATE TABLE analysis_counts (
+        kind TEXT NOT NULL,
+        period TEXT NOT NULL,
+        classification TEXT NOT NULL,
+        decision TEXT NOT NULL,
+        risk_level TEXT NOT NULL,
+        error INTEGER NOT NULL,
+        count INTEGER NOT NULL,
+        PRIMARY KEY (kind, period, classification, decision, risk_level, error)
+    ) WITHOUT ROWID
+    """,
+    """
+    CREATE TRIGGER analyses_count AFTER INSERT ON analyses BEGIN
+        INSERT INTO analysis_counts
+        SELECT kind, period, ifnull(NEW.classification, ''), ifnull(NEW.decision, ''),
+               ifnull(NEW.risk_level, ''), NEW.error, 1
+        FROM (
+            SELECT 'total' AS kind, '' AS period
+            UNION ALL SELECT 'hour', substr(NEW.timestamp, 1, 13) WHERE length(NEW.timestamp) >= 13
+            UNION ALL SELECT 'day', substr(NEW.timestamp, 1, 10) WHERE length(NEW.timestamp) >= 10
+        ) WHERE true
+        ON CONFLICT DO UPDATE SET count = count + 1;
+    END
+    """
+)
+
+# Fills the counters from rows stored before the table existed
+_COUNTS_BACKFILL = """
+INSERT INTO analysis_counts
+SELECT kind, period, ifnull(classification, ''), ifnull(decision, ''), ifnull(risk_level, ''), error, COUNT(*)
+FROM (
+    SELECT 'total' AS kind, '' AS period, classification, decision, risk_level, error FROM analyses
+    UNION ALL SELECT 'hour', substr(timestamp, 1, 13), classification, decision, risk_level, error
+        FROM analyses WHERE length(timestamp) >= 13
+    UNION ALL SELECT 'day', substr(timestamp, 1, 10), classification, decision, risk_level, error
+        FROM analyses WHERE length(timestamp) >= 10
+)
+GROUP BY 1, 2, 3, 4, 5, 6
+"""
+
+# Columns the statistics break down by
+_BREAKDOWN_FIELDS = ("classification", "decision", "risk_level")
+
+_INSERT = (
+    f"INSERT INTO analyses ({', '.join(RECORD_FIELDS)}) "
+    f"VALUES ({', '.join('?' for _ in RECORD_FIELDS)})"
+)
+
+
+def _to_bool(value) -> bool:
+    if isinstance(value, str):
+        return value.strip().lower() == "true"
+    return bool(value)
+
+
+def _to_float(value) -> float:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return 0.0
+
+
+def _record_params(record: dict) -> tuple:
+    """Convert an audit record (or CSV row) into INSERT parameters."""
+    params = []
+    for field in RECORD_FIELDS:
+        value = record.get(field)
+        if field == "confidence":
+            value = _to_float(value)
+        elif field == "error":
+            value = 1 if _to_bool(value) else 0
+        elif value is None:
+            value = ""
+        params.append(value)
+    return tuple(params)
+
+
+def _new_bucket() -> dict:
+    return {"total": 0, "errors": 0, **{f"by_{field}": {} for field in _BREAKDOWN_FIELDS}}
+
+
+def _count_into(counts: dict, value, count: int):
+    """Add to a breakdown, reporting missing values as UNKNOWN like the running counters."""
+    key = value or "UNKNOWN"
+    counts[key] = counts.get(key, 0) + count
+
+
+def _add_counts(bucket: dict, classification: str, decision: str, risk_level: str, error: int, count: int):
+    """Add one analysis_counts row to a statistics bucket."""
+    bucket["total"] += count
+    if error:
+        bucket["errors"] += count
+    _count_into(bucket["by_classification"], classification, count)
+    _count_into(bucket["by_decision"], decision, count)
+    _count_into(bucket["by_risk_level"], risk_level, count)
+
+
+def _row_to_dict(row: sqlite3.Row) -> dict:
+    """Render a database row the way csv.DictReader renders a CSV row."""
+    record = {}
+    for field in RECORD_FIELDS:
+        value = row[field]
+        if field == "error":
+            value = "True" if value else "False"
+        elif value is None:
+            value = ""
+        else:
+            value = str(value)
+        record[field] = value
+    return record
+
+
+class SqliteStorageBackend(StorageBackend):
+    """
+    SQLite backend using WAL journaling and one connection per thread,
+    closed when the thread exits.
+
+    WAL lets readers proceed while a writer appends, and the indexes on
+    timestamp, classification and decision keep history queries independent
+    of table size. Statistics are read from counters that an insert trigger
+    keeps in the same transaction, so they are exact with any number of
+    worker processes and cost the same however many rows are stored.
+    """
+
+    name = "sqlite"
+    computes_statistics = True
+
+    def __init__(self, db_path: str = ANALYSIS_DB_FILE, import_csv: bool = ANALYSIS_DB_IMPORT_CSV):
+        self.db_path = db_path
+        self._write_lock = threading.Lock()
+        self._connections = ThreadConnections(self._open_connection)
+
+        if os.path.dirname(db_path) == DATA_DIR:
+            _ensure_data_dir()
+        elif os.path.dirname(db_path):
+            os.makedirs(os.path.dirname(db_path), exist_ok=True)
+
+        conn = self._connect()
+        conn.executescript(_SCHEMA)
+        self._ensure_counts(conn)
+
+        if import_csv and _csv_log_exists():
+            imported = self.import_csv()
+            if imported:
+                print(f"Imported {imported} records from {ANALYSIS_LOG_FILE}")
+
+    def _open_connection(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.db_path, timeout=30, check_same_thread=False)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    def _connect(self) -> sqlite3.Connection:
+        return self._connections.get()
+
+    def _ensure_counts(self, conn: sqlite3.Connection):
+        """Create the statistics counters, backfilling them from existing rows."""
+        # The write lock on the database makes exactly one worker create and fill them
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            exists = conn.execute(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'analysis_counts'"
+            ).fetchone()
+            if not exists:
+                for statement in _COUNTS_SCHEMA:
+                    conn.execute(statement)
+                conn.execute(_COUNTS_BACKFILL)
+            conn.commit()
+        except BaseException:
+            conn.rollback()
+            raise
+
+    def append(self, record: dict):
+        self.append_many([record])
+
+    def append_many(self, records: list):
+        conn = self._connect()
+        with self._write_lock, conn:
+            conn.executemany(_INSERT, [_record_params(r) for r in records])
+
+    def recent(self, limit: int = 100) -> list:
+        conn = self._connect()
+        rows = conn.execute(
+            "SELECT * FROM analyses ORDER BY id DESC LIMIT ?", (limit,)
+        ).fetchall()
+        return [_row_to_dict(row) for row in reversed(rows)]
+
+    def query_history(
+        self,
+        limit: int = 50,
+        cursor: str = None,
+        classification: str = None,
+        decision: str = None,
+        start: str = None,
+        end: str = None
+    ) -> tuple:
+        # The cursor is the id of the oldest returned record
+        clauses, params = [], []
+        if cursor:
+            clauses.append("id < ?")
+            params.append(int(cursor))
+        if classification:
+            clauses.append("classification = ?")
+            params.append(classification)
+        if decision:
+            clauses.append("decision = ?")
+            params.append(decision)
+        if start:
+            clauses.append("timestamp >= ?")
+            params.append(start)
+        if end:
+            # Inclusive prefix match: every timestamp starting with `end` sorts below this bound
+            clauses.append("timestamp <= ?")
+            params.append(end + "\uffff")
+
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        conn = self._connect()
+        rows = conn.execute(
+            f"SELECT * FROM analyses {where} ORDER BY id DESC LIMIT ?", (*params, limit + 1)
+        ).fetchall()
+
+        next_cursor = str(rows[limit - 1]["id"]) if len(rows) > limit and limit > 0 else None
+        return [_row_to_dict(row) for row in rows[:limit]], next_cursor
+
+    @contextmanager
+    def _read_snapshot(self):
+        """Run several reads against one consistent view of the database."""
+        conn = self._connect()
+        conn.execute("BEGIN")
+        try:
+            yield conn
+        finally:
+            conn.rollback()
+
+    def statistics_totals(self) -> dict:
+        bucket = _new_bucket()
+        rows = self._connect().execute(
+            "SELECT classification, decision, risk_level, error, count "
+            "FROM analysis_counts WHERE kind = 'total' AND period = ''"
+        )
+        for row in rows:
+            _add_counts(bucket, *row)
+        return bucket
+
+    def statistics_windows(self, window: str = "day", periods: int = 30) -> list:
+        if window not in WINDOW_KEY_LENGTHS:
+            raise ValueError(f"Unknown statistics window '{window}'")
+        with self._read_snapshot() as conn:
+            # The newest `periods` bucket keys, read from the primary key
+            keys = [key for key, in conn.execute(
+                "SELECT DISTINCT period FROM analysis_counts WHERE kind = ? ORDER BY period DESC LIMIT ?",
+                (window, periods)
+            )]
+            if not keys:
+                return []
+
+            buckets = {key: _new_bucket() for key in keys}
+            rows = conn.execute(
+                "SELECT period, classification, decision, risk_level, error, count "
+                "FROM analysis_counts WHERE kind = ? AND period >= ?",
+                (window, keys[-1])
+            )
+            for key, *counts in rows:
+                _add_counts(buckets[key], *counts)
+        return [dict(period=key, **buckets[key]) for key in keys]
+
+    def iter_records(self, start: int = 0):
+        conn = self._connect()
+        cursor = conn.execute(
+            "SELECT * FROM analyses ORDER BY id LIMIT -1 OFFSET ?", (start,)
+        )
+        for row in cursor:
+            yield _row_to_dict(row)
+
+    def count(self) -> int:
+        conn = self._connect()
+        return conn.execute("SELECT COUNT(*) FROM analyses").fetchone()[0]
+
+    def import_csv(self, batch_size: int = 5000) -> int:
+        """
+        Bulk-load the CSV audit log into the database.
+
+        Every segment is read, rotated and compressed ones included, oldest
+        first. The import only runs into an empty table, so running it again
+        (or from several workers at once) never duplicates records.
+
+        Args:
+            batch_size: Rows inserted per transaction
+
+        Returns:
+            int: Number of records imported, 0 if the table already had records
+        """
+        if self.count():
+            return 0
+
+        conn = self._connect()
+        imported = 0
+        batch = []
+        for record in CsvStorageBackend().iter_records():
+            batch.append(_record_params(record))
+            if len(batch) >= batch_size:
+                if not self._import_batch(conn, batch, only_if_empty=imported == 0):
+                    return 0
+                imported += len(batch)
+                batch = []
+        if batch:
+            if not self._import_batch(conn, batch, only_if_empty=imported == 0):
+                return 0
+            imported += len(batch)
+        return imported
+
+    def _import_batch(self, conn: sqlite3.Connection, batch: list, only_if_empty: bool) -> bool:
+        """Insert one import batch; the first checks for an empty table in the same transaction."""
+        with self._write_lock:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                if only_if_empty and conn.execute("SELECT 1 FROM analyses LIMIT 1").fetchone():
+                    conn.rollback()
+                    return False
+                conn.executemany(_INSERT, batch)
+                conn.commit()
+            except BaseException:
+                conn.rollback()
+                raise
+        return True
+
+    def close(self):
+        self._connections.close()
+
+
+def _csv_log_exists() -> bool:
+    """Whether there is a CSV audit log (active file or rotated segments) to import."""
+    return os.path.exists(ANALYSIS_LOG_FILE) or os.path.exists(os.path.join(_archive_dir(), MANIFEST_FILENAME))
+
+
+def import_csv_log(db_path: str = ANALYSIS_DB_FILE) -> int:
+    """
+    Import the CSV audit log into the SQLite database.
+
+    Returns:
+        int: Number of records imported, or -1 if the database already had records
+    """
+    backend = SqliteStorageBackend(db_path=db_path, import_csv=False)
+    try:
+        if backend.count():
+            return -1
+        return backend.import_csv()
+    finally:
+        backend.close()
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 2 or sys.argv[1] != "import":
+        print(__doc__)
+        sys.exit(1)
+
+    count = import_csv_log()
+    if count < 0:
+        print(f"{ANALYSIS_DB_FILE} already has records; not importing {ANALYSIS_LOG_FILE} again")
+        sys.exit(1)
+    print(f"Imported {count} records from {ANALYSIS_LOG_FILE} into {ANALYSIS_DB_FILE}")
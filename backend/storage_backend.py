@@ -0,0 +1,190 @@
+"""
+Storage Backend Module - Common interface for audit trail persistence.
+Defines the record layout shared by every backend and the operations the
+rest of the application relies on (append, recent history, statistics).
+"""
+
+from datetime import datetime
+
+# Audit record fields, in column order
+RECORD_FIELDS = [
+    "timestamp",
+    "image_filename",
+    "preparation_time",
+    "package_time",
+    "classification",
+    "decision",
+    "risk_level",
+    "confidence",
+    "reasoning_summary",
+    "advisory",
+    "error"
+]
+
+# Maximum stored length of the reasoning summary
+REASONING_SUMMARY_MAX_LENGTH = 500
+
+
+def build_record(
+    image_filename: str,
+    preparation_time: str,
+    package_time: str,
+    analysis_result: dict
+) -> dict:
+    """
+    Build an audit record from an analysis result.
+
+    Args:
+        image_filename: Original filename of the uploaded image
+        preparation_time: ISO format datetime string
+        package_time: ISO format datetime string
+        analysis_result: Dict containing the analysis result from food_analyzer
+
+    Returns:
+        dict keyed by RECORD_FIELDS
+    """
+    # Extract reasoning summary
+    reasoning = analysis_result.get("reasoning", {})
+    if isinstance(reasoning, dict):
+        reasoning_summary = reasoning.get("final_assessment", str(reasoning))
+    else:
+        reasoning_summary = str(reasoning)
+
+    # Truncate reasoning if too long
+    if len(reasoning_summary) > REASONING_SUMMARY_MAX_LENGTH:
+        reasoning_summary = reasoning_summary[:REASONING_SUMMARY_MAX_LENGTH - 3] + "..."
+
+    return {
+        "timestamp": datetime.now().isoformat(),
+        "image_filename": image_filename,
+        "preparation_time": preparation_time,
+        "package_time": package_time,
+        "classification": analysis_result.get("classification", "UNKNOWN"),
+        "decision": analysis_result.get("decision", "UNKNOWN"),
+        "risk_level": analysis_result.get("risk_level", "UNKNOWN"),
+        "confidence": analysis_result.get("confidence", 0.0),
+        "reasoning_summary": reasoning_summary,
+        "advisory": analysis_result.get("advisory", ""),
+        "error": analysis_result.get("error", False)
+    }
+
+
+def summarize_statistics(total: int, edible: int, not_edible: int, errors: int) -> dict:
+    """Build the statistics payload returned by get_statistics()."""
+    return {
+        "total_analyses": total,
+        "edible_count": edible,
+        "not_edible_count": not_edible,
+        "error_count": errors,
+        "edible_rate": round(edible / total * 100, 2) if total > 0 else 0.0
+    }
+
+
+def record_matches(
+    record: dict,
+    classification: str = None,
+    decision: str = None,
+    start: str = None,
+    end: str = None
+) -> bool:
+    """
+    Check a record against history filters.
+
+    `start` and `end` are ISO date or datetime prefixes; `end` is inclusive,
+    so end="2026-01-02" matches every record from that day.
+    """
+    if classification and record.get("classification") != classification:
+        return False
+    if decision and record.get("decision") != decision:
+        return False
+    timestamp = record.get("timestamp", "")
+    if start and timestamp < start:
+        return False
+    if end and timestamp[:len(end)] > end:
+        return False
+    return True
+
+
+class StorageBackend:
+    """
+    Base class for audit trail storage backends.
+
+    History rows are returned as dicts of strings keyed by RECORD_FIELDS,
+    oldest first, matching what csv.DictReader yields for the CSV log.
+    """
+
+    name = "base"
+
+    # True when the store aggregates statistics itself (statistics_totals and
+    # statistics_windows), so counts stay exact with several writer processes
+    computes_statistics = False
+
+    def append(self, record: dict):
+        """Persist a single audit record."""
+        raise NotImplementedError
+
+    def append_many(self, records: list):
+        """Persist several audit records."""
+        for record in records:
+            self.append(record)
+
+    def recent(self, limit: int = 100) -> list:
+        """Return the most recent `limit` records, oldest first."""
+        raise NotImplementedError
+
+    def statistics_totals(self) -> dict:
+        """Return overall counts broken down by classification, decision and risk level."""
+        raise NotImplementedError
+
+    def statistics_windows(self, window: str = "day", periods: int = 30) -> list:
+        """Return counts for the most recent hour or day buckets, newest first."""
+        raise NotImplementedError
+
+    def query_history(
+        self,
+        limit: int = 50,
+        cursor: str = None,
+        classification: str = None,
+        decision: str = None,
+        start: str = None,
+        end: str = None
+    ) -> tuple:
+        """
+        Return one page of matching records, newest first.
+
+        Args:
+            limit: Maximum number of records in the page
+            cursor: Opaque cursor from a previous page (None for the newest records)
+            classification: Only include this classification
+            decision: Only include this decision
+            start: Only include records at or after this ISO date/datetime
+            end: Only include records at or before this ISO date/datetime
+
+        Returns:
+            tuple of (records, next_cursor); next_cursor is None on the last page
+        """
+        # Generic fallback: scans everything. Backends override this with an
+        # implementation whose cost depends on the page size.
+        skip = int(cursor) if cursor else 0
+        matches = [
+            r for r in self.iter_records()
+            if record_matches(r, classification, decision, start, end)
+        ]
+        matches.reverse()
+        page = matches[skip:skip + limit]
+        next_cursor = str(skip + limit) if len(matches) > skip + limit else None
+        return page, next_cursor
+
+    def iter_records(self, start: int = 0):
+        """Yield stored records in insertion order, skipping the first `start`."""
+        raise NotImplementedError
+
+    def sync(self):
+        """Force written records to durable storage."""
+
+    def count(self) -> int:
+        """Return the number of stored records."""
+        return sum(1 for _ in self.iter_records())
+
+    def close(self):
+        """Release any resources held by the backend."""
@@ -0,0 +1,135 @@
+"""
+Streaming Parser Module - Incremental JSON value extraction for streamed responses.
+Consumes model output chunk by chunk and reports each scalar value (with its
+key path) the moment it is complete, without waiting for the whole object.
+"""
+
+import json
+
+_WHITESPACE = " \t\r\n"
+_SCALAR_END = ",}] \t\r\n"
+
+
+class IncrementalJsonParser:
+    """
+    Push parser that yields (path, value) pairs for completed JSON scalars.
+
+    `path` is a tuple of object keys and array indexes, e.g. ("decision",) or
+    ("reasoning", "final_assessment"). Text before the first "{" (such as a
+    markdown code fence) is ignored. Malformed input stops further output
+    rather than raising; the caller still parses the full text at the end.
+    """
+
+    def __init__(self):
+        self._buffer = ""
+        self._pos = 0
+        self._stack = []          # entries: [container_type, key_or_index, expecting_key]
+        self._started = False
+        self._done = False
+        self._string_scan = None  # resume position inside an unterminated string
+
+    def feed(self, text: str) -> list:
+        """Consume the next chunk and return newly completed (path, value) pairs."""
+        if self._done:
+            return []
+        self._buffer += text
+        completed = []
+        try:
+            self._parse(completed)
+        except ValueError:
+            self._done = True
+        # Drop consumed text so the buffer only holds the unfinished token
+        if self._pos > 4096:
+            self._buffer = self._buffer[self._pos:]
+            if self._string_scan is not None:
+                self._string_scan -= self._pos
+            self._pos = 0
+        return completed
+
+    def _path(self) -> tuple:
+        return tuple(entry[1] for entry in self._stack)
+
+    def _value_done(self, completed: list, value, is_container: bool = False):
+        """Record a finished value in the current container."""
+        if not self._stack:
+            self._done = True
+            return
+        top = self._stack[-1]
+        if not is_container:
+            completed.append((self._path(), value))
+        if top[0] == "object":
+            top[2] = True
+        else:
+            top[1] += 1
+
+    def _parse(self, completed: list):
+        buf = self._buffer
+        while self._pos < len(buf) and not self._done:
+            char = buf[self._pos]
+
+            if not self._started:
+                if char == "{":
+                    self._started = True
+                    self._stack.append(["object", None, True])
+                self._pos += 1
+                continue
+
+            if char in _WHITESPACE or char in ",:":
+                self._pos += 1
+                continue
+
+            top = self._stack[-1] if self._stack else None
+
+            if char == "\"":
+                end = self._find_string_end(buf, self._pos)
+                if end is None:
+                    return
+                value = json.loads(buf[self._pos:end + 1], strict=False)
+                self._pos = end + 1
+                if top is not None and top[0] == "object" and top[2]:
+                    top[1] = value
+                    top[2] = False
+                else:
+                    self._value_done(completed, value)
+                continue
+
+            if char in "{[":
+                # The parent's current key/index becomes part of the nested path
+                self._stack.append(["object", None, True] if char == "{" else ["array", 0, False])
+                self._pos += 1
+                continue
+
+            if char in "}]":
+                self._stack.pop()
+                self._pos += 1
+                if not self._stack:
+                    self._done = True
+                    return
+                self._value_done(completed, None, is_container=True)
+                continue
+
+            # Number or literal: needs a delimiter to know it is complete
+            end = self._pos
+            while end < len(buf) and buf[end] not in _SCALAR_END:
+                end += 1
+            if end == len(buf):
+                return
+            value = json.loads(buf[self._pos:end])
+            self._pos = end
+            self._value_done(completed, value)
+
+    def _find_string_end(self, buf: str, start: int):
+        """Return the index of the closing quote of the string at `start`, or None."""
+        i = self._string_scan if self._string_scan is not None else start + 1
+        while i < len(buf):
+            char = buf[i]
+            if char == "\\":
+                i += 2
+                continue
+            if char == "\"":
+                self._string_scan = None
+                return i
+            i += 1
+        # Resume from here next time; back up if the chunk ended inside an escape
+        self._string_scan = len(buf) - 1 if i > len(buf) else i
+        return None
@@ -106,9 +106,135 @@ You MUST respond with ONLY a valid JSON object in this exact format:
 IMPORTANT: Only respond with the JSON object. Do not include any other text, markdown formatting, or code blocks.
 """
 
+# Condensed system prompt for compact mode: the same pipeline, thresholds and
+# rules without the markdown walkthrough, and no response format section
+# because the response schema carries the structure
+COMPACT_SYSTEM_PROMPT = """
+You are a food safety analyst applying the FSSAI framework to decide whether food can be donated.
+
+EVALUATION PIPELINE - apply every step, report only the fields the response schema asks for.
+Step 1: Visual Inspection - spoilage, mold, discoloration, texture, packaging damage, condensation, pests, hygiene.
+Step 2: Food Identification - food type; High-Risk (TCS), Medium-Risk or Low-Risk.
+Step 3: Time-Temperature Analysis - time in the 5°C - 60°C danger zone: under 2 hours safe, 2-4 hours use immediately, over 4 hours discard.
+Step 4: Protective Factors Assessment - sealed food-grade packaging, cold chain, preservatives, acidity (pH < 4.6), water activity.
+Step 5: Donation Context Evaluation - vulnerable recipients, distribution time, storage and reheating at the recipient.
+Step 6: Final Decision:
+- SAFE_FOR_DONATION: risk LOW or VERY_LOW, no quality issues, within time limits, packaging intact.
+- SAFE_WITH_ADVISORY: risk MODERATE, minor concerns that handling instructions in the advisory can mitigate.
+- DISCARD: risk HIGH or VERY_HIGH, spoilage or contamination, time limits exceeded, packaging compromised, or high-risk food without cold chain evidence.
+
+RISK CATEGORIES: VERY_HIGH immediate hazard; HIGH significant concerns; MODERATE safe with precautions; LOW minor concerns; VERY_LOW no concerns.
+
+CRITICAL RULES: When in doubt, err on the side of caution. Evaluate high-risk foods (meat, dairy, eggs, cooked rice/pasta) more strictly. Never approve food with any sign of spoilage. Time-temperature violations are non-negotiable for high-risk foods. Your decision is final.
+"""
+
+# Prompt variants and the reasoning requested in compact mode
+PROMPT_MODES = ("full", "compact")
+REASONING_VERBOSITY_LEVELS = ("verdict", "short", "full")
+
+DECISIONS = ["SAFE_FOR_DONATION", "SAFE_WITH_ADVISORY", "DISCARD"]
+RISK_LEVELS = ["VERY_HIGH", "HIGH", "MODERATE", "LOW", "VERY_LOW"]
+REASONING_FIELDS = (
+    "visual_inspection",
+    "food_identification",
+    "time_temperature",
+    "protective_factors",
+    "donation_context",
+    "final_assessment"
+)
+
+_VERBOSITY_REASONING_FIELDS = {
+    "verdict": (),
+    "short": ("final_assessment",),
+    "full": REASONING_FIELDS
+}
+
+_VERBOSITY_INSTRUCTIONS = {
+    "verdict": "Return the verdict only.",
+    "short": "Give the final_assessment in one sentence.",
+    "full": "Fill each reasoning field with the findings of its step."
+}
+
+
+def get_response_schema(verbosity: str = "full") -> dict:
+    """
+    Build the response schema used in compact mode.
+
+    Args:
+        verbosity: "verdict" (no reasoning), "short" (final assessment only)
+            or "full" (one field per evaluation step)
+
+    Returns:
+        dict: Schema in the form accepted by generation_config["response_schema"]
+
+    Raises:
+        ValueError: If the verbosity level is unknown
+    """
+    if verbosity not in _VERBOSITY_REASONING_FIELDS:
+        raise ValueError(
+            f"Unknown reasoning verbosity '{verbosity}' (expected one of: {', '.join(REASONING_VERBOSITY_LEVELS)})"
+        )
+    properties = {
+        "classification": {"type": "string", "format": "enum", "enum": ["EDIBLE", "NOT-EDIBLE"]},
+        "decision": {"type": "string", "format": "enum", "enum": list(DECISIONS)},
+        "risk_level": {"type": "string", "format": "enum", "enum": list(RISK_LEVELS)},
+        "confidence": {"type": "number"},
+        "advisory": {"type": "string", "nullable": True}
+    }
+    required = ["classification", "decision", "risk_level", "confidence"]
+    reasoning_fields = _VERBOSITY_REASONING_FIELDS[verbosity]
+    if reasoning_fields:
+        properties["reasoning"] = {
+            "type": "object",
+            "properties": {field: {"type": "string"} for field in reasoning_fields},
+            "required": list(reasoning_fields)
+        }
+        required.append("reasoning")
+    return {"type": "object", "properties": properties, "required": required}
+
+
+def build_user_prompt(
+    mode: str,
+    verbosity: str,
+    preparation_time: str,
+    package_time: str,
+    current_time: str,
+    hours_since_prep: float,
+    hours_since_pkg: float
+) -> str:
+    """
+    Build the per-request prompt sent alongside the image.
+
+    The full prompt restates the JSON structure inline; the compact prompt
+    only gives the time context and the verbosity instruction, relying on
+    the response schema for structure. Verbosity applies to compact mode.
+    """
+    if mode == "compact":
+        return f"""Food image for donation safety evaluation.
+Prepared: {preparation_time} ({hours_since_prep:.1f} hours ago)
+Packaged: {package_time} ({hours_since_pkg:.1f} hours ago)
+Current time: {current_time}
+{_VERBOSITY_INSTRUCTIONS[verbosity]}"""
+
+    return f"""Analyze this food image for donation safety.
+
+**Time Context:**
+- Preparation Time: {preparation_time}
+- Packaging Time: {package_time}
+- Current Time: {current_time}
+- Hours since preparation: {hours_since_prep:.1f} hours
+- Hours since packaging: {hours_since_pkg:.1f} hours
+
+Evaluate this food item following the 6-step FSSAI evaluation pipeline.
+
+CRITICAL: Respond with ONLY a valid JSON object. No markdown, no code blocks, no explanation text.
+Use this exact structure:
+{{"classification": "EDIBLE" or "NOT-EDIBLE", "decision": "SAFE_FOR_DONATION" or "SAFE_WITH_ADVISORY" or "DISCARD", "risk_level": "VERY_LOW" or "LOW" or "MODERATE" or "HIGH" or "VERY_HIGH", "confidence": 0.0 to 1.0, "reasoning": {{"visual_inspection": "...", "food_identification": "...", "time_temperature": "...", "protective_factors": "...", "donation_context": "...", "final_assessment": "..."}}, "advisory": null or "..."}}"""
+
+
 # Validate prompt at module import time
 def _validate_prompt():
-    """Validate that the system prompt is properly defined and immutable."""
+    """Validate every prompt variant and response schema."""
     required_sections = [
         "EVALUATION PIPELINE",
         "Step 1: Visual Inspection",
@@ -122,28 +248,59 @@ def _validate_prompt():
         "CRITICAL RULES"
     ]
     
-    for section in required_sections:
-        if section not in FOOD_SAFETY_SYSTEM_PROMPT:
-            raise ValueError(f"System prompt validation failed: Missing section '{section}'")
+    for mode, prompt in (("full", FOOD_SAFETY_SYSTEM_PROMPT), ("compact", COMPACT_SYSTEM_PROMPT)):
+        for section in required_sections:
+            # The response schema replaces the format section in compact mode
+            if mode == "compact" and section == "RESPONSE FORMAT":
+                continue
+            if section not in prompt:
+                raise ValueError(f"System prompt validation failed ({mode}): Missing section '{section}'")
+        
+        for decision in DECISIONS:
+            if decision not in prompt:
+                raise ValueError(f"System prompt validation failed ({mode}): Missing decision type '{decision}'")
+        
+        for level in RISK_LEVELS:
+            if level not in prompt:
+                raise ValueError(f"System prompt validation failed ({mode}): Missing risk level '{level}'")
     
-    required_decisions = ["SAFE_FOR_DONATION", "SAFE_WITH_ADVISORY", "DISCARD"]
-    for decision in required_decisions:
-        if decision not in FOOD_SAFETY_SYSTEM_PROMPT:
-            raise ValueError(f"System prompt validation failed: Missing decision type '{decision}'")
+    for verbosity in REASONING_VERBOSITY_LEVELS:
+        schema = get_response_schema(verbosity)
+        properties = schema["properties"]
+        for field in ("classification", "decision", "risk_level", "confidence"):
+            if field not in schema["required"]:
+                raise ValueError(f"Response schema validation failed ({verbosity}): '{field}' is not required")
+        if properties["decision"]["enum"] != DECISIONS or properties["risk_level"]["enum"] != RISK_LEVELS:
+            raise ValueError(f"Response schema validation failed ({verbosity}): decision or risk level values differ")
+        reasoning = tuple(properties.get("reasoning", {}).get("properties", {}))
+        if reasoning != _VERBOSITY_REASONING_FIELDS[verbosity]:
+            raise ValueError(f"Response schema validation failed ({verbosity}): reasoning fields {reasoning}")
     
-    required_risk_levels = ["VERY_HIGH", "HIGH", "MODERATE", "LOW", "VERY_LOW"]
-    for level in required_risk_levels:
-        if level not in FOOD_SAFETY_SYSTEM_PROMPT:
-            raise ValueError(f"System prompt validation failed: Missing risk level '{level}'")
+    for mode in PROMPT_MODES:
+        for verbosity in REASONING_VERBOSITY_LEVELS:
+            user_prompt = build_user_prompt(mode, verbosity, "2025-01-01T10:00", "2025-01-01T10:30",
+                                            "2025-01-01T11:00", 1.0, 0.5)
+            if "1.0 hours" not in user_prompt or "0.5 hours" not in user_prompt:
+                raise ValueError(f"User prompt validation failed ({mode}/{verbosity}): Missing time context")
+            # Only the full prompt spells out the JSON structure
+            if ('"classification"' in user_prompt) != (mode == "full"):
+                raise ValueError(f"User prompt validation failed ({mode}/{verbosity}): Unexpected response format")
     
     return True
 
 # Run validation at import time
 _validate_prompt()
 
-def get_system_prompt() -> str:
+def get_system_prompt(mode: str = "full") -> str:
     """
     Returns the immutable FSSAI-aligned food safety system prompt.
     This function provides read-only access to prevent modification.
+    
+    Args:
+        mode: "full" (default) or "compact"
     """
+    if mode == "compact":
+        return COMPACT_SYSTEM_PROMPT
+    if mode != "full":
+        raise ValueError(f"Unknown prompt mode '{mode}' (expected one of: {', '.join(PROMPT_MODES)})")
     return FOOD_SAFETY_SYSTEM_PROMPT
@@ -0,0 +1,251 @@
+"""
+Verdict Cache Module - Content-addressed cache for food analysis verdicts.
+Avoids repeated model calls when the same image is re-submitted (retries,
+re-listed trays) within the same preparation/packaging time window.
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+
+# Data directory (shared with csv_storage)
+DATA_DIR = os.path.join(os.path.dirname(__file__), "data")
+
+# Cache configuration
+VERDICT_CACHE_ENABLED = os.getenv("VERDICT_CACHE_ENABLED", "true").lower() == "true"
+VERDICT_CACHE_TTL_SECONDS = float(os.getenv("VERDICT_CACHE_TTL_SECONDS", 15 * 60))
+VERDICT_CACHE_MAX_ENTRIES = int(os.getenv("VERDICT_CACHE_MAX_ENTRIES", 1024))
+VERDICT_CACHE_MAX_BYTES = int(os.getenv("VERDICT_CACHE_MAX_BYTES", 8 * 1024 * 1024))
+
+# Optional disk tier - disabled unless a directory is configured
+VERDICT_CACHE_DISK_DIR = os.getenv("VERDICT_CACHE_DISK_DIR", "")
+VERDICT_CACHE_DISK_MAX_ENTRIES = int(os.getenv("VERDICT_CACHE_DISK_MAX_ENTRIES", 10000))
+
+# Width of the elapsed-time buckets (hours) that form part of the cache key
+VERDICT_CACHE_TIME_BUCKET_HOURS = float(os.getenv("VERDICT_CACHE_TIME_BUCKET_HOURS", 0.5))
+
+
+def make_cache_key(
+    image_bytes: bytes,
+    hours_since_prep: float,
+    hours_since_pkg: float,
+    bucket_hours: float = VERDICT_CACHE_TIME_BUCKET_HOURS,
+    image_digest: Optional[str] = None
+) -> str:
+    """
+    Build a content-addressed cache key for an analysis request.
+
+    The key combines a SHA-256 digest of the image with the elapsed time since
+    preparation and packaging, rounded to `bucket_hours`, because those values
+    are part of the prompt and can change the verdict.
+
+    Args:
+        image_bytes: Raw bytes of the food image
+        hours_since_prep: Hours elapsed since preparation
+        hours_since_pkg: Hours elapsed since packaging
+        bucket_hours: Width of the time buckets in hours
+        image_digest: SHA-256 hex digest of the image, if the caller already has it
+
+    Returns:
+        str: Hex cache key
+    """
+    if image_digest is None:
+        image_digest = hashlib.sha256(image_bytes).hexdigest()
+    prep_bucket = int(round(hours_since_prep / bucket_hours))
+    pkg_bucket = int(round(hours_since_pkg / bucket_hours))
+    return f"{image_digest}:{prep_bucket}:{pkg_bucket}"
+
+
+class _DiskTier:
+    """
+    One-JSON-file-per-entry cache tier that survives process restarts.
+
+    The entry count is tracked in memory so writes do not list the directory.
+    Once it passes max_entries the oldest tenth is evicted in one pass, which
+    also re-counts the files written by other processes sharing the directory.
+    """
+
+    def __init__(self, directory: str, ttl_seconds: float, max_entries: int):
+        self.directory = directory
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+        self._count = len(self._names())
+
+    def _path(self, key: str) -> str:
+        # Keys contain ':' which is not portable in filenames
+        return os.path.join(self.directory, key.replace(":", "_") + ".json")
+
+    def _names(self) -> list:
+        return [n for n in os.listdir(self.directory) if n.endswith(".json")]
+
+    def get(self, key: str) -> Optional[tuple]:
+        """Return (value, stored_at) for `key`, stored_at being a time.time() timestamp."""
+        path = self._path(key)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+
+        stored_at = entry.get("stored_at", 0)
+        if time.time() - stored_at > self.ttl_seconds:
+            self._remove(path)
+            return None
+        return entry.get("value"), stored_at
+
+    def set(self, key: str, value: dict):
+        path = self._path(key)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"stored_at": time.time(), "value": value}, f)
+        is_new = not os.path.exists(path)
+        os.replace(tmp_path, path)
+        if is_new:
+            with self._lock:
+                self._count += 1
+                evict = self._count > self.max_entries
+            if evict:
+                self._evict()
+
+    def clear(self):
+        for name in self._names():
+            self._remove(os.path.join(self.directory, name))
+
+    def _remove(self, path: str):
+        try:
+            os.remove(path)
+        except OSError:
+            return
+        with self._lock:
+            self._count -= 1
+
+    def _evict(self):
+        """Drop the oldest files, leaving the tier a tenth below max_entries."""
+        with self._lock:
+            try:
+                paths = [os.path.join(self.directory, n) for n in self._names()]
+            except OSError:
+                return
+            keep = self.max_entries - max(1, self.max_entries // 10)
+            if len(paths) > keep:
+                paths.sort(key=lambda p: os.path.getmtime(p) if os.path.exists(p) else 0)
+                for path in paths[:len(paths) - keep]:
+                    try:
+                        os.remove(path)
+                    except OSError:
+                        pass
+            self._count = len(self._names())
+
+
+class VerdictCache:
+    """
+    Thread-safe LRU cache of analysis verdicts with TTL expiry.
+
+    Entries are bounded both by count and by their approximate serialized
+    size. An optional disk tier is consulted on memory misses and promoted
+    back into memory on hit.
+    """
+
+    def __init__(
+        self,
+        ttl_seconds: float = VERDICT_CACHE_TTL_SECONDS,
+        max_entries: int = VERDICT_CACHE_MAX_ENTRIES,
+        max_bytes: int = VERDICT_CACHE_MAX_BYTES,
+        disk_dir: str = VERDICT_CACHE_DISK_DIR,
+        disk_max_entries: int = VERDICT_CACHE_DISK_MAX_ENTRIES
+    ):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()  # key -> (stored_at, size, value)
+        self._total_bytes = 0
+        self._lock = threading.Lock()
+        self._disk = _DiskTier(disk_dir, ttl_seconds, disk_max_entries) if disk_dir else None
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: str) -> Optional[dict]:
+        """Return a copy of the cached verdict for `key`, or None."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                stored_at, _, value = entry
+                if time.monotonic() - stored_at <= self.ttl_seconds:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return json.loads(value)
+                self._remove(key)
+
+        if self._disk is not None:
+            entry = self._disk.get(key)
+            if entry is not None:
+                value, stored_at = entry
+                # Keep the original age so promotion cannot extend the TTL
+                self._store(key, json.dumps(value), time.monotonic() - (time.time() - stored_at))
+                with self._lock:
+                    self.hits += 1
+                return value
+
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def set(self, key: str, value: dict):
+        """Store a verdict under `key` in memory and, if enabled, on disk."""
+        serialized = json.dumps(value)
+        self._store(key, serialized)
+        if self._disk is not None:
+            try:
+                self._disk.set(key, value)
+            except OSError as e:
+                print(f"Error writing verdict cache entry: {e}")
+
+    def clear(self):
+        """Remove all entries from every tier."""
+        with self._lock:
+            self._entries.clear()
+            self._total_bytes = 0
+        if self._disk is not None:
+            self._disk.clear()
+
+    def stats(self) -> dict:
+        """Return hit/miss counters and current occupancy."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self._total_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups * 100, 2) if lookups > 0 else 0.0,
+                "disk_enabled": self._disk is not None
+            }
+
+    def _store(self, key: str, serialized: str, stored_at: Optional[float] = None):
+        size = len(serialized)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (time.monotonic() if stored_at is None else stored_at, size, serialized)
+            self._total_bytes += size
+            while self._entries and (
+                len(self._entries) > self.max_entries or self._total_bytes > self.max_bytes
+            ):
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+
+    def _remove(self, key: str):
+        _, size, _ = self._entries.pop(key)
+        self._total_bytes -= size
+
+
+# Process-wide cache instance used by food_analyzer
+verdict_cache = VerdictCache()
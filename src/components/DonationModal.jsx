@@ -97,6 +97,53 @@ export default function DonationModal({ open, onClose, type = "food" }) {
     }
   };
 
+  // Read Server-Sent Events from /api/analyze-food, updating the partial verdict as fields arrive
+  const readAnalysisStream = async (body) => {
+    const reader = body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = "";
+    let partial = {};
+
+    while (true) {
+      const { done, value } = await reader.read();
+      if (done) break;
+      buffer += decoder.decode(value, { stream: true });
+
+      let boundary;
+      while ((boundary = buffer.indexOf("\n\n")) !== -1) {
+        const rawEvent = buffer.slice(0, boundary);
+        buffer = buffer.slice(boundary + 2);
+
+        const eventLine = rawEvent.split("\n").find((line) => line.startsWith("event: "));
+        const dataLine = rawEvent.split("\n").find((line) => line.startsWith("data: "));
+        if (!eventLine || !dataLine) continue;
+
+        const event = eventLine.slice(7);
+        const data = JSON.parse(dataLine.slice(6));
+
+        if (event === "result") {
+          return data;
+        }
+        if (event === "error") {
+          return {
+            classification: "NOT-EDIBLE",
+            confidence: 0,
+            reasoning: data.reasoning || data.error,
+            error: true,
+          };
+        }
+        if (event === "field") {
+          partial = { ...partial, [data.field]: data.value };
+        } else if (event === "reasoning") {
+          partial = { ...partial, reasoning: { ...(partial.reasoning || {}), [data.field]: data.value } };
+        }
+        setAnalysisResult(partial);
+      }
+    }
+
+    throw new Error("Analysis stream ended without a result");
+  };
+
   const analyzeFood = async () => {
     if (!imageFile) {
       addToast("Please upload a food image", "error");
@@ -117,12 +164,21 @@ export default function DonationModal({ open, onClose, type = "food" }) {
       formData.append("preparationTime", preparationTime);
       formData.append("packageTime", packageTime);
 
-      const response = await fetch(`${API_BASE_URL}/api/analyze-food`, {
+      // Stream the analysis so the verdict shows up before the reasoning is done
+      const response = await fetch(`${API_BASE_URL}/api/analyze-food?stream=true`, {
         method: "POST",
         body: formData,
+        headers: { Accept: "text/event-stream" },
       });
 
-      const result = await response.json();
+      const contentType = response.headers.get("Content-Type") || "";
+      if (!contentType.includes("text/event-stream") || !response.body) {
+        const result = await response.json();
+        setAnalysisResult(result);
+        return result;
+      }
+
+      const result = await readAnalysisStream(response.body);
       setAnalysisResult(result);
       return result;
     } catch (err) {